@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Measure cgroup lookups and container rollups on synthetic /proc and cgroupfs trees.
+
+Times a scan that reads every /proc/[pid]/cgroup against one that reuses the
+per-lifetime cache, and rolling processes up per container from the members'
+/proc figures against reading each cgroup's own accounting files.
+
+Usage:
+    python benchmarks/bench_cgroups.py [--sizes 1000,10000,50000] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fakeproc import build_cgroup_paths, build_fake_cgroupfs, build_fake_proc
+from process_viewer.cgroups import CgroupMonitor
+from process_viewer.collectors import BASIC_FIELDS, ProcfsCollector
+from process_viewer.grouping import ProcessGroups
+
+FIELDS = BASIC_FIELDS + ('cgroup',)
+
+
+def best_of(func, repeat):
+    """Return the fastest of repeat timed calls, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', default='1000,10000,50000')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    paths = build_cgroup_paths()
+    print(f"{'PIDs':>8} {'cgroups':>8} {'uncached':>10} {'cached':>10} {'per-PID':>10} {'cgroupfs':>10}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        with tempfile.TemporaryDirectory() as tmp:
+            proc_root = build_fake_proc(os.path.join(tmp, 'proc'), size, cgroup_paths=paths)
+            cgroup_root = build_fake_cgroupfs(os.path.join(tmp, 'cgroup'), paths)
+
+            collector = ProcfsCollector(proc_root=proc_root)
+            records = {p['pid']: p for p in collector.collect(FIELDS)}
+
+            def uncached():
+                collector._cgroups = {}
+                collector.collect(FIELDS)
+            uncached_time = best_of(uncached, args.repeat)
+            collector.collect(FIELDS)
+            cached_time = best_of(lambda: collector.collect(FIELDS), args.repeat)
+
+            groups = ProcessGroups()
+            groups.set_mode('cgroup')
+            per_pid_time = best_of(lambda: groups.rebuild(records), args.repeat)
+            if sorted(groups.sums) != sorted(paths):
+                raise SystemExit("cgroup grouping does not match the fake cgroupfs")
+
+            monitor = CgroupMonitor(cgroup_root, mem_total=1 << 36)
+            monitor.sample(groups.sums)
+            build_fake_cgroupfs(cgroup_root, paths, tick=1)
+            cgroupfs_time = best_of(lambda: monitor.sample(groups.sums), args.repeat)
+
+        print(f"{size:>8} {len(paths):>8} {uncached_time * 1000:>8.1f}ms {cached_time * 1000:>8.1f}ms "
+              f"{per_pid_time * 1000:>8.1f}ms {cgroupfs_time * 1000:>8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
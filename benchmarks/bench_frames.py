@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Measure full-screen frame throughput on the headless renderer and check frames against goldens.
+
+Draws complete screens (header, CPU and memory graphs, process list, status
+bar, help and dialogs) into a MemoryRenderer, the way the main loop draws
+into the terminal, from a seeded process table and seeded graph history.
+Reports frames per second for each screen. Because the inputs are fixed,
+the frames are too: --update-golden writes their text and digests to a
+file, and --golden fails if a change altered any of them.
+
+Usage:
+    python benchmarks/bench_frames.py [--rows 10000] [--frames 200] [--size 50x160]
+    python benchmarks/bench_frames.py --golden benchmarks/frames.golden.json
+    python benchmarks/bench_frames.py --update-golden benchmarks/frames.golden.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fakeproc import build_records
+from process_viewer.columns import DEFAULT_COLUMNS, DEFAULT_GROUP_COLUMNS, GROUP_COLUMNS
+from process_viewer.grouping import ProcessGroups
+from process_viewer.process_tree import ProcessTree
+from process_viewer.renderer import MemoryRenderer
+from process_viewer.resource_graphs import ResourceHistory
+from process_viewer.ui_components import UserInterface
+
+FILTERS = {'status': None, 'min_cpu': None, 'min_memory': None, 'user_filter': None}
+
+
+def seeded_history(seed, points=600):
+    """ResourceHistory filled with a reproducible random walk instead of system samples"""
+    rng = random.Random(seed)
+    history = ResourceHistory(max_points=points)
+    cpu, memory = 30.0, 50.0
+    for t in range(points):
+        cpu = max(0.0, min(100.0, cpu + rng.uniform(-8, 8)))
+        memory = max(0.0, min(100.0, memory + rng.uniform(-1, 1)))
+        history.store.record({'cpu': cpu, 'memory': memory}, 1700000000.0 + t)
+    return history
+
+
+def build_screens(records):
+    """Return name -> (rows, tree_view, state overrides, list options) for each screen drawn"""
+    flat = sorted(records.values(), key=lambda p: p['cpu_percent'], reverse=True)
+    tree = ProcessTree()
+    tree.rebuild(records)
+    groups = ProcessGroups()
+    groups.set_mode('name')
+    groups.rebuild(records)
+    group_rows = groups.rows(records, 'cpu')
+    percentiles = lambda rows: groups.fetch_percentiles(records, rows)
+    return {
+        'flat': (flat, False, {}, {}),
+        'tree': (tree.flatten(records, 'cpu'), True, {}, {'tree': tree}),
+        'groups': (group_rows, False, {'group_by': 'name'},
+                   {'columns': DEFAULT_GROUP_COLUMNS, 'fetch_columns': percentiles, 'registry': GROUP_COLUMNS,
+                    'count_label': "groups"}),
+        'filter_menu': (flat, False, {'input_mode': 'filter_menu'}, {}),
+        'signal_menu': (flat, False, {'input_mode': 'signal_menu', 'marked': {p['pid'] for p in flat[:5]}},
+                        {'marked': {p['pid'] for p in flat[:5]}}),
+    }
+
+
+def screen_state(overrides):
+    """UI state a screen is drawn with: the defaults of the main loop plus the screen's overrides"""
+    state = {'sort_by': 'cpu', 'search_term': "", 'filters': FILTERS, 'input_mode': 'normal',
+             'signal_scope': 'selected', 'signal_idx': 0, 'signal_escalate': True}
+    state.update(overrides)
+    return state
+
+
+def draw_screen(ui, history, rows, tree_view, state, options, selected):
+    """Draw one complete frame in the main loop's order and present it"""
+    height, width = ui.get_size()
+    ui.begin_frame()
+    ui.draw_header(width)
+    start_y = ui.draw_resource_graphs(history, ui.header_height + 1)
+    remaining_height = height - start_y - ui.status_height - ui.help_height
+    options = dict(options)
+    columns = options.pop('columns', DEFAULT_COLUMNS)
+    ui.draw_process_list(rows, selected, remaining_height, tree_view, columns, **options)
+    ui.draw_status_bar(width, state)
+    ui.draw_help(width)
+    if state['input_mode'] == 'filter_menu':
+        ui.draw_filter_menu()
+    elif state['input_mode'] == 'signal_menu':
+        ui.draw_signal_menu(state, {'selected': 1, 'subtree': 12, 'filter': len(rows), 'marked': 5})
+    ui.end_frame()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=10000, help="processes in the table")
+    parser.add_argument('--frames', type=int, default=200, help="frames timed per screen")
+    parser.add_argument('--size', default='50x160', help="screen HEIGHTxWIDTH")
+    parser.add_argument('--seed', type=int, default=0)
+    golden = parser.add_mutually_exclusive_group()
+    golden.add_argument('--golden', help="compare the first frame of each screen with this file")
+    golden.add_argument('--update-golden', help="write the first frame of each screen to this file")
+    args = parser.parse_args()
+
+    height, width = (int(n) for n in args.size.lower().split('x'))
+    records = build_records(args.rows, args.seed)
+    history = seeded_history(args.seed)
+    target = MemoryRenderer(height, width)
+    ui = UserInterface(target=target)
+
+    frames = {}
+    print(f"{'screen':<12} {'frames/s':>10} {'ms/frame':>9} {'B/frame':>8}")
+    for name, (rows, tree_view, overrides, options) in build_screens(records).items():
+        state = screen_state(overrides)
+        target.invalidate()
+        draw_screen(ui, history, rows, tree_view, state, options, 0)
+        frames[name] = {'digest': target.digest(), 'lines': target.lines()}
+
+        # Move the selection every frame, as scrolling through the list does
+        start_bytes = target.stats.total_bytes
+        start = time.perf_counter()
+        for i in range(args.frames):
+            draw_screen(ui, history, rows, tree_view, state, options, i % len(rows))
+        elapsed = time.perf_counter() - start
+        sent = (target.stats.total_bytes - start_bytes) / args.frames
+        print(f"{name:<12} {args.frames / elapsed:>10.0f} {elapsed / args.frames * 1000:>9.3f} {sent:>8.0f}")
+
+    if args.update_golden:
+        with open(args.update_golden, 'w') as f:
+            json.dump({'rows': args.rows, 'size': args.size, 'seed': args.seed, 'frames': frames}, f, indent=1)
+            f.write("\n")
+    elif args.golden:
+        with open(args.golden) as f:
+            expected = json.load(f)
+        if (expected['rows'], expected['size'], expected['seed']) != (args.rows, args.size, args.seed):
+            sys.exit(f"{args.golden} was written for --rows {expected['rows']} --size {expected['size']} "
+                     f"--seed {expected['seed']}")
+        changed = [name for name, frame in frames.items()
+                   if expected['frames'].get(name, {}).get('digest') != frame['digest']]
+        for name in changed:
+            old_lines = expected['frames'].get(name, {}).get('lines', [])
+            new_lines = frames[name]['lines']
+            for y in range(max(len(old_lines), len(new_lines))):
+                old = old_lines[y] if y < len(old_lines) else ""
+                new = new_lines[y] if y < len(new_lines) else ""
+                if old != new:
+                    print(f"{name} row {y}:\n  - {old}\n  + {new}")
+                    break
+            else:
+                print(f"{name}: text unchanged, attributes differ")
+        if changed:
+            sys.exit(f"{len(changed)} of {len(frames)} frames differ from {args.golden}")
+        print(f"All {len(frames)} frames match {args.golden}")
+
+
+if __name__ == '__main__':
+    main()
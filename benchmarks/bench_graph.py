@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the resource graph rasterizer.
+
+Compares, for a 200 column by 20 row graph:
+- the previous cell-by-cell implementation (reproduced below for reference),
+- a full rebuild through ResourceHistory._generate_graph,
+- an incremental render after one new sample, as happens every tick.
+
+Usage:
+    python benchmarks/bench_graph.py [--width 200] [--height 20] [--iterations 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from process_viewer.resource_graphs import GraphRasterizer, ResourceHistory
+
+
+def legacy_graph(data, width, height, title):
+    """The cell-by-cell algorithm the rasterizer replaced"""
+    graph_height = max(1, height - 2)
+    graph_width = max(4, width - 6)
+    scale = (graph_height - 1) / 100
+    data = [max(0, min(100, d)) for d in data]
+    lines = [f"{title:^{width}}"]
+    for y in range(graph_height):
+        line = f"{100 - (y / scale):4.0f}│"
+        for x in range(min(len(data), graph_width)):
+            data_value = data[-(graph_width - x)]
+            height_at_x = data_value * scale
+            if graph_height - y <= height_at_x:
+                if height_at_x >= graph_height * 0.8:
+                    line += "▆"
+                elif height_at_x >= graph_height * 0.6:
+                    line += "▅"
+                elif height_at_x >= graph_height * 0.4:
+                    line += "▄"
+                elif height_at_x >= graph_height * 0.2:
+                    line += "▃"
+                else:
+                    line += "▂"
+            else:
+                line += " "
+        lines.append(line)
+    lines.append("    └" + "─" * graph_width)
+    return lines
+
+
+def per_call(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--width', type=int, default=200)
+    parser.add_argument('--height', type=int, default=20)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    history = ResourceHistory(max_points=2 * args.width)
+    data = deque((rng.random() * 100 for _ in range(2 * args.width)), maxlen=2 * args.width)
+
+    print(f"{args.width}x{args.height} graph, microseconds per render")
+    print(f"  legacy cell-by-cell:   {per_call(lambda: legacy_graph(list(data), args.width, args.height, 'CPU'), args.iterations):>10.1f}")
+    for mode in ('block', 'braille'):
+        history.graph_mode = mode
+        rebuild = per_call(lambda: history._generate_graph(list(data), args.width, args.height, 'CPU'), args.iterations)
+
+        rasterizer = GraphRasterizer(mode)
+        total = len(data)
+        rasterizer.render(data, total, args.width, args.height, 'CPU')
+
+        def tick():
+            nonlocal total
+            data.append(rng.random() * 100)
+            total += 1
+            rasterizer.render(data, total, args.width, args.height, 'CPU')
+
+        incremental = per_call(tick, args.iterations)
+        print(f"  {mode:<8} full rebuild:  {rebuild:>10.1f}")
+        print(f"  {mode:<8} incremental:   {incremental:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
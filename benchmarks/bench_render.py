@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Measure terminal output of the damage-tracked renderer.
+
+Draws a sequence of process-list frames where a few CPU columns change per
+tick and reports the bytes sent per frame by CursesRenderer, compared with
+repainting every row as the old clear-and-redraw loop did.
+
+Usage:
+    python benchmarks/bench_render.py [--rows 50] [--cols 160] [--frames 100]
+"""
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from process_viewer.renderer import SPAN_OVERHEAD, CursesRenderer, Frame
+
+
+class CountingWindow:
+    """Stand-in for a curses window that only counts what is written"""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def erase(self):
+        pass
+
+    def addstr(self, y, x, text, attr=0):
+        self.bytes += len(text.encode('utf-8'))
+
+    def noutrefresh(self):
+        pass
+
+
+def draw(frame, rows, rng):
+    frame.addstr(0, 50, "Process Monitor", 1)
+    frame.addstr(1, 1, "┌" + "─" * (frame.width - 4) + "┐", 2)
+    for y, pid in enumerate(rows, start=2):
+        cpu = rng.random() * 100 if rng.random() < 0.1 else 0.0
+        frame.addstr(y, 1, "│", 2)
+        frame.addstr(y, 2, f"{pid:>8} {cpu:>7.1f} {0.4:>7.1f}   sleeping worker-{pid}", 3)
+        frame.addstr(y, frame.width - 2, "│", 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=50)
+    parser.add_argument('--cols', type=int, default=160)
+    parser.add_argument('--frames', type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pids = list(range(1000, 1000 + args.rows - 3))
+    renderer = CursesRenderer(CountingWindow(), doupdate=lambda: None)
+    full_bytes = 0
+    for _ in range(args.frames):
+        frame = Frame(args.rows, args.cols)
+        draw(frame, pids, rng)
+        renderer.present(frame)
+        # A clear-and-redraw loop sends every non-blank row in full
+        full_bytes += sum(len(line.rstrip().encode('utf-8')) + SPAN_OVERHEAD for line in frame.lines() if line.strip())
+
+    stats = renderer.stats
+    print(f"frames:            {stats.frames}")
+    print(f"full repaint:      {full_bytes / args.frames:>10.0f} B/frame")
+    print(f"damage tracked:    {stats.average_bytes:>10.0f} B/frame")
+    print(f"text to curses:    {renderer.window.bytes / args.frames:>10.0f} B/frame")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Compare a full sort with the top-K display path for flat view.
+
+Usage:
+    python benchmarks/bench_sort.py [--sizes 1000,10000,50000] [--rows 60]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from process_viewer.lazy_sort import TopKList
+
+
+def best_of(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', default='1000,10000,50000')
+    parser.add_argument('--rows', type=int, default=60, help="rows ordered up front (screen height plus margin)")
+    args = parser.parse_args()
+
+    key = lambda p: p['cpu_percent']
+    print(f"{'procs':>8} {'full sort':>10} {'top-k':>10} {'window':>10}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        rng = random.Random(size)
+        items = [{'pid': pid, 'cpu_percent': rng.random() * 100} for pid in range(size)]
+
+        full = best_of(lambda: sorted(items, key=key, reverse=True))
+        topk = best_of(lambda: TopKList(items, key, True, args.rows))
+        # Render a window at the top of the list, as draw_process_list does
+        window = best_of(lambda: TopKList(items, key, True, args.rows)[0:args.rows // 2])
+
+        assert list(TopKList(items, key, True, args.rows)[:args.rows]) == sorted(items, key=key, reverse=True)[:args.rows]
+        print(f"{size:>8} {full * 1000:>8.2f}ms {topk * 1000:>8.2f}ms {window * 1000:>8.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
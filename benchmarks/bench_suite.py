@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Run the main code paths on synthetic process tables and write the timings as JSON.
+
+Times, at each table size:
+- get_processes: a /proc scan of a fake /proc tree plus flat or tree ordering
+- tree_build: ProcessTree rebuild and flatten of an in-memory table
+- filter_processes: a glob search combined with a CPU threshold
+- sort_full / sort_window: a full CPU sort, and the top rows the flat view orders
+- generate_graph: ResourceHistory._generate_graph for one 200x20 graph (size-independent)
+- draw_process_list: UserInterface.draw_process_list on a headless 160x50 screen
+
+Every table comes from a fixed seed, so two runs on the same machine time the
+same work. The JSON output records the environment next to the results, and
+--compare prints the change against an earlier run.
+
+Usage:
+    python benchmarks/bench_suite.py [--sizes 1000,10000,100000] [--repeat 5] [-o results.json]
+    python benchmarks/bench_suite.py --compare baseline.json [--only tree_build,sort_full]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fakeproc import build_fake_proc, build_records
+from process_viewer.collectors import ProcfsCollector
+from process_viewer.lazy_sort import sorted_window
+from process_viewer.process_manager import ProcessManager
+from process_viewer.process_tree import ProcessTree
+from process_viewer.renderer import MemoryRenderer
+from process_viewer.resource_graphs import ResourceHistory
+from process_viewer.ui_components import UserInterface
+
+SCREEN_HEIGHT, SCREEN_WIDTH = 50, 160
+VISIBLE_ROWS = 60
+
+
+def time_calls(func, repeat, setup=None):
+    """Return the durations of repeat calls of func in seconds, running setup untimed before each"""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def bench_get_processes(size, repeat, seed):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = build_fake_proc(os.path.join(tmp, 'proc'), size, seed)
+        manager = ProcessManager(ProcfsCollector(proc_root=root))
+        manager.get_processes()  # Prime the CPU time baseline
+        yield 'get_processes_flat', time_calls(lambda: manager.get_processes('cpu', False), repeat)
+        yield 'get_processes_tree', time_calls(lambda: manager.get_processes('cpu', True), repeat)
+
+
+def bench_tree_build(size, repeat, seed):
+    records = build_records(size, seed)
+    tree = ProcessTree()
+    yield 'tree_build', time_calls(lambda: (tree.rebuild(records), tree.flatten(records, 'cpu')), repeat)
+
+
+def bench_filter(size, repeat, seed):
+    records = list(build_records(size, seed).values())
+    manager = ProcessManager()
+    yield 'filter_processes', time_calls(
+        lambda: manager.filter_processes(records, search_term='py*', min_cpu=0.25), repeat)
+
+
+def bench_sort(size, repeat, seed):
+    records = list(build_records(size, seed).values())
+    key = lambda p: p['cpu_percent']
+    yield 'sort_full', time_calls(lambda: sorted(records, key=key, reverse=True), repeat)
+    # The flat view orders only the rows around the selection up front; each
+    # call gets a fresh copy since sorted_window() may reorder its input
+    yield 'sort_window', time_calls(lambda: sorted_window(list(records), key, True, VISIBLE_ROWS)[:VISIBLE_ROWS],
+                                    repeat)
+
+
+def bench_graph(size, repeat, seed):
+    history = ResourceHistory()
+    data = [(i * 37 + seed) % 100 for i in range(600)]
+    yield 'generate_graph', time_calls(lambda: history._generate_graph(data, 200, 20, 'CPU'), repeat)
+
+
+def bench_draw(size, repeat, seed):
+    records = build_records(size, seed)
+    ordered = sorted(records.values(), key=lambda p: p['cpu_percent'], reverse=True)
+    ui = UserInterface(target=MemoryRenderer(SCREEN_HEIGHT, SCREEN_WIDTH))
+    yield 'draw_process_list', time_calls(
+        lambda: ui.draw_process_list(ordered, VISIBLE_ROWS // 2, SCREEN_HEIGHT, False), repeat, ui.begin_frame)
+
+
+# (benchmark names, function yielding (name, timings), whether it depends on the table size)
+BENCHMARKS = (
+    (('get_processes_flat', 'get_processes_tree'), bench_get_processes, True),
+    (('tree_build',), bench_tree_build, True),
+    (('filter_processes',), bench_filter, True),
+    (('sort_full', 'sort_window'), bench_sort, True),
+    (('generate_graph',), bench_graph, False),
+    (('draw_process_list',), bench_draw, True),
+)
+
+
+def summarize(name, size, timings):
+    return {'name': name, 'size': size, 'repeat': len(timings), 'min': min(timings),
+            'median': statistics.median(timings), 'mean': statistics.fmean(timings)}
+
+
+def print_results(results, baseline=None):
+    previous = {(r['name'], r['size']): r for r in baseline['results']} if baseline else {}
+    header = f"{'benchmark':<20} {'size':>8} {'min':>10} {'median':>10}"
+    print(header + (f" {'baseline':>10} {'change':>8}" if baseline else ""))
+    for r in results:
+        size = "-" if r['size'] is None else r['size']
+        line = f"{r['name']:<20} {size:>8} {r['min'] * 1e3:>8.3f}ms {r['median'] * 1e3:>8.3f}ms"
+        old = previous.get((r['name'], r['size']))
+        if old is not None:
+            line += f" {old['median'] * 1e3:>8.3f}ms {(r['median'] / old['median'] - 1) * 100:>+7.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', default=None, help="comma separated benchmark names to run")
+    parser.add_argument('-o', '--output', default=None, help="write the results to this JSON file")
+    parser.add_argument('--compare', default=None, help="JSON file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    only = set(args.only.split(',')) if args.only else None
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = []
+    for names, bench, sized in BENCHMARKS:
+        if only is not None and not only.intersection(names):
+            continue
+        for size in sizes if sized else [None]:
+            for name, timings in bench(size, args.repeat, args.seed):
+                if only is None or name in only:
+                    results.append(summarize(name, size, timings))
+
+    print_results(results, baseline)
+    if args.output:
+        report = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'platform': platform.platform(),
+                'machine': platform.machine(),
+                'cpu_count': os.cpu_count(),
+                'sizes': sizes,
+                'repeat': args.repeat,
+                'seed': args.seed,
+            },
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == '__main__':
+    main()
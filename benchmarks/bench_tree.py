@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark the process tree engine on large synthetic forests.
+
+Each forest ends in a fork chain deeper than Python's default recursion limit.
+Times a full rebuild + flatten, an incremental tick where 1% of the processes
+change CPU usage and a handful are born and exit, and a flatten with the
+largest subtrees collapsed.
+
+Usage:
+    python benchmarks/bench_tree.py [--sizes 10000,100000] [--repeat 3]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fakeproc import NAMES, build_parents
+from process_viewer.process_table import TableDelta
+from process_viewer.process_tree import ProcessTree
+
+
+def make_records(count, seed=0, chain=5000):
+    """Build a forest of count records whose last chain PIDs form one deep fork chain"""
+    rng = random.Random(seed)
+    parents = build_parents(count, seed)
+    for pid in range(max(2, count - chain + 1), count + 1):
+        parents[pid] = pid - 1
+    return {
+        pid: {'pid': pid, 'ppid': ppid, 'name': NAMES[pid % len(NAMES)],
+              'cpu_percent': rng.random() * 5, 'memory_percent': rng.random(), 'status': 'sleeping'}
+        for pid, ppid in parents.items()
+    }
+
+
+def make_delta(records, rng, next_pid):
+    """Simulate one tick: 1% of processes change CPU, 10 are born and 10 exit"""
+    delta = TableDelta()
+    pids = list(records)
+    for pid in rng.sample(pids, max(1, len(pids) // 100)):
+        record = dict(records[pid], cpu_percent=rng.random() * 100)
+        records[pid] = record
+        delta.updated.append(record)
+    for pid in rng.sample(pids[1:], 10):
+        if pid in records:
+            delta.removed.append(records.pop(pid))
+    for offset in range(10):
+        pid = next_pid + offset
+        record = {'pid': pid, 'ppid': rng.choice(pids[:50]), 'name': 'worker',
+                  'cpu_percent': 0.0, 'memory_percent': 0.0, 'status': 'running'}
+        records[pid] = record
+        delta.added.append(record)
+    return delta
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', default='10000,100000')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'nodes':>8} {'rebuild':>10} {'tick':>10} {'collapsed':>10} {'depth':>6}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        rng = random.Random(1)
+        records = make_records(size)
+        rebuild_times, tick_times, collapsed_times = [], [], []
+        depth = 0
+        for generation in range(args.repeat):
+            tree = ProcessTree()
+            elapsed, rows = timed(lambda: (tree.sync(records, None, 0), tree.flatten(records, 'cpu'))[1])
+            rebuild_times.append(elapsed)
+            depth = max(tree.levels.values())
+
+            delta = make_delta(records, rng, size + 1 + generation * 10)
+            elapsed, _ = timed(lambda: (tree.sync(records, delta, 1), tree.flatten(records, 'cpu'))[1])
+            tick_times.append(elapsed)
+
+            for pid in sorted(tree.children, key=lambda p: len(tree.children[p]), reverse=True)[:20]:
+                tree.collapse(pid)
+            elapsed, _ = timed(lambda: tree.flatten(records, 'cpu'))
+            collapsed_times.append(elapsed)
+
+        print(f"{size:>8} {min(rebuild_times) * 1000:>8.1f}ms {min(tick_times) * 1000:>8.1f}ms "
+              f"{min(collapsed_times) * 1000:>8.1f}ms {depth:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Synthetic /proc tree and process table generators used by the benchmarks.
+
+Writes just enough of the procfs layout (meminfo, stat and per-PID stat, statm,
+status and cgroup files) for both ProcfsCollector and psutil (via
+psutil.PROCFS_PATH) to scan it as if it were a real host. A matching cgroup v2
+tree (cpu.stat, memory.current and io.stat per cgroup) can be written with
+build_fake_cgroupfs() for CgroupMonitor. build_records() produces the same
+kind of process table in memory, shaped like the collectors' output.
+"""
+
+import os
+import random
+
+NAMES = ['bash', 'python3', 'nginx', 'postgres', 'java', 'sshd', 'systemd', 'kworker/0:1', 'node', 'gunicorn']
+STATES = 'SSSSSSSSRDI'
+
+MEMINFO = """MemTotal:       65536000 kB
+MemFree:        32768000 kB
+MemAvailable:   49152000 kB
+Buffers:          512000 kB
+Cached:          8192000 kB
+SwapCached:            0 kB
+Active:         16384000 kB
+Inactive:        8192000 kB
+Active(file):    4096000 kB
+Inactive(file):  4096000 kB
+Shmem:            256000 kB
+Slab:             512000 kB
+SReclaimable:     256000 kB
+SwapTotal:       8192000 kB
+SwapFree:        8192000 kB
+"""
+
+STATUS_TEMPLATE = """Name:\t{name}
+Umask:\t0022
+State:\t{state} (sleeping)
+Tgid:\t{pid}
+Ngid:\t0
+Pid:\t{pid}
+PPid:\t{ppid}
+TracerPid:\t0
+Uid:\t{uid}\t{uid}\t{uid}\t{uid}
+Gid:\t{uid}\t{uid}\t{uid}\t{uid}
+FDSize:\t64
+Groups:\t
+VmPeak:\t  {vms} kB
+VmSize:\t  {vms} kB
+VmRSS:\t  {rss} kB
+Threads:\t{threads}
+voluntary_ctxt_switches:\t{pid}
+nonvoluntary_ctxt_switches:\t0
+"""
+
+
+def build_cgroup_paths(services=20, containers=10, pods=10):
+    """Return cgroup paths of systemd services, Docker containers and two-container Kubernetes pods"""
+    paths = [f"/system.slice/{NAMES[i % len(NAMES)].split('/')[0]}-{i}.service" for i in range(services)]
+    paths += [f"/system.slice/docker-{i:064x}.scope" for i in range(containers)]
+    for pod in range(pods):
+        pod_slice = f"/kubepods.slice/kubepods-burstable.slice/kubepods-burstable-pod{pod:08x}_0000.slice"
+        paths += [f"{pod_slice}/cri-containerd-{pod:032x}{c:032x}.scope" for c in range(2)]
+    return paths
+
+
+def cgroup_of(pid, paths):
+    """The cgroup path build_fake_proc() puts pid in"""
+    return paths[pid % len(paths)]
+
+
+def write_cgroup_stats(directory, cpu_usec, memory, rbytes, wbytes):
+    """Write the accounting files of one fake cgroup"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'cpu.stat'), 'w') as f:
+        f.write(f"usage_usec {cpu_usec}\nuser_usec {cpu_usec // 2}\nsystem_usec {cpu_usec - cpu_usec // 2}\n")
+    with open(os.path.join(directory, 'memory.current'), 'w') as f:
+        f.write(f"{memory}\n")
+    with open(os.path.join(directory, 'io.stat'), 'w') as f:
+        f.write(f"8:0 rbytes={rbytes} wbytes={wbytes} rios=10 wios=10 dbytes=0 dios=0\n"
+                f"253:0 rbytes={rbytes // 2} wbytes={wbytes // 2} rios=5 wios=5 dbytes=0 dios=0\n")
+
+
+def build_fake_cgroupfs(root, paths, seed=0, tick=0):
+    """
+    Create a fake cgroup v2 hierarchy with the given cgroup paths under root
+
+    Counters grow linearly with tick, so rewriting the tree with tick + 1
+    simulates one more second of usage.
+    """
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, 'cgroup.controllers'), 'w') as f:
+        f.write("cpuset cpu io memory pids\n")
+    for path in paths:
+        cpu_rate, io_rate = rng.randint(0, 2000000), rng.randint(0, 1 << 24)
+        write_cgroup_stats(os.path.join(root, path.lstrip('/')), cpu_rate * (tick + 1),
+                           rng.randint(1 << 20, 1 << 32), io_rate * (tick + 1), io_rate * tick // 2)
+    return root
+
+
+def build_parents(count, seed=0):
+    """
+    Return a ppid for each of the PIDs 1..count shaped like a real host.
+
+    Most processes hang off a handful of daemons. A few form deep chains, the
+    way shells spawning shells or build systems do.
+    """
+    rng = random.Random(seed)
+    parents = {1: 0}
+    for pid in range(2, count + 1):
+        roll = rng.random()
+        if roll < 0.05:
+            parents[pid] = pid - 1           # deep fork chain
+        elif roll < 0.6:
+            parents[pid] = rng.randint(1, min(pid - 1, 50))  # children of daemons
+        else:
+            parents[pid] = rng.randint(1, pid - 1)
+    return parents
+
+
+def build_fake_proc(root, count, seed=0, cgroup_paths=None):
+    """
+    Create a fake /proc tree with count processes under root
+
+    Args:
+        cgroup_paths: cgroups the processes are spread over, see cgroup_of();
+            defaults to build_cgroup_paths()
+    """
+    if cgroup_paths is None:
+        cgroup_paths = build_cgroup_paths()
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, 'meminfo'), 'w') as f:
+        f.write(MEMINFO)
+    with open(os.path.join(root, 'stat'), 'w') as f:
+        f.write("cpu  1000 0 1000 100000 0 0 0 0 0 0\ncpu0 1000 0 1000 100000 0 0 0 0 0 0\n")
+        f.write("intr 0\nctxt 0\nbtime 1700000000\nprocesses 0\nprocs_running 1\nprocs_blocked 0\n")
+    os.makedirs(os.path.join(root, 'self'), exist_ok=True)
+    with open(os.path.join(root, 'self', 'stat'), 'w') as f:
+        f.write("1 (self) S 0 1 1 0 -1 0 0 0 0 0 0 0 0 0 20 0 1 0 1 0 0\n")
+
+    for pid, ppid in build_parents(count, seed).items():
+        pdir = os.path.join(root, str(pid))
+        os.makedirs(pdir, exist_ok=True)
+        name = NAMES[pid % len(NAMES)]
+        state = STATES[rng.randrange(len(STATES))]
+        utime, stime = rng.randint(0, 10000), rng.randint(0, 5000)
+        threads = rng.randint(1, 16)
+        starttime = rng.randint(100, 1000000)
+        rss_pages, vms_pages = rng.randint(0, 50000), rng.randint(50000, 500000)
+        uid = rng.choice((0, 0, 33, 1000, 1001))
+        with open(os.path.join(pdir, 'stat'), 'w') as f:
+            f.write(f"{pid} ({name}) {state} {ppid} {pid} {pid} 0 -1 4194560 100 0 0 0 "
+                    f"{utime} {stime} 0 0 20 0 {threads} 0 {starttime} {vms_pages * 4096} {rss_pages} "
+                    "18446744073709551615 1 1 0 0 0 0 0 0 0 0 0 0 17 0 0 0 0 0 0 0 0 0 0 0 0 0 0\n")
+        with open(os.path.join(pdir, 'statm'), 'w') as f:
+            f.write(f"{vms_pages} {rss_pages} 100 10 0 1000 0\n")
+        with open(os.path.join(pdir, 'status'), 'w') as f:
+            f.write(STATUS_TEMPLATE.format(name=name, state=state, pid=pid, ppid=ppid, uid=uid,
+                                           vms=vms_pages * 4, rss=rss_pages * 4, threads=threads))
+        with open(os.path.join(pdir, 'cgroup'), 'w') as f:
+            f.write(f"0::{cgroup_of(pid, cgroup_paths)}\n")
+    return root
+
+
+def build_records(count, seed=0):
+    """
+    Return a pid -> record table of count processes as a collector would produce it
+
+    The parent links come from build_parents(), so tree shapes match
+    build_fake_proc(). CPU usage is skewed like on a real host: most
+    processes idle, a few busy.
+    """
+    rng = random.Random(seed)
+    records = {}
+    for pid, ppid in build_parents(count, seed).items():
+        busy = rng.random() < 0.05
+        uid = rng.choice((0, 0, 33, 1000, 1001))
+        records[pid] = {
+            'pid': pid, 'ppid': ppid, 'name': NAMES[pid % len(NAMES)],
+            'status': 'running' if busy else 'sleeping',
+            'cpu_percent': rng.random() * 100 if busy else rng.random() * 0.5,
+            'memory_percent': rng.random() * 2, 'rss': rng.randint(0, 50000) * 4096,
+            'num_threads': rng.randint(1, 16), 'create_time': 1700000000 + rng.randint(0, 1000000),
+            'uid': uid, 'username': {0: 'root', 33: 'www-data'}.get(uid, f"user{uid}"),
+        }
+    return records
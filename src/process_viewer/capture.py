@@ -0,0 +1,407 @@
+"""
+Capture files of process snapshots.
+
+A capture is an append-only file: an 8 byte magic followed by records. Each
+record is a fixed header (kind, sequence number, timestamp, payload length)
+and a zlib-compressed JSON payload. Keyframe records ('K') hold every process
+as a row of field values; delta records ('D') hold only the rows added,
+changed or removed since the previous record. A keyframe is written every
+keyframe_interval records and whenever a sample was skipped, so a reader can
+start decoding at any keyframe.
+
+Payloads:
+    K  {"fields": [...], "rows": [[...], ...], "res": {...}}
+    D  {"add": [[...], ...], "upd": [[...], ...], "del": [pid, ...], "res": {...}}
+
+"res" holds the ResourceHistory values of the sample. Rows list the values in
+the order of the last keyframe's "fields"; the pid always comes first.
+
+Every capture has a sidecar index, `<capture>.idx`, with one fixed-size entry
+per record (timestamp, file offset, seq, kind, system CPU% and memory%).
+CaptureReader memory-maps both files, so opening a multi-GB capture, seeking
+to a time (binary search over the index) and drawing the system graphs around
+it never reads more than the records being decoded. The index is rebuilt from
+the capture when it is missing or behind.
+"""
+
+import bisect
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+MAGIC = b'PVCAP\x01\r\n'
+
+# kind, seq, timestamp, payload length
+RECORD_HEADER = struct.Struct('<cxxxIdI')
+
+# timestamp, offset, seq, kind, system cpu %, system memory %
+INDEX_ENTRY = struct.Struct('<dQIcxxxff')
+
+KEYFRAME = b'K'
+DELTA = b'D'
+
+# Fields captured in addition to ProcessManager.base_fields, so that user and
+# command line filters work on replayed captures
+CAPTURE_FIELDS = ('uid', 'cmdline')
+
+
+def index_path(path: str) -> str:
+    """Path of the sidecar index of a capture"""
+    return path + '.idx'
+
+
+class CaptureFrame(NamedTuple):
+    """One decoded sample of a capture"""
+    seq: int
+    timestamp: float
+    processes: Dict[int, dict]  # pid -> record
+    resources: Dict[str, float]
+
+
+def _encode_row(record: Dict, fields: Sequence[str]) -> list:
+    row = []
+    for field in fields:
+        value = record.get(field)
+        if type(value) is float:
+            value = round(value, 3)
+        row.append(value)
+    return row
+
+
+def _encode(payload: Dict, level: int) -> bytes:
+    return zlib.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'), level)
+
+
+class CaptureWriter:
+    """
+    Append snapshots to a capture file.
+
+    Records are flushed as soon as they are written, so a capture that is cut
+    off (crash, kill -9) loses at most the record being written.
+    """
+
+    def __init__(self, path: str, fields: Sequence[str], keyframe_interval: int = 60, level: int = 6):
+        """
+        Args:
+            path: Capture file, created or appended to
+            fields: Record fields stored per process; 'pid' is always included
+            keyframe_interval: Records between keyframes
+            level: zlib compression level
+        """
+        self.path = path
+        self.fields = ('pid',) + tuple(field for field in fields if field != 'pid')
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.level = level
+        self.records_written = 0
+        self.bytes_written = 0
+        self._file: BinaryIO = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+            self._file.flush()
+        else:
+            self._drop_partial_record()
+        sync_index(path)
+        self._index: BinaryIO = open(index_path(path), 'ab')
+        self._since_keyframe = None  # Records since the last keyframe; None forces one
+        self._last_seq = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _drop_partial_record(self):
+        """Truncate a record left incomplete by an interrupted writer before appending"""
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{self.path} is not a process-viewer capture")
+            end = len(MAGIC)
+            for offset, _, _, _, length in iter_records(data):
+                end = offset + RECORD_HEADER.size + length
+            size = len(data)
+        if end < size:
+            self._file.truncate(end)
+            self._file.seek(end)
+
+    def _append(self, kind: bytes, seq: int, timestamp: float, payload: bytes, resources: Dict[str, float]):
+        offset = self._file.tell()
+        self._file.write(RECORD_HEADER.pack(kind, seq, timestamp, len(payload)))
+        self._file.write(payload)
+        self._file.flush()
+        # The index entry goes after the record, so it never points past the data
+        self._index.write(INDEX_ENTRY.pack(timestamp, offset, seq, kind,
+                                           resources.get('cpu', 0.0), resources.get('memory', 0.0)))
+        self._index.flush()
+        self.records_written += 1
+        self.bytes_written += RECORD_HEADER.size + len(payload)
+
+    def write(self, snapshot, resources: Optional[Dict[str, float]] = None):
+        """
+        Append a Snapshot as a keyframe or a delta
+
+        Args:
+            snapshot: Snapshot published by the Sampler
+            resources: ResourceHistory.last_values for the same sample
+        """
+        fields = self.fields
+        resources = dict(resources or {})
+        contiguous = self._last_seq is not None and snapshot.seq == self._last_seq + 1
+        if (not contiguous or self._since_keyframe is None
+                or self._since_keyframe >= self.keyframe_interval - 1):
+            rows = [_encode_row(record, fields) for record in snapshot.processes.values()]
+            payload = {'fields': list(fields), 'rows': rows, 'res': resources}
+            self._append(KEYFRAME, snapshot.seq, snapshot.timestamp, _encode(payload, self.level), resources)
+            self._since_keyframe = 0
+        else:
+            delta = snapshot.delta
+            payload = {
+                'add': [_encode_row(record, fields) for record in delta.added],
+                'upd': [_encode_row(record, fields) for record in delta.updated],
+                'del': [record['pid'] for record in delta.removed],
+                'res': resources,
+            }
+            self._append(DELTA, snapshot.seq, snapshot.timestamp, _encode(payload, self.level), resources)
+            self._since_keyframe += 1
+        self._last_seq = snapshot.seq
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            self._index.close()
+
+
+def iter_records(data, offset: int = len(MAGIC)) -> Iterator[Tuple[int, bytes, int, float, int]]:
+    """
+    Walk the record headers of a capture held in a bytes-like object
+
+    Yields:
+        (offset, kind, seq, timestamp, payload length) per complete record; a
+        truncated record at the end is ignored
+    """
+    size = len(data)
+    while offset + RECORD_HEADER.size <= size:
+        kind, seq, timestamp, length = RECORD_HEADER.unpack_from(data, offset)
+        if offset + RECORD_HEADER.size + length > size:
+            break
+        yield offset, kind, seq, timestamp, length
+        offset += RECORD_HEADER.size + length
+
+
+def read_payload(data, offset: int, length: int) -> Dict:
+    """Decode the payload of the record at offset"""
+    start = offset + RECORD_HEADER.size
+    return json.loads(zlib.decompress(data[start:start + length]))
+
+
+class FrameDecoder:
+    """Rebuild full process tables by applying keyframes and deltas in order."""
+
+    def __init__(self):
+        self.fields: List[str] = []
+        self.processes: Dict[int, dict] = {}
+
+    def apply(self, kind: bytes, seq: int, timestamp: float, payload: Dict) -> CaptureFrame:
+        fields = self.fields
+        if kind == KEYFRAME:
+            fields = self.fields = payload['fields']
+            self.processes = {row[0]: dict(zip(fields, row)) for row in payload['rows']}
+        else:
+            # Copy on write, so frames handed out earlier stay unchanged
+            processes = self.processes = dict(self.processes)
+            for pid in payload['del']:
+                processes.pop(pid, None)
+            for row in payload['add']:
+                processes[row[0]] = dict(zip(fields, row))
+            for row in payload['upd']:
+                processes[row[0]] = dict(zip(fields, row))
+        return CaptureFrame(seq, timestamp, self.processes, payload.get('res', {}))
+
+
+def _index_entries(data, start: int) -> bytearray:
+    """Build index entries for the records from offset start on"""
+    entries = bytearray()
+    for offset, kind, seq, timestamp, length in iter_records(data, start):
+        resources = read_payload(data, offset, length).get('res', {})
+        entries += INDEX_ENTRY.pack(timestamp, offset, seq, kind,
+                                    resources.get('cpu', 0.0), resources.get('memory', 0.0))
+    return entries
+
+
+def _indexed_end(data, index) -> int:
+    """Offset just past the last record the index covers, or -1 if the index does not match the data"""
+    count = len(index) // INDEX_ENTRY.size
+    if not count:
+        return len(MAGIC)
+    _, offset, seq, kind, _, _ = INDEX_ENTRY.unpack_from(index, (count - 1) * INDEX_ENTRY.size)
+    if offset + RECORD_HEADER.size > len(data):
+        return -1
+    record_kind, record_seq, _, length = RECORD_HEADER.unpack_from(data, offset)
+    if (record_kind, record_seq) != (kind, seq) or offset + RECORD_HEADER.size + length > len(data):
+        return -1
+    return offset + RECORD_HEADER.size + length
+
+
+def sync_index(path: str) -> bytes:
+    """
+    Bring the sidecar index of a capture up to date
+
+    Entries are appended for records the index is missing; an index that does
+    not match the capture is rebuilt. Returns the new entries when the index
+    file cannot be written, so readers can still use them from memory.
+    """
+    idx = index_path(path)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < len(MAGIC):
+            return b''
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a process-viewer capture")
+            try:
+                with open(idx, 'rb') as index_file:
+                    index = index_file.read()
+            except FileNotFoundError:
+                index = b''
+            index = index[:len(index) - len(index) % INDEX_ENTRY.size]
+            end = _indexed_end(data, index)
+            if end < 0:
+                index, end = b'', len(MAGIC)
+            entries = _index_entries(data, end) if end < size else b''
+    try:
+        with open(idx, 'r+b' if os.path.exists(idx) else 'wb') as index_file:
+            index_file.truncate(len(index))
+            index_file.seek(len(index))
+            index_file.write(entries)
+    except OSError:
+        return index + entries
+    return b''
+
+
+class CaptureReader:
+    """
+    Random access to the frames of a capture through its memory-mapped index.
+
+    Frames are numbered by record. Decoding frame i starts from the nearest
+    keyframe at or before i; moving forward one frame from the last decoded
+    one only applies a single delta.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a process-viewer capture")
+        in_memory = sync_index(path)
+        self._index_file = None
+        if in_memory:
+            self._index = in_memory
+        elif os.path.getsize(index_path(path)):
+            self._index_file = open(index_path(path), 'rb')
+            self._index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._index = b''
+        self._count = len(self._index) // INDEX_ENTRY.size
+        self._decoder = FrameDecoder()
+        self._position = None  # Frame the decoder currently holds
+        self._keyframe = None  # (index, fields, processes) of the last decoded keyframe
+        self._keyframe_resources: Dict[str, float] = {}
+        self.start = 0
+        while self.start < self._count and self.entry(self.start)[3] != KEYFRAME:
+            self.start += 1  # Frames before the first keyframe cannot be decoded
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def entry(self, index: int) -> Tuple[float, int, int, bytes, float, float]:
+        """Return (timestamp, offset, seq, kind, cpu %, memory %) of a record"""
+        return INDEX_ENTRY.unpack_from(self._index, index * INDEX_ENTRY.size)
+
+    def timestamp(self, index: int) -> float:
+        return INDEX_ENTRY.unpack_from(self._index, index * INDEX_ENTRY.size)[0]
+
+    def find(self, timestamp: float) -> int:
+        """Return the last frame at or before timestamp (the first frame if none)"""
+        timestamps = _TimestampView(self)
+        index = bisect.bisect_right(timestamps, timestamp, self.start, self._count) - 1
+        return max(self.start, index)
+
+    def resources(self, start: int, end: int) -> List[Tuple[float, float, float]]:
+        """Return (timestamp, cpu %, memory %) for frames start..end-1 from the index alone"""
+        result = []
+        for index in range(max(0, start), min(end, self._count)):
+            timestamp, _, _, _, cpu, memory = self.entry(index)
+            result.append((timestamp, cpu, memory))
+        return result
+
+    def _decode(self, index: int) -> CaptureFrame:
+        timestamp, offset, seq, kind, _, _ = self.entry(index)
+        _, _, _, length = RECORD_HEADER.unpack_from(self._data, offset)
+        return self._decoder.apply(kind, seq, timestamp, read_payload(self._data, offset, length))
+
+    def frame(self, index: int) -> CaptureFrame:
+        """Decode frame index"""
+        if not self.start <= index < self._count:
+            raise IndexError("capture frame out of range")
+        keyframe = index
+        while self.entry(keyframe)[3] != KEYFRAME:
+            keyframe -= 1
+        if self._position is not None and keyframe <= self._position < index:
+            start = self._position + 1
+        elif self._keyframe is not None and self._keyframe[0] == keyframe:
+            # Scrubbing back within the same segment: reuse the decoded keyframe
+            _, self._decoder.fields, self._decoder.processes = self._keyframe
+            start = keyframe + 1
+            if index == keyframe:
+                self._position = index
+                timestamp, _, seq, _, _, _ = self.entry(index)
+                return CaptureFrame(seq, timestamp, self._decoder.processes, self._keyframe_resources)
+        else:
+            start = keyframe
+        frame = None
+        for position in range(start, index + 1):
+            frame = self._decode(position)
+            self._position = position
+            if position == keyframe:
+                self._keyframe = (keyframe, self._decoder.fields, self._decoder.processes)
+                self._keyframe_resources = frame.resources
+        return frame
+
+    def close(self):
+        for handle in (getattr(self, '_index', None), getattr(self, '_data', None)):
+            if isinstance(handle, mmap.mmap):
+                handle.close()
+        for handle in (getattr(self, '_index_file', None), self._file):
+            if handle is not None:
+                handle.close()
+
+
+class _TimestampView:
+    """Sequence of a reader's record timestamps for bisect."""
+
+    def __init__(self, reader: CaptureReader):
+        self.reader = reader
+
+    def __len__(self):
+        return len(self.reader)
+
+    def __getitem__(self, index: int) -> float:
+        return self.reader.timestamp(index)
+
+
+def read_frames(path: str) -> Iterator[CaptureFrame]:
+    """Decode every frame of a capture file in order"""
+    with CaptureReader(path) as reader:
+        for index in range(reader.start, len(reader)):
+            yield reader.frame(index)
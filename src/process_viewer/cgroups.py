@@ -0,0 +1,140 @@
+"""
+cgroup v2 statistics.
+
+CgroupMonitor reads the per-cgroup accounting files of the unified hierarchy
+(cpu.stat, memory.current and io.stat) for a set of cgroup paths. One cgroup
+directory holds the totals of all of its processes, including the ones that
+have already exited, so a container's usage costs three small file reads
+instead of a sum over every member PID. CPU usage and IO throughput are
+computed from the difference to the previous sample of the same cgroup.
+
+The hierarchy is looked up under a configurable root, so a fake cgroupfs
+directory tree can stand in for /sys/fs/cgroup.
+"""
+
+import os
+import time
+from typing import Dict, Iterable, NamedTuple, Optional
+
+import psutil
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+
+class CgroupStats(NamedTuple):
+    """Cumulative counters of one cgroup; None where the file is missing."""
+    cpu_usec: Optional[int]
+    memory: Optional[int]
+    io_read: Optional[int]
+    io_write: Optional[int]
+
+
+class CgroupUsage(NamedTuple):
+    """Usage of one cgroup since the previous sample."""
+    cpu_percent: Optional[float]     # 100 = one full CPU, as for processes
+    memory: Optional[int]            # memory.current in bytes
+    memory_percent: Optional[float]
+    io_read_rate: Optional[float]    # Bytes per second
+    io_write_rate: Optional[float]
+
+
+def find_unified_root(root: str = CGROUP_ROOT) -> Optional[str]:
+    """Return the mount point of the cgroup v2 hierarchy under root, if any"""
+    # Pure v2 mounts it at root; hybrid setups under root/unified
+    for candidate in (root, os.path.join(root, 'unified')):
+        if os.path.exists(os.path.join(candidate, 'cgroup.controllers')):
+            return candidate
+    return None
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def read_cgroup_stats(directory: str) -> CgroupStats:
+    """Read the accounting files of one cgroup directory"""
+    cpu_usec = None
+    text = _read_text(os.path.join(directory, 'cpu.stat'))
+    if text:
+        for line in text.splitlines():
+            if line.startswith('usage_usec '):
+                cpu_usec = int(line.split()[1])
+                break
+
+    memory = None
+    text = _read_text(os.path.join(directory, 'memory.current'))
+    if text:
+        memory = int(text)
+
+    io_read = io_write = None
+    text = _read_text(os.path.join(directory, 'io.stat'))
+    if text is not None:
+        io_read = io_write = 0
+        # One line per device: "8:0 rbytes=... wbytes=... rios=... ..."
+        for line in text.splitlines():
+            for pair in line.split()[1:]:
+                name, _, value = pair.partition('=')
+                if name == 'rbytes':
+                    io_read += int(value)
+                elif name == 'wbytes':
+                    io_write += int(value)
+    return CgroupStats(cpu_usec, memory, io_read, io_write)
+
+
+class CgroupMonitor:
+    """Per-cgroup CPU, memory and IO usage from the cgroup v2 accounting files."""
+
+    def __init__(self, root: Optional[str] = CGROUP_ROOT, mem_total: Optional[int] = None):
+        """
+        Args:
+            root: cgroupfs mount point; a fake tree can be passed for testing,
+                and None reads nothing (when replaying a capture)
+            mem_total: Memory size used for memory_percent; read from the
+                system when not given
+        """
+        self.root = root
+        self.unified_root = find_unified_root(root) if root is not None else None
+        self.mem_total = mem_total or psutil.virtual_memory().total
+        self._previous: Dict[str, tuple] = {}  # path -> (monotonic time, CgroupStats)
+
+    @property
+    def available(self) -> bool:
+        return self.unified_root is not None
+
+    def sample(self, paths: Iterable[str]) -> Dict[str, CgroupUsage]:
+        """
+        Return path -> usage for the given cgroup paths (as listed in
+        /proc/[pid]/cgroup); cgroups that cannot be read are left out
+        """
+        if self.unified_root is None:
+            return {}
+        now = time.monotonic()
+        previous = self._previous
+        current = {}
+        result = {}
+        for path in paths:
+            directory = os.path.join(self.unified_root, path.lstrip('/'))
+            if not os.path.isdir(directory):
+                continue
+            stats = read_cgroup_stats(directory)
+            current[path] = (now, stats)
+            cpu_percent = io_read_rate = io_write_rate = None
+            last = previous.get(path)
+            if last is not None and now > last[0]:
+                elapsed = now - last[0]
+                before = last[1]
+                if stats.cpu_usec is not None and before.cpu_usec is not None:
+                    cpu_percent = max(0, stats.cpu_usec - before.cpu_usec) / (elapsed * 1e4)
+                if stats.io_read is not None and before.io_read is not None:
+                    io_read_rate = max(0, stats.io_read - before.io_read) / elapsed
+                    io_write_rate = max(0, stats.io_write - before.io_write) / elapsed
+            memory_percent = 100.0 * stats.memory / self.mem_total if stats.memory is not None else None
+            result[path] = CgroupUsage(cpu_percent, stats.memory, memory_percent, io_read_rate, io_write_rate)
+        # Only the cgroups asked for this time are remembered, so the state
+        # never outgrows the number of groups on screen
+        self._previous = current
+        return result
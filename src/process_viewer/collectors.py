@@ -0,0 +1,513 @@
+"""
+Process collection backends.
+
+A collector turns the host's process table into a list of plain dicts, one per
+process, containing only the fields that were asked for. Two backends exist:
+
+- ProcfsCollector reads /proc/[pid]/stat, statm, status, io, fd and cgroup directly
+  with a reusable buffer and only opens the files the requested fields depend on.
+  With cold_ticks > 1 it scans in tiers: hot processes are read on every
+  collect() and idle ones in turns, see ProcfsCollector.collect().
+- PsutilCollector uses psutil.process_iter and works on every platform
+  psutil supports. It is the fallback when /proc is not available.
+"""
+
+import os
+import sys
+import time
+from typing import AbstractSet, Dict, Iterable, List, Optional
+
+import psutil
+
+from process_viewer.utils import username_for_uid
+
+# Fields the process list needs on every tick
+BASIC_FIELDS = ('pid', 'name', 'status', 'ppid', 'cpu_percent', 'memory_percent')
+
+# Which /proc/[pid] file each field is parsed from
+FIELD_SOURCES = {
+    'pid': None,
+    'name': 'stat',
+    'status': 'stat',
+    'ppid': 'stat',
+    'cpu_percent': 'stat',
+    'memory_percent': 'stat',
+    'create_time': 'stat',
+    'num_threads': 'stat',
+    'rss': 'stat',
+    'vms': 'statm',
+    'uid': 'status',
+    'username': 'status',
+    'cmdline': 'cmdline',
+    'io_read': 'io',
+    'io_write': 'io',
+    'num_fds': 'fd',
+    'cgroup': 'cgroup',
+}
+
+# Statuses that keep a process in the hot tier however little CPU it used
+HOT_STATUSES = {psutil.STATUS_RUNNING, psutil.STATUS_DISK_SLEEP}
+
+# Single letter states from /proc/[pid]/stat mapped to psutil status names
+STATUS_CODES = {
+    'R': psutil.STATUS_RUNNING,
+    'S': psutil.STATUS_SLEEPING,
+    'D': psutil.STATUS_DISK_SLEEP,
+    'T': psutil.STATUS_STOPPED,
+    't': psutil.STATUS_TRACING_STOP,
+    'Z': psutil.STATUS_ZOMBIE,
+    'X': psutil.STATUS_DEAD,
+    'x': psutil.STATUS_DEAD,
+    'K': 'wake-kill',
+    'W': psutil.STATUS_WAKING,
+    'P': psutil.STATUS_PARKED,
+    'I': psutil.STATUS_IDLE,
+}
+
+
+def parse_cgroup(data: bytes) -> str:
+    """
+    Return the cgroup path from the contents of /proc/[pid]/cgroup
+
+    On a unified (v2) hierarchy this is the '0::' line; on v1 and hybrid
+    setups the name=systemd hierarchy is used, or else the first one listed.
+    """
+    fallback = None
+    for line in data.decode('utf-8', 'replace').splitlines():
+        hierarchy, _, rest = line.partition(':')
+        controllers, _, path = rest.partition(':')
+        if hierarchy == '0' and not controllers:
+            return path
+        if controllers == 'name=systemd' or fallback is None:
+            fallback = path
+    return fallback or ""
+
+
+class Collector:
+    """Base class for process collection backends."""
+
+    name = "base"
+
+    # Collects between two reads of an idle process; 1 reads every process every time
+    cold_ticks = 1
+    # PIDs read on every collect() regardless of cold_ticks, e.g. the rows on screen
+    hot_pids: AbstractSet[int] = frozenset()
+
+    def collect(self, fields: Iterable[str] = BASIC_FIELDS) -> List[Dict]:
+        """Return one dict per live process containing the requested fields"""
+        raise NotImplementedError
+
+    def clone(self) -> "Collector":
+        """Return an independent collector of the same kind, for use on another thread"""
+        return type(self)()
+
+    def collect_pids(self, pids: Iterable[int], fields: Iterable[str]) -> Dict[int, Dict]:
+        """
+        Return pid -> dict of the requested fields for just the given PIDs
+
+        Used to fetch expensive fields for a handful of rows. PIDs that no
+        longer exist are left out.
+        """
+        raise NotImplementedError
+
+    def data_age(self, pid: int) -> float:
+        """Seconds between the latest collect() and the one that last read pid"""
+        return 0.0
+
+
+class PsutilCollector(Collector):
+    """Portable collector built on psutil.process_iter."""
+
+    name = "psutil"
+
+    # Fields that are derived from a differently named psutil attribute
+    _ATTR_MAP = {
+        'rss': 'memory_info',
+        'vms': 'memory_info',
+        'uid': 'uids',
+        'io_read': 'io_counters',
+        'io_write': 'io_counters',
+    }
+
+    # Fields psutil does not provide, read from /proc where it exists
+    _PROC_FIELDS = ('cgroup',)
+
+    def _attrs(self, fields: Iterable[str]) -> List[str]:
+        attrs = {self._ATTR_MAP.get(field, field) for field in fields if field not in self._PROC_FIELDS}
+        attrs.add('pid')
+        return sorted(attrs)
+
+    @staticmethod
+    def _read_cgroup(info: Dict):
+        try:
+            with open(f"/proc/{info['pid']}/cgroup", 'rb') as f:
+                info['cgroup'] = parse_cgroup(f.read())
+        except OSError:
+            pass
+
+    def _normalize(self, info: Dict) -> Dict:
+        """Turn psutil's attribute values into the collector field names and types"""
+        # psutil reports fields it was denied as None
+        for key in ('cpu_percent', 'memory_percent'):
+            if key in info and info[key] is None:
+                info[key] = 0.0
+        if 'name' in info and info['name'] is None:
+            info['name'] = ""
+        if 'memory_info' in info:
+            mem = info.pop('memory_info')
+            info['rss'] = mem.rss if mem else 0
+            info['vms'] = mem.vms if mem else 0
+        if 'uids' in info:
+            uids = info.pop('uids')
+            info['uid'] = uids.real if uids else None
+        if 'io_counters' in info:
+            io = info.pop('io_counters')
+            if io:
+                info['io_read'] = io.read_bytes
+                info['io_write'] = io.write_bytes
+        if 'cmdline' in info:
+            info['cmdline'] = ' '.join(info['cmdline']) if info['cmdline'] else ""
+        return info
+
+    def collect(self, fields: Iterable[str] = BASIC_FIELDS) -> List[Dict]:
+        fields = tuple(fields)
+        processes = [self._normalize(proc.info) for proc in psutil.process_iter(self._attrs(fields))]
+        if 'cgroup' in fields:
+            for info in processes:
+                self._read_cgroup(info)
+        return processes
+
+    def collect_pids(self, pids: Iterable[int], fields: Iterable[str]) -> Dict[int, Dict]:
+        fields = tuple(fields)
+        attrs = self._attrs(fields)
+        result = {}
+        for pid in pids:
+            try:
+                result[pid] = self._normalize(psutil.Process(pid).as_dict(attrs))
+            except psutil.NoSuchProcess:
+                continue
+            if 'cgroup' in fields:
+                self._read_cgroup(result[pid])
+        return result
+
+
+class ProcfsCollector(Collector):
+    """
+    Linux collector that parses /proc directly.
+
+    Files are read with os.readv into a single preallocated buffer, so no file
+    objects are created per process. CPU percentages are computed from the
+    difference in utime + stime between two reads of a process, the same way
+    psutil does it, so the first sample of a process reports 0.0.
+    """
+
+    name = "procfs"
+
+    def __init__(self, proc_root: str = "/proc", buffer_size: int = 8192, cold_ticks: int = 1):
+        """
+        Args:
+            proc_root: Where procfs is mounted
+            buffer_size: Size of the read buffer, the largest file read whole
+            cold_ticks: Spread the reads of idle processes over this many
+                collect() calls, see collect()
+        """
+        self.proc_root = proc_root
+        self.cold_ticks = max(1, cold_ticks)
+        self._buf = bytearray(buffer_size)
+        self._view = memoryview(self._buf)
+        self._clk_tck = os.sysconf('SC_CLK_TCK')
+        self._page_size = os.sysconf('SC_PAGE_SIZE')
+        self._cpu_times = {}      # pid -> (starttime, utime + stime ticks, monotonic time read)
+        self._collected = 0.0     # monotonic time of the latest collect()
+        self._ticks = 0           # Number of collect() calls, selects the cold PIDs read in turn
+        self._previous = {}       # pid -> info of the latest collect(), kept while tiered
+        self._previous_fields = None
+        self._read_at = {}        # pid -> monotonic time its info was read, kept while tiered
+        self.last_read = 0        # Processes read by the latest collect(), the rest were carried over
+        self._cmdlines = {}       # (pid, create_time) -> cmdline
+        self._cgroups = {}        # (pid, create_time) -> cgroup path
+        self._mem_total = self._read_mem_total()
+        self._boot_time = self._read_boot_time()
+
+    def data_age(self, pid: int) -> float:
+        read_at = self._read_at.get(pid)
+        return self._collected - read_at if read_at is not None else 0.0
+
+    def clone(self) -> "ProcfsCollector":
+        # The read buffer is shared by all reads, so each thread needs its own collector
+        return ProcfsCollector(self.proc_root, len(self._buf))
+
+    @staticmethod
+    def available(proc_root: str = "/proc") -> bool:
+        """Check whether a usable procfs is mounted at proc_root"""
+        return sys.platform.startswith('linux') and os.path.exists(os.path.join(proc_root, 'self', 'stat'))
+
+    def _read(self, path: str) -> Optional[bytes]:
+        """Read a /proc file, through the shared buffer unless it is larger"""
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            n = os.readv(fd, [self._buf])
+            if n < len(self._buf):
+                return self._view[:n].tobytes()
+            # Longer than the buffer, e.g. a long command line: read the rest
+            chunks = [self._view[:n].tobytes()]
+            while True:
+                chunk = os.read(fd, len(self._buf))
+                if not chunk:
+                    return b''.join(chunks)
+                chunks.append(chunk)
+        except OSError:
+            return None
+        finally:
+            os.close(fd)
+
+    def _read_mem_total(self) -> int:
+        data = self._read(f"{self.proc_root}/meminfo")
+        if data:
+            for line in data.splitlines():
+                if line.startswith(b'MemTotal:'):
+                    return int(line.split()[1]) * 1024
+        return psutil.virtual_memory().total
+
+    def _read_boot_time(self) -> float:
+        try:
+            with open(f"{self.proc_root}/stat", 'rb') as f:
+                for line in f:
+                    if line.startswith(b'btime'):
+                        return float(line.split()[1])
+        except OSError:
+            pass
+        return psutil.boot_time()
+
+    def list_pids(self) -> List[int]:
+        """Return the PIDs currently present under proc_root"""
+        return [int(entry) for entry in os.listdir(self.proc_root) if entry.isdigit()]
+
+    def _read_statm(self, pid: int, info: Dict) -> bool:
+        data = self._read(f"{self.proc_root}/{pid}/statm")
+        if not data:
+            return False
+        info['vms'] = int(data.split(None, 1)[0]) * self._page_size
+        return True
+
+    def _read_status(self, pid: int, info: Dict) -> bool:
+        data = self._read(f"{self.proc_root}/{pid}/status")
+        if not data:
+            return False
+        start = data.find(b'\nUid:')
+        uid = int(data[start + 5:data.find(b'\n', start + 1)].split()[0]) if start != -1 else 0
+        info['uid'] = uid
+        info['username'] = username_for_uid(uid)
+        return True
+
+    def _read_cmdline(self, pid: int, info: Dict) -> bool:
+        data = self._read(f"{self.proc_root}/{pid}/cmdline")
+        info['cmdline'] = data.rstrip(b'\0').replace(b'\0', b' ').decode('utf-8', 'replace') if data else ""
+        return True
+
+    def _read_io(self, pid: int, info: Dict) -> bool:
+        # Only readable for our own processes unless privileged; leave the fields out then
+        data = self._read(f"{self.proc_root}/{pid}/io")
+        if data:
+            start = data.find(b'read_bytes:')
+            if start != -1:
+                info['io_read'] = int(data[start + 11:data.find(b'\n', start)])
+                start = data.find(b'write_bytes:', start)
+                info['io_write'] = int(data[start + 12:data.find(b'\n', start)])
+        return True
+
+    def _read_fds(self, pid: int, info: Dict) -> bool:
+        try:
+            info['num_fds'] = len(os.listdir(f"{self.proc_root}/{pid}/fd"))
+        except PermissionError:
+            pass  # Another user's process; leave the field out
+        except OSError:
+            return False
+        return True
+
+    def _read_cgroup(self, pid: int, info: Dict) -> bool:
+        data = self._read(f"{self.proc_root}/{pid}/cgroup")
+        if data is None:
+            return False
+        info['cgroup'] = parse_cgroup(data)
+        return True
+
+    def collect_pids(self, pids: Iterable[int], fields: Iterable[str]) -> Dict[int, Dict]:
+        """
+        Read fields that do not come from /proc/[pid]/stat for the given PIDs
+
+        CPU and the other stat fields are left to collect(), which keeps the
+        state needed for CPU percentages.
+        """
+        readers = {
+            'statm': self._read_statm,
+            'status': self._read_status,
+            'cmdline': self._read_cmdline,
+            'io': self._read_io,
+            'fd': self._read_fds,
+            'cgroup': self._read_cgroup,
+        }
+        wanted = [readers[source] for source in {FIELD_SOURCES.get(field) for field in fields} if source in readers]
+        result = {}
+        for pid in pids:
+            info = {'pid': pid}
+            if all(read(pid, info) for read in wanted):
+                result[pid] = info
+        return result
+
+    def collect(self, fields: Iterable[str] = BASIC_FIELDS) -> List[Dict]:
+        """
+        Return one dict per live process containing the requested fields
+
+        With cold_ticks > 1 only the hot tier is read on every call: PIDs that
+        are new in the /proc listing, that used CPU or were running when last
+        read, and hot_pids. Every other PID is read once in cold_ticks calls,
+        in turns by PID, and in between its previous dict is returned as is;
+        data_age() tells how old its values are. A process that wakes up is
+        noticed within cold_ticks calls. Changing the fields reads everything.
+        """
+        fields = tuple(fields)
+        sources = {FIELD_SOURCES.get(field) for field in fields}
+        want_stat = 'stat' in sources
+        want_statm = 'statm' in sources
+        want_status = 'status' in sources
+        want_cmdline = 'cmdline' in sources
+        want_io = 'io' in sources
+        want_fd = 'fd' in sources
+        want_cgroup = 'cgroup' in sources
+        want_cpu = 'cpu_percent' in fields
+
+        now = time.monotonic()
+        cpu_scale = 100.0 / self._clk_tck
+        mem_scale = 100.0 * self._page_size / self._mem_total if self._mem_total else 0.0
+        prev_times = self._cpu_times
+        cpu_times = {}
+        prev_cmdlines = self._cmdlines
+        cmdlines = {}
+        prev_cgroups = self._cgroups
+        cgroups = {}
+        root = self.proc_root
+        processes = []
+
+        cold_ticks = self.cold_ticks
+        tiered = cold_ticks > 1
+        previous = self._previous if tiered and fields == self._previous_fields else {}
+        current = {}
+        prev_read_at = self._read_at
+        read_at = {}
+        turn = self._ticks % cold_ticks
+        hot = self.hot_pids
+        carried = 0
+
+        for pid in self.list_pids():
+            if previous:
+                # Diffing the listing: PIDs missing from previous are new and read below
+                info = previous.get(pid)
+                if (info is not None and pid % cold_ticks != turn and pid not in hot
+                        and not info.get('cpu_percent') and info.get('status') not in HOT_STATUSES):
+                    # Cold and not its turn: carry the previous values and state over
+                    if pid in prev_times:
+                        cpu_times[pid] = prev_times[pid]
+                    if want_cmdline:
+                        cmdlines[(pid, info.get('create_time'))] = info['cmdline']
+                    if want_cgroup and 'cgroup' in info:
+                        cgroups[(pid, info.get('create_time'))] = info['cgroup']
+                    read_at[pid] = prev_read_at[pid]
+                    current[pid] = info
+                    carried += 1
+                    processes.append(info)
+                    continue
+
+            info = {'pid': pid}
+
+            if want_stat:
+                data = self._read(f"{root}/{pid}/stat")
+                if not data:
+                    continue
+                # The command name may itself contain spaces and parentheses
+                rparen = data.rfind(b')')
+                rest = data[rparen + 2:].split()
+                starttime = int(rest[19])
+                info['name'] = data[data.find(b'(') + 1:rparen].decode('utf-8', 'replace')
+                info['status'] = STATUS_CODES.get(chr(rest[0][0]), '?')
+                info['ppid'] = int(rest[1])
+                info['num_threads'] = int(rest[17])
+                info['create_time'] = self._boot_time + starttime / self._clk_tck
+                rss_pages = int(rest[21])
+                info['rss'] = rss_pages * self._page_size
+                info['memory_percent'] = rss_pages * mem_scale
+                if want_cpu:
+                    ticks = int(rest[11]) + int(rest[12])
+                    cpu_times[pid] = (starttime, ticks, now)
+                    last = prev_times.get(pid)
+                    if last is not None and last[0] == starttime and now > last[2]:
+                        # Per process, since a cold one was last read several calls ago
+                        info['cpu_percent'] = (ticks - last[1]) * cpu_scale / (now - last[2])
+                    else:
+                        info['cpu_percent'] = 0.0
+
+            if want_statm and not self._read_statm(pid, info):
+                continue
+            if want_status and not self._read_status(pid, info):
+                continue
+
+            if want_cmdline:
+                # A process's command line rarely changes, so read it once per lifetime
+                key = (pid, info.get('create_time'))
+                cmdline = prev_cmdlines.get(key)
+                if cmdline is None:
+                    self._read_cmdline(pid, info)
+                else:
+                    info['cmdline'] = cmdline
+                cmdlines[key] = info['cmdline']
+
+            if want_io:
+                self._read_io(pid, info)
+            if want_fd:
+                self._read_fds(pid, info)
+            if want_cgroup:
+                # Moving a running process to another cgroup is rare enough
+                # that it is read once per lifetime too
+                key = (pid, info.get('create_time'))
+                cgroup = prev_cgroups.get(key)
+                if cgroup is None and self._read_cgroup(pid, info):
+                    cgroup = info['cgroup']
+                if cgroup is not None:
+                    info['cgroup'] = cgroups[key] = cgroup
+
+            if tiered:
+                read_at[pid] = now
+                current[pid] = info
+            processes.append(info)
+
+        if want_cpu:
+            self._cpu_times = cpu_times
+        if want_cmdline:
+            self._cmdlines = cmdlines
+        if want_cgroup:
+            self._cgroups = cgroups
+        self._previous = current
+        self._previous_fields = fields if tiered else None
+        self._read_at = read_at
+        self._collected = now
+        self._ticks += 1
+        self.last_read = len(processes) - carried
+        return processes
+
+
+def create_collector(backend: str = "auto", cold_ticks: int = 1) -> Collector:
+    """
+    Create a collector by name
+
+    Args:
+        backend: 'procfs', 'psutil' or 'auto' (procfs when available, psutil otherwise)
+        cold_ticks: See ProcfsCollector; the psutil backend reads every process every time
+    """
+    if backend == "procfs" or (backend == "auto" and ProcfsCollector.available()):
+        return ProcfsCollector(cold_ticks=cold_ticks)
+    if backend in ("psutil", "auto"):
+        return PsutilCollector()
+    raise ValueError(f"Unknown collector backend: {backend}")
@@ -0,0 +1,168 @@
+"""
+Process table column registry.
+
+Each column declares the record field it shows and how expensive that field
+is to collect. Cheap fields come out of /proc/[pid]/stat, which is read for
+every process on every tick anyway. Expensive fields need an extra file read
+or directory listing per process, so they are only collected for the rows on
+screen. The exception is a field that an active filter or sort needs, which
+is collected for every process.
+
+Static fields (command line, owner) are fetched once per process lifetime;
+the others are refreshed once per sample. The age column is not read from
+/proc at all: it shows how old a row's values are when the collector scans
+idle processes in turns (--cold-ticks).
+"""
+
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+from process_viewer.utils import get_size_str
+
+CHEAP = 0
+EXPENSIVE = 1
+
+
+class Column(NamedTuple):
+    """One column of the process table"""
+    name: str                     # Name used with --columns and as sort mode
+    title: str
+    width: int                    # Display width; the last column also takes the remaining space
+    field: str                    # Record field shown
+    cost: int                     # CHEAP or EXPENSIVE
+    format: Callable[[object], str]
+    align: str = '>'
+    numeric: bool = True          # Sorted descending
+    static: bool = False          # Value never changes during a process's lifetime
+    sortable: bool = True         # Offered by the 's' sort cycle
+
+
+def _percent(value) -> str:
+    return f"{value:.1f}"
+
+
+def _rate(value) -> str:
+    return get_size_str(value) + "/s"
+
+
+def _size(value) -> str:
+    return get_size_str(value)
+
+
+def _age(value) -> str:
+    return f"{value:.0f}s"
+
+
+def _start(value) -> str:
+    return time.strftime('%H:%M:%S' if time.time() - value < 86400 else '%b%d', time.localtime(value))
+
+
+COLUMNS: Dict[str, Column] = {column.name: column for column in (
+    Column('pid', 'PID', 8, 'pid', CHEAP, str),
+    Column('ppid', 'PPID', 8, 'ppid', CHEAP, str),
+    Column('cpu', 'CPU%', 7, 'cpu_percent', CHEAP, _percent),
+    Column('mem', 'MEM%', 7, 'memory_percent', CHEAP, _percent),
+    Column('status', 'STATUS', 10, 'status', CHEAP, str, numeric=False),
+    Column('rss', 'RSS', 9, 'rss', CHEAP, _size),
+    Column('threads', 'THR', 4, 'num_threads', CHEAP, str),
+    Column('start', 'START', 8, 'create_time', CHEAP, _start, static=True),
+    Column('vms', 'VIRT', 9, 'vms', EXPENSIVE, _size),
+    Column('user', 'USER', 10, 'username', EXPENSIVE, str, align='<', numeric=False, static=True),
+    Column('uid', 'UID', 6, 'uid', EXPENSIVE, str, static=True),
+    Column('fds', 'FDS', 5, 'num_fds', EXPENSIVE, str),
+    Column('read', 'READ', 9, 'io_read', EXPENSIVE, _size),
+    Column('write', 'WRITE', 9, 'io_write', EXPENSIVE, _size),
+    Column('age', 'AGE', 4, 'data_age', EXPENSIVE, _age, sortable=False),
+    Column('name', 'NAME', 20, 'name', CHEAP, str, align='<', numeric=False),
+    Column('cmd', 'COMMAND', 0, 'cmdline', EXPENSIVE, str, align='<', numeric=False, static=True),
+)}
+
+DEFAULT_COLUMNS = ('pid', 'cpu', 'mem', 'status', 'name')
+
+# Columns of the grouped table (see process_viewer.grouping); its rows are
+# dicts shaped like process records
+GROUP_COLUMNS: Dict[str, Column] = {column.name: column for column in (
+    Column('count', 'COUNT', 6, 'count', CHEAP, str),
+    Column('cpu', 'CPU%', 7, 'cpu_percent', CHEAP, _percent),
+    Column('cpu_p50', 'P50', 6, 'cpu_p50', CHEAP, _percent),
+    Column('cpu_p95', 'P95', 6, 'cpu_p95', CHEAP, _percent),
+    Column('mem', 'MEM%', 7, 'memory_percent', CHEAP, _percent),
+    Column('rss', 'RSS', 9, 'rss', CHEAP, _size),
+    Column('threads', 'THR', 5, 'num_threads', CHEAP, str),
+    # Read from the cgroup itself (see process_viewer.cgroups)
+    Column('memory', 'MEMORY', 9, 'memory', CHEAP, _size),
+    Column('io_read', 'READ/s', 11, 'io_read_rate', CHEAP, _rate),
+    Column('io_write', 'WRITE/s', 11, 'io_write_rate', CHEAP, _rate),
+    Column('name', 'GROUP', 0, 'name', CHEAP, str, align='<', numeric=False),
+)}
+
+DEFAULT_GROUP_COLUMNS = ('count', 'cpu', 'cpu_p50', 'cpu_p95', 'mem', 'rss', 'threads', 'name')
+
+# Grouped by cgroup or pod, CPU and memory are the cgroup's own accounting,
+# which includes exited members and page cache
+CGROUP_GROUP_COLUMNS = ('count', 'cpu', 'cpu_p95', 'mem', 'memory', 'io_read', 'io_write', 'name')
+
+
+def parse_columns(spec: str) -> Tuple[str, ...]:
+    """Parse a comma separated --columns value, rejecting unknown columns"""
+    names = tuple(name.strip() for name in spec.split(',') if name.strip())
+    unknown = [name for name in names if name not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}. Available: {', '.join(COLUMNS)}")
+    return names or DEFAULT_COLUMNS
+
+
+def column_fields(names: Iterable[str], cost: int) -> Tuple[str, ...]:
+    """Return the fields of the named columns that have the given cost"""
+    return tuple(COLUMNS[name].field for name in names if name in COLUMNS and COLUMNS[name].cost == cost)
+
+
+# Fields provided by the collector's bookkeeping rather than read per process
+BOOKKEEPING_FIELDS = ('data_age',)
+
+
+def static_fields() -> Tuple[str, ...]:
+    """Fields whose values are fixed for the lifetime of a process"""
+    return tuple(column.field for column in COLUMNS.values() if column.static)
+
+
+def column_widths(names: Sequence[str], width: int, registry: Dict[str, Column] = COLUMNS) -> List[int]:
+    """Return the display width of each column; the last one takes the remaining space"""
+    widths = [registry[name].width or 30 for name in names]
+    if widths:
+        widths[-1] = max(widths[-1], width - sum(widths[:-1]) - len(widths) + 1)
+    return widths
+
+
+def _align(column: Column, text: str, width: int) -> str:
+    text = text[:width]
+    return f"{text:>{width}}" if column.align == '>' else f"{text:<{width}}"
+
+
+def format_header(names: Sequence[str], widths: Sequence[int], registry: Dict[str, Column] = COLUMNS) -> str:
+    return " ".join(_align(registry[name], registry[name].title, width) for name, width in zip(names, widths))
+
+
+def format_row(names: Sequence[str], widths: Sequence[int], record: Dict, extra: Dict, name_prefix: str = "",
+               registry: Dict[str, Column] = COLUMNS) -> str:
+    """
+    Lay out one table row
+
+    Args:
+        names, widths: Column names in display order and their widths
+        record: Process record; fields missing from it are looked up in extra
+        extra: Lazily fetched fields for the process
+        name_prefix: Tree indentation put in front of the name
+        registry: Column registry the names refer to
+    """
+    cells = []
+    for name, width in zip(names, widths):
+        column = registry[name]
+        value = record.get(column.field)
+        if value is None:
+            value = extra.get(column.field)
+        text = "-" if value is None else column.format(value)
+        if name == 'name':
+            text = name_prefix + text
+        cells.append(_align(column, text, width))
+    return " ".join(cells)
@@ -0,0 +1,186 @@
+"""
+Per-core CPU usage.
+
+CpuStat reads /proc/stat once per tick and turns the cumulative tick counters
+of every `cpuN` line into per-core busy percentages, plus one percentage per
+NUMA node and one for the whole machine. The counters are parsed column-wise
+(every core's user ticks, then every core's nice ticks, ...) and combined with
+map() over whole columns, so the cost per tick does not involve a Python loop
+over the cores.
+
+The same read also picks up the context switch, interrupt and runnable task
+counters further down the file (see CpuStat.counters).
+
+NUMA nodes come from /sys/devices/system/node/node*/cpulist; machines without
+that directory are treated as a single node. Where /proc/stat is not
+available, psutil.cpu_percent(percpu=True) is used instead.
+"""
+
+import glob
+import os
+from itertools import repeat
+from operator import add, itemgetter, mul, sub, truediv
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import psutil
+
+PROC_STAT = '/proc/stat'
+NODE_ROOT = '/sys/devices/system/node'
+
+# Columns of a cpu line after the label: user nice system idle iowait irq
+# softirq steal guest guest_nice. Guest time is already included in user.
+BUSY_COLUMNS = (0, 1, 2, 5, 6, 7)
+IDLE_COLUMNS = (3, 4)
+
+# Other /proc/stat lines kept in CpuStat.counters; only the first number of
+# the intr line (the total) is used
+STAT_COUNTERS = (b'ctxt', b'intr', b'procs_running', b'procs_blocked')
+
+
+class CpuSample(NamedTuple):
+    """CPU usage since the previous sample, in percent."""
+    total: float
+    cores: List[float]    # Per core, in the order of CpuStat.cpus (grouped by node)
+    nodes: List[float]    # Per NUMA node, in the order of CpuStat.nodes
+
+
+def parse_cpulist(text: str) -> List[int]:
+    """Parse a kernel cpulist such as '0-3,8-11' into CPU numbers"""
+    cpus = []
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def read_numa_nodes(root: str = NODE_ROOT) -> List[List[int]]:
+    """Return the CPU numbers of every NUMA node, or [] when the system exposes none"""
+    nodes = []
+    for path in glob.glob(os.path.join(root, 'node[0-9]*')):
+        try:
+            with open(os.path.join(path, 'cpulist')) as f:
+                cpus = parse_cpulist(f.read())
+        except (OSError, ValueError):
+            continue
+        if cpus:
+            nodes.append((int(os.path.basename(path)[4:]), cpus))
+    return [cpus for _, cpus in sorted(nodes)]
+
+
+class CpuStat:
+    """Per-core and per-node CPU usage from one /proc/stat read per sample."""
+
+    def __init__(self, proc_stat: str = PROC_STAT, node_root: str = NODE_ROOT):
+        """
+        Args:
+            proc_stat: Path of /proc/stat; a fake file can be passed for testing
+            node_root: Directory holding the nodeN/cpulist files
+        """
+        self.proc_stat = proc_stat
+        self.node_root = node_root
+        self.use_procfs = os.path.exists(proc_stat)
+        self.cpus: List[int] = []                    # CPU number of each core position
+        self.nodes: List[List[int]] = []             # CPU numbers per NUMA node
+        self.node_spans: List[Tuple[int, int]] = []  # Core positions [start, end) of each node
+        self._labels = None                          # cpu line labels the layout was built for
+        self._order = None                           # Reorders /proc/stat lines into node order
+        self._previous = None                        # (total busy, total idle, busy per core, idle per core)
+        self.counters: Dict[str, int] = {}           # STAT_COUNTERS values from the latest read
+
+    def _layout(self, labels: List[bytes]):
+        """Lay out core positions node by node after the set of online CPUs changed"""
+        self._labels = labels
+        online = [int(label[3:]) for label in labels]
+        line = {cpu: index for index, cpu in enumerate(online)}
+        nodes = [[cpu for cpu in node if cpu in line] for node in read_numa_nodes(self.node_root)]
+        nodes = [node for node in nodes if node]
+        placed = {cpu for node in nodes for cpu in node}
+        unplaced = [cpu for cpu in online if cpu not in placed]
+        if unplaced:
+            nodes.append(unplaced)
+        self.nodes = nodes
+        self.cpus = [cpu for node in nodes for cpu in node]
+        self.node_spans = []
+        start = 0
+        for node in nodes:
+            self.node_spans.append((start, start + len(node)))
+            start += len(node)
+        order = [line[cpu] for cpu in self.cpus]
+        self._order = itemgetter(*order) if len(order) > 1 and order != sorted(order) else None
+        self._previous = None
+
+    def _read_counters(self):
+        """Return (total busy, total idle, busy per core, idle per core) tick counters"""
+        with open(self.proc_stat, 'rb') as f:
+            data = f.read()
+        lines = data.split(b'\n')
+        # The aggregate line comes first, followed by one line per online CPU
+        end = 1
+        while end < len(lines) and lines[end].startswith(b'cpu'):
+            end += 1
+        total = lines[0].split()[1:]
+        busy_total = sum(int(total[column]) for column in BUSY_COLUMNS if column < len(total))
+        idle_total = sum(int(total[column]) for column in IDLE_COLUMNS)
+        counters = {}
+        for line in lines[end:]:
+            name, _, rest = line.partition(b' ')
+            if name in STAT_COUNTERS:
+                counters[name.decode()] = int(rest.split(None, 1)[0])
+        self.counters = counters
+
+        tokens = b' '.join(lines[1:end]).split()
+        stride = len(total) + 1
+        labels = tokens[::stride]
+        if labels != self._labels:
+            self._layout(labels)
+        columns = [tokens[column + 1::stride] for column in range(stride - 1)]
+        busy = list(map(int, columns[0]))
+        for column in BUSY_COLUMNS[1:]:
+            if column < len(columns):
+                busy = list(map(add, busy, map(int, columns[column])))
+        idle = list(map(add, map(int, columns[IDLE_COLUMNS[0]]), map(int, columns[IDLE_COLUMNS[1]])))
+        if self._order is not None:
+            busy, idle = list(self._order(busy)), list(self._order(idle))
+        return busy_total, idle_total, busy, idle
+
+    def sample(self) -> Optional[CpuSample]:
+        """
+        Return usage since the previous call, or None on the first call (and
+        after the set of online CPUs changed), which only primes the counters
+        """
+        if not self.use_procfs:
+            return self._sample_psutil()
+        counters = self._read_counters()
+        previous, self._previous = self._previous, counters
+        if previous is None:
+            return None
+
+        busy_total = counters[0] - previous[0]
+        elapsed_total = busy_total + counters[1] - previous[1]
+        busy = list(map(sub, counters[2], previous[2]))
+        elapsed = list(map(add, busy, map(sub, counters[3], previous[3])))
+        cores = list(map(mul, map(truediv, busy, map(max, elapsed, repeat(1))), repeat(100.0)))
+        nodes = [100.0 * sum(busy[start:end]) / max(1, sum(elapsed[start:end])) for start, end in self.node_spans]
+        return CpuSample(100.0 * busy_total / max(1, elapsed_total), cores, nodes)
+
+    @property
+    def boot_percent(self) -> Optional[float]:
+        """Average usage since boot according to the latest read, if any"""
+        if self._previous is None:
+            return None
+        busy, idle = self._previous[0], self._previous[1]
+        return 100.0 * busy / max(1, busy + idle)
+
+    def _sample_psutil(self) -> Optional[CpuSample]:
+        stats = psutil.cpu_stats()
+        self.counters = {'ctxt': stats.ctx_switches, 'intr': stats.interrupts}
+        cores = psutil.cpu_percent(interval=0, percpu=True)
+        if len(cores) != len(self.cpus):
+            self.cpus = list(range(len(cores)))
+            self.nodes = [list(self.cpus)]
+            self.node_spans = [(0, len(cores))]
+            return None
+        total = sum(cores) / len(cores) if cores else 0.0
+        return CpuSample(total, cores, [total])
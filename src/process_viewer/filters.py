@@ -0,0 +1,124 @@
+"""
+Compiled process filters.
+
+compile_filter() turns the filter settings into a single predicate once, when
+the settings change, instead of re-deriving them for every row on every tick.
+Cheap checks run before expensive ones, the search term is lowercased and
+compiled once, and the user filter compares numeric uids collected alongside
+the other fields rather than asking psutil for each process's username.
+
+Search syntax:
+    text        Case-insensitive substring of the name, or an exact PID
+    a*b?[cd]    Shell-style glob matched against the whole name
+    re:PATTERN  Regular expression searched in the name
+    cmd:...     Match against the full command line instead of the name;
+                the rest of the term follows the rules above
+"""
+
+import fnmatch
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from process_viewer.utils import uid_for_username
+
+GLOB_CHARS = frozenset('*?[')
+
+Predicate = Callable[[Dict], bool]
+
+
+def _all_of(predicates: List[Predicate]) -> Predicate:
+    """Combine predicates into one short-circuiting closure"""
+    if not predicates:
+        return lambda p: True
+    combined = predicates[-1]
+    for predicate in reversed(predicates[:-1]):
+        combined = (lambda first, rest: lambda p: first(p) and rest(p))(predicate, combined)
+    return combined
+
+
+def _text_matcher(term: str) -> Tuple[Callable[[str], bool], bool]:
+    """
+    Build a matcher for lowercased text
+
+    Returns:
+        The matcher and whether the term is a plain substring search
+    """
+    if term.startswith('re:'):
+        try:
+            pattern = re.compile(term[3:], re.IGNORECASE)
+        except re.error:
+            return (lambda text: False), False
+        return (lambda text: pattern.search(text) is not None), False
+    if GLOB_CHARS & set(term):
+        pattern = re.compile(fnmatch.translate(term.lower()))
+        return (lambda text: pattern.match(text) is not None), False
+    needle = term.lower()
+    return (lambda text: needle in text), True
+
+
+def _search_predicate(search_term: str) -> Tuple[Predicate, Tuple[str, ...]]:
+    """Build the predicate for the search box and the extra fields it needs"""
+    if search_term.startswith('cmd:'):
+        matcher, _ = _text_matcher(search_term[4:])
+        # ProcessTable records carry the command line lowercased once per process
+        return (lambda p: matcher(p.get('cmdline_lower') or p.get('cmdline', '').lower())), ('cmdline',)
+
+    matcher, plain = _text_matcher(search_term)
+    if plain and search_term.isdigit():
+        pid = int(search_term)
+        return (lambda p: p['pid'] == pid or matcher(p.get('name_lower') or p['name'].lower())), ()
+    return (lambda p: matcher(p.get('name_lower') or p['name'].lower())), ()
+
+
+class ProcessFilter:
+    """
+    A set of filter settings compiled into a single-pass predicate.
+
+    Attributes:
+        fields: Collector fields the predicate needs in addition to the basics
+        active: Whether any filter is set at all
+    """
+
+    def __init__(self, search_term="", status=None, min_cpu=None, min_memory=None, user_filter=None):
+        self.key = (search_term, status, min_cpu, min_memory, user_filter)
+        predicates = []
+        fields = set()
+
+        # Cheapest checks first so most rows are rejected early
+        if status:
+            predicates.append(lambda p: p['status'] == status)
+        if min_cpu is not None:
+            predicates.append(lambda p: p['cpu_percent'] >= min_cpu)
+        if min_memory is not None:
+            predicates.append(lambda p: p['memory_percent'] >= min_memory)
+        if user_filter is not None:
+            uid = uid_for_username(user_filter)
+            predicates.append(lambda p: p.get('uid', -1) == uid)
+            fields.add('uid')
+        if search_term:
+            predicate, search_fields = _search_predicate(search_term)
+            predicates.append(predicate)
+            fields.update(search_fields)
+
+        self.active = bool(predicates)
+        self.fields: Tuple[str, ...] = tuple(sorted(fields))
+        self.predicate = _all_of(predicates)
+
+    def __call__(self, process: Dict) -> bool:
+        return self.predicate(process)
+
+    def apply(self, processes: Iterable[Dict]) -> List[Dict]:
+        """Return the processes matching every filter, in one pass"""
+        if not self.active:
+            return processes if isinstance(processes, list) else list(processes)
+        predicate = self.predicate
+        return [p for p in processes if predicate(p)]
+
+
+def compile_filter(search_term="", status=None, min_cpu=None, min_memory=None,
+                   user_filter=None, previous: Optional[ProcessFilter] = None) -> ProcessFilter:
+    """Compile filter settings, reusing previous when the settings are unchanged"""
+    key = (search_term, status, min_cpu, min_memory, user_filter)
+    if previous is not None and previous.key == key:
+        return previous
+    return ProcessFilter(*key)
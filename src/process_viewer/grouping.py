@@ -0,0 +1,250 @@
+"""
+Process grouping.
+
+ProcessGroups folds the process table into one row per group of processes
+that share a name, an owner, a parent, a cgroup (systemd unit or container
+scope) or a Kubernetes pod, with the member count and the summed CPU,
+memory, RSS and threads. Four hundred identical workers become one row that
+says what the pool uses. The keys of the cgroup and pod modes are cgroup
+paths, so their rows can be given the cgroup's own accounting instead (see
+ProcessManager.group_processes()).
+
+Groups follow the table incrementally: like ProcessTree, sync() applies the
+TableDelta of consecutive generations (an exit subtracts the process's
+contribution, a birth adds it, an update swaps old for new) and only falls
+back to a single pass over all records after skipped ticks or a change of
+mode or filter. CPU percentiles need the members' values, so they are only
+computed for the rows on screen, through fetch_percentiles().
+"""
+
+import math
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from process_viewer.utils import username_for_uid
+
+GROUP_MODES = ('name', 'user', 'parent', 'cgroup', 'pod')
+
+# Record fields each mode needs beyond the basic ones
+GROUP_FIELDS = {
+    'name': (),
+    'user': ('uid',),
+    'parent': (),
+    'cgroup': ('cgroup',),
+    'pod': ('cgroup',),
+}
+
+# Modes whose group keys are cgroup paths, see process_viewer.cgroups
+CGROUP_MODES = ('cgroup', 'pod')
+
+# Fields summed per group
+SUMMED_FIELDS = ('cpu_percent', 'memory_percent', 'rss', 'num_threads')
+
+# systemd units a cgroup path is labelled with, innermost first
+UNIT_SUFFIXES = ('.service', '.scope', '.slice')
+
+# Container runtime scope prefixes and the name they are shown with
+CONTAINER_PREFIXES = (('docker-', 'docker'), ('cri-containerd-', 'containerd'), ('crio-', 'cri-o'),
+                      ('libpod-', 'podman'))
+
+
+def cgroup_unit(path: str) -> str:
+    """Cut a cgroup path after its innermost systemd unit (service, container scope, slice)"""
+    parts = path.split('/')
+    for index in range(len(parts) - 1, 0, -1):
+        if parts[index].endswith(UNIT_SUFFIXES):
+            return '/'.join(parts[:index + 1])
+    return path or "/"
+
+
+def cgroup_pod(path: str) -> str:
+    """Cut a cgroup path after its Kubernetes pod slice, or after its innermost unit outside pods"""
+    parts = path.split('/')
+    for index in range(1, len(parts)):
+        if '-pod' in parts[index] and parts[index].endswith('.slice'):
+            return '/'.join(parts[:index + 1])
+    return cgroup_unit(path)
+
+
+def cgroup_label(path: str) -> str:
+    """Short name of a cgroup: runtime and container id, pod uid, or unit name"""
+    name = path.rsplit('/', 1)[-1]
+    if not name:
+        return "/"
+    stem = name.rsplit('.', 1)[0] if name.endswith(UNIT_SUFFIXES) else name
+    for prefix, runtime in CONTAINER_PREFIXES:
+        if stem.startswith(prefix):
+            return f"{runtime}:{stem[len(prefix):][:12]}"
+    if '-pod' in stem and name.endswith('.slice'):
+        return "pod:" + stem.rsplit('-pod', 1)[1].replace('_', '-')
+    return name
+
+
+def group_key_function(mode: str) -> Callable[[Dict], object]:
+    """Return the function mapping a record to its group key under mode"""
+    if mode == 'name':
+        return lambda p: p['name']
+    if mode == 'user':
+        # Every backend collects uid, not all of them username; names are only for labels
+        return lambda p: p.get('uid')
+    if mode == 'parent':
+        return lambda p: p['ppid']
+    if mode == 'cgroup':
+        return lambda p: cgroup_unit(p.get('cgroup') or "")
+    if mode == 'pod':
+        return lambda p: cgroup_pod(p.get('cgroup') or "")
+    raise ValueError(f"Unknown group mode: {mode}")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, math.ceil(q / 100 * len(values)) - 1))
+    return values[index]
+
+
+class ProcessGroups:
+    """Per-group counts and sums kept up to date from table deltas."""
+
+    def __init__(self):
+        self.mode: Optional[str] = None
+        self.sums: Dict[object, List[float]] = {}     # key -> [count, *SUMMED_FIELDS sums]
+        self.members: Dict[object, set] = {}          # key -> member pids
+        self._contributions: Dict[int, Tuple] = {}     # pid -> (key, summed values)
+        self._key = None
+        self._generation = None
+        self._filter_key = None
+
+    def set_mode(self, mode: Optional[str]):
+        """Group by mode (one of GROUP_MODES), or stop grouping with None"""
+        if mode != self.mode:
+            self.mode = mode
+            self._key = group_key_function(mode) if mode is not None else None
+            self._generation = None  # Forces a rebuild on the next sync
+
+    def _add(self, record: Dict, process_filter):
+        if process_filter is not None and not process_filter(record):
+            return
+        key = self._key(record)
+        values = tuple(record.get(field) or 0 for field in SUMMED_FIELDS)
+        sums = self.sums.get(key)
+        if sums is None:
+            sums = self.sums[key] = [0] * (len(SUMMED_FIELDS) + 1)
+            self.members[key] = set()
+        sums[0] += 1
+        for index, value in enumerate(values, 1):
+            sums[index] += value
+        self.members[key].add(record['pid'])
+        self._contributions[record['pid']] = (key, values)
+
+    def _remove(self, pid: int):
+        contribution = self._contributions.pop(pid, None)
+        if contribution is None:
+            return
+        key, values = contribution
+        sums = self.sums[key]
+        sums[0] -= 1
+        if not sums[0]:
+            # Dropping empty groups also drops accumulated rounding error
+            del self.sums[key]
+            del self.members[key]
+            return
+        for index, value in enumerate(values, 1):
+            sums[index] -= value
+        self.members[key].discard(pid)
+
+    def rebuild(self, records: Mapping[int, Dict], process_filter=None):
+        """Regroup all records in a single pass"""
+        self.sums = {}
+        self.members = {}
+        self._contributions = {}
+        for record in records.values():
+            self._add(record, process_filter)
+
+    def apply(self, delta, process_filter=None):
+        """Fold one TableDelta into the groups"""
+        for record in delta.removed:
+            self._remove(record['pid'])
+        for record in delta.added:
+            self._remove(record['pid'])
+            self._add(record, process_filter)
+        for record in delta.updated:
+            self._remove(record['pid'])
+            self._add(record, process_filter)
+
+    def sync(self, records: Mapping[int, Dict], delta=None, generation: Optional[int] = None, process_filter=None):
+        """
+        Bring the groups up to date with records
+
+        The delta is applied only when generation directly follows the last
+        synced one and the filter is unchanged; otherwise the groups are rebuilt.
+
+        Args:
+            process_filter: ProcessFilter members must match, or None
+        """
+        if self.mode is None:
+            return
+        filter_key = process_filter.key if process_filter is not None and process_filter.active else None
+        active_filter = process_filter if filter_key is not None else None
+        if generation is not None and generation == self._generation and filter_key == self._filter_key:
+            return
+        if (delta is not None and generation is not None and self._generation is not None
+                and generation == self._generation + 1 and filter_key == self._filter_key):
+            self.apply(delta, active_filter)
+        else:
+            self.rebuild(records, active_filter)
+        self._generation = generation
+        self._filter_key = filter_key
+
+    def _label(self, key, records: Mapping[int, Dict]) -> str:
+        if self.mode == 'parent':
+            parent = records.get(key)
+            return f"{parent['name']} ({key})" if parent is not None else f"? ({key})"
+        if self.mode in CGROUP_MODES:
+            return cgroup_label(key)
+        if self.mode == 'user':
+            return username_for_uid(key) if key is not None else "?"
+        return str(key)
+
+    def rows(self, records: Mapping[int, Dict], sort_by: str = 'cpu', extra: Optional[Dict] = None) -> List[Dict]:
+        """
+        Return one record-like dict per group, ordered by sort_by
+
+        Rows carry the group key under 'pid', so fetch_percentiles() can serve
+        as the fetch_columns hook of the process list.
+
+        Args:
+            extra: Optional group key -> fields overriding the summed values
+                before sorting
+        """
+        rows = []
+        for key, sums in self.sums.items():
+            row = {'pid': key, 'group': key, 'name': self._label(key, records), 'count': sums[0],
+                   'status': ""}
+            for index, field in enumerate(SUMMED_FIELDS, 1):
+                row[field] = max(0, sums[index])
+            if extra and key in extra:
+                row.update(extra[key])
+            rows.append(row)
+        if sort_by == 'name':
+            rows.sort(key=lambda row: row['name'].lower())
+        elif sort_by == 'pid':
+            rows.sort(key=lambda row: row['count'], reverse=True)
+        else:
+            field = {'mem': 'memory_percent', 'rss': 'rss', 'threads': 'num_threads'}.get(sort_by, 'cpu_percent')
+            rows.sort(key=lambda row: row.get(field) or 0, reverse=True)
+        return rows
+
+    def fetch_percentiles(self, records: Mapping[int, Dict], rows: List[Dict]) -> Dict[object, Dict]:
+        """Return group key -> {'cpu_p50', 'cpu_p95'} for the given rows only"""
+        result = {}
+        for row in rows:
+            members = self.members.get(row['group'], ())
+            values = sorted(records[pid]['cpu_percent'] for pid in members if pid in records)
+            result[row['group']] = {'cpu_p50': percentile(values, 50), 'cpu_p95': percentile(values, 95)}
+        return result
+
+    def member_records(self, key, records: Mapping[int, Dict]) -> Dict[int, Dict]:
+        """Return pid -> record for the members of a group"""
+        return {pid: records[pid] for pid in self.members.get(key, ()) if pid in records}
+
@@ -1,5 +1,15 @@
 import curses
 
+from process_viewer.columns import COLUMNS
+from process_viewer.grouping import GROUP_MODES
+from process_viewer.process_actions import ESCALATE_AFTER, SIGNALS
+
+# Keys that move through time instead of their usual action while replaying
+REPLAY_KEYS = (ord(','), ord('.'), ord('<'), ord('>'), curses.KEY_HOME, curses.KEY_END, ord(' '), ord('x'))
+
+# Targets of the signal menu, by key
+SIGNAL_SCOPES = {ord('1'): 'selected', ord('2'): 'subtree', ord('3'): 'filter', ord('4'): 'marked'}
+
 def handle_input(key, state):
     selected_idx = state['selected_idx']
     process_count = state['process_count']
@@ -13,18 +23,67 @@ def handle_input(key, state):
     if process_count > 0 and selected_idx >= 0:
         current_process = state.get('processes', [])[selected_idx] if state.get('processes') else None
 
+    replay = state.get('replay')
+    state['status_message'] = ""
+
+    # Time travel through a replayed capture
+    if input_mode == 'normal' and replay is not None and key in REPLAY_KEYS:
+        if key == ord(','):
+            replay.step(-1)
+        elif key == ord('.'):
+            replay.step(1)
+        elif key == ord('<'):
+            replay.seek_time(replay.reader.timestamp(replay.position) - 60)
+        elif key == ord('>'):
+            replay.seek_time(replay.reader.timestamp(replay.position) + 60)
+        elif key == curses.KEY_HOME:
+            replay.seek(0)
+        elif key == curses.KEY_END:
+            replay.seek(len(replay.reader) - 1)
+        elif key == ord(' '):
+            replay.toggle_play()
+        elif key == ord('x'):
+            state['status_message'] = "Processes in a replay cannot be signalled"
+
     # Navigation
-    if input_mode == 'normal':
+    elif input_mode == 'normal':
         if key == curses.KEY_UP and selected_idx > 0:
             state['selected_idx'] = selected_idx - 1
         elif key == curses.KEY_DOWN and selected_idx < process_count - 1:
             state['selected_idx'] = selected_idx + 1
         elif key == ord('\n'):  # Enter key
-            if current_process:
+            if current_process and 'group' in current_process:
+                # Drill into the group's member processes
+                state['group_focus'] = current_process['group']
+                state['group_focus_name'] = current_process['name']
+                state['selected_idx'] = 0
+            elif current_process:
                 state['input_mode'] = 'details'
+        elif key == ord(' ') and current_process:
+            # Mark or unmark for a batched signal; a group row (un)marks its members
+            marked = state['marked']
+            if 'group' in current_process:
+                pids = state['process_manager'].groups.members.get(current_process['group'], set())
+            else:
+                pids = {current_process['pid']}
+            if pids <= marked:
+                marked -= pids
+            else:
+                marked |= pids
+            state['selected_idx'] = min(selected_idx + 1, process_count - 1)
+        elif key == ord('u'):
+            state['marked'].clear()
         elif key == ord('x'):
-            if current_process:
-                state['input_mode'] = 'confirm_terminate'
+            if state.get('signal_batch') is not None:
+                state['status_message'] = "Wait for the running signal batch to finish"
+            elif current_process or state['marked']:
+                # Keep the row the menu was opened on, the list may reorder meanwhile
+                state['signal_selected'] = current_process
+                state['signal_scope'] = 'marked' if state['marked'] else 'selected'
+                state['input_mode'] = 'signal_menu'
+        elif key in (curses.KEY_LEFT, curses.KEY_BACKSPACE, 127) and state.get('group_focus') is not None:
+            state['group_focus'] = None
+            state['selected_idx'] = 0
         
         # Quit
         elif key in (ord('q'), ord('Q')):
@@ -37,7 +96,10 @@ def handle_input(key, state):
         
         # Sort modes
         elif key in (ord('s'), ord('S')):
-            sort_options = ['cpu', 'mem', 'pid', 'name']
+            sort_options = ['cpu', 'mem', 'pid', 'name', 'cpu_avg', 'cpu_peak']
+            # Any other visible column can be sorted on as well
+            sort_options += [c for c in state['process_manager'].columns
+                             if c not in sort_options and COLUMNS[c].sortable]
             current_idx = sort_options.index(sort_by if sort_by in sort_options else sort_options[0])
             state['sort_by'] = sort_options[(current_idx + 1) % len(sort_options)]
         
@@ -49,6 +111,36 @@ def handle_input(key, state):
         elif key == ord('t'):
             state['tree_view'] = not state['tree_view']
             state['selected_idx'] = 0  # Reset selection when switching views
+        elif key == ord('g'):
+            # Cycle through the grouping modes and back to the plain list
+            modes = (None,) + GROUP_MODES
+            current = state.get('group_by')
+            state['group_by'] = modes[(modes.index(current) + 1) % len(modes)] if current in modes else None
+            state['group_focus'] = None
+            state['selected_idx'] = 0
+        
+        # Collapse/expand subtrees in tree view
+        elif key == curses.KEY_LEFT and state['tree_view']:
+            if current_process:
+                state['process_manager'].tree.collapse(current_process['pid'])
+        elif key == curses.KEY_RIGHT and state['tree_view']:
+            if current_process:
+                state['process_manager'].tree.expand(current_process['pid'])
+        elif key == ord('e') and state['tree_view']:
+            state['process_manager'].tree.expand_all()
+        
+        # Graph style
+        elif key == ord('b'):
+            state['graph_mode'] = 'braille' if state.get('graph_mode') == 'block' else 'block'
+        elif key == ord('z'):
+            resolutions = state.get('graph_resolutions', (1,))
+            current = state.get('graph_resolution', resolutions[0])
+            next_idx = (resolutions.index(current) + 1) % len(resolutions) if current in resolutions else 0
+            state['graph_resolution'] = resolutions[next_idx]
+        elif key == ord('h'):
+            state['cpu_view'] = 'cores' if state.get('cpu_view') == 'total' else 'total'
+        elif key == ord('p'):
+            state['show_timings'] = not state.get('show_timings')
     
     # Search input mode
     elif input_mode == 'search':
@@ -122,12 +214,29 @@ def handle_input(key, state):
         if key in (27, ord('q')):  # ESC or 'q'
             state['input_mode'] = 'normal'
     
-    # Confirmation dialog mode
-    elif input_mode == 'confirm_terminate':
-        if key == ord('y'):
-            if current_process:
-                success, message = state['process_manager'].terminate_process(current_process['pid'])
-                state['status_message'] = message
+    # Signal menu: pick targets and signal, then send as one batch
+    elif input_mode == 'signal_menu':
+        if key in SIGNAL_SCOPES:
+            state['signal_scope'] = SIGNAL_SCOPES[key]
+        elif key in (curses.KEY_LEFT, curses.KEY_RIGHT):
+            step = 1 if key == curses.KEY_RIGHT else -1
+            state['signal_idx'] = (state['signal_idx'] + step) % len(SIGNALS)
+        elif key == ord('e'):
+            state['signal_escalate'] = not state['signal_escalate']
+        elif key in (ord('\n'), ord('y')):
+            process_manager = state['process_manager']
+            targets = process_manager.signal_targets(state['signal_scope'], state['records'],
+                                                     state['signal_selected'], state['marked'])
+            if targets:
+                batch = process_manager.signal_processes(
+                    targets, SIGNALS[state['signal_idx']][1],
+                    ESCALATE_AFTER if state['signal_escalate'] else None)
+                state['signal_batch'] = batch
+                state['status_message'] = batch.progress()
+                if state['signal_scope'] == 'marked':
+                    state['marked'].clear()
+            else:
+                state['status_message'] = "No processes to signal"
             state['input_mode'] = 'normal'
         elif key in (ord('n'), 27):  # 'n' or ESC
             state['input_mode'] = 'normal'
@@ -0,0 +1,85 @@
+"""
+Partially sorted process lists.
+
+The process list only ever shows a screenful of rows, so fully sorting tens of
+thousands of processes every tick is wasted work. TopKList orders just the
+first k items with a heap selection and extends that ordered prefix on demand
+when rows beyond it are indexed, e.g. when the user scrolls down.
+"""
+
+import heapq
+from collections.abc import Sequence
+from typing import Callable, Dict, List, Optional
+
+
+class TopKList(Sequence):
+    """
+    Read-only sequence that is sorted lazily from the front.
+
+    The ordering is identical to sorted(items, key=key, reverse=reverse):
+    heapq.nlargest/nsmallest keep the same tie order as a stable sort.
+    """
+
+    def __init__(self, items: List[Dict], key: Callable[[Dict], object], reverse: bool = False, k: int = 0):
+        self._items = items
+        self._key = key
+        self._reverse = reverse
+        self._sorted: List[Dict] = []
+        self._ensure(k)
+
+    @property
+    def sorted_count(self) -> int:
+        """Number of leading items that are currently in their final order"""
+        return len(self._sorted)
+
+    def _ensure(self, count: int):
+        """Make sure the first count items are ordered"""
+        total = len(self._items)
+        count = min(count, total)
+        if count <= len(self._sorted):
+            return
+        # Grow geometrically so scrolling doesn't reselect on every row
+        count = min(total, max(count, 2 * len(self._sorted)))
+        if count * 4 >= total:
+            self._sorted = sorted(self._items, key=self._key, reverse=self._reverse)
+        elif self._reverse:
+            self._sorted = heapq.nlargest(count, self._items, key=self._key)
+        else:
+            self._sorted = heapq.nsmallest(count, self._items, key=self._key)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self._items))
+            self._ensure(max(start, stop))
+            return self._sorted[index]
+        if index < 0:
+            index += len(self._items)
+        if not 0 <= index < len(self._items):
+            raise IndexError("TopKList index out of range")
+        self._ensure(index + 1)
+        return self._sorted[index]
+
+    def __iter__(self):
+        self._ensure(len(self._items))
+        return iter(self._sorted)
+
+
+def sorted_window(items: List[Dict], key: Optional[Callable[[Dict], object]], reverse: bool, k: Optional[int]):
+    """
+    Order items for display
+
+    Args:
+        items: Records to order; the list may be sorted in place
+        key: Sort key, or None to keep the existing order
+        reverse: Whether to sort in descending order
+        k: Number of leading rows that must be ordered up front, or None to sort fully
+    """
+    if key is None:
+        return items
+    if k is None or k * 4 >= len(items):
+        items.sort(key=key, reverse=reverse)
+        return items
+    return TopKList(items, key, reverse, k)
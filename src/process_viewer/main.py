@@ -14,29 +14,57 @@ The application provides real-time monitoring of system processes with features
 - Process management capabilities
 """
 
+import argparse
 import curses
 import sys
+import time
+from process_viewer.capture import CAPTURE_FIELDS, CaptureReader, CaptureWriter
+from process_viewer.cgroups import CgroupMonitor
+from process_viewer.collectors import create_collector
+from process_viewer.columns import (CGROUP_GROUP_COLUMNS, COLUMNS, DEFAULT_COLUMNS, DEFAULT_GROUP_COLUMNS, GROUP_COLUMNS,
+                                   parse_columns)
+from process_viewer.grouping import CGROUP_MODES
 from process_viewer.process_manager import ProcessManager
+from process_viewer.profiling import PROFILERS, TIMINGS, run_profiled
+from process_viewer.recorder import run_record
+from process_viewer.server import run_serve
+from process_viewer.replay import ReplaySource, record_details
 from process_viewer.ui_components import UserInterface
 from process_viewer.keybindings import handle_input
 from process_viewer.resource_graphs import ResourceHistory
+from process_viewer.sampler import Sampler
+from process_viewer.scheduler import DEFAULT_BUDGET, MAX_INTERVAL, AdaptiveScheduler
+from process_viewer.streaming import DEFAULT_FIELDS, OUTPUT_FORMATS, parse_fields, stream_processes
 
-def main(stdscr):
+def main(stdscr, sample_interval=1.0, render_rate=10.0, collector="auto", capture=None, replay=None,
+         columns=DEFAULT_COLUMNS, cpu_budget=DEFAULT_BUDGET, max_interval=MAX_INTERVAL, cold_ticks=1):
     """
     Main application loop handling the curses interface and application state
 
     Args:
         stdscr: The main curses window object
+        sample_interval: Seconds between process/resource samples
+        render_rate: Maximum screen refreshes per second
+        collector: Process collector backend ('auto', 'procfs' or 'psutil')
+        capture: Capture file every live sample is appended to, if any
+        replay: Capture file to browse instead of the live system, if any
+        columns: Names of the process table columns, see process_viewer.columns
+        cpu_budget: Fraction of one core the viewer may use before sampling
+            less often, or None to always sample every sample_interval
+        max_interval: Longest interval the sampling backs off to
+        cold_ticks: Samples over which the reads of idle processes are spread;
+            above 1 an age column shows how old each row's values are
 
     The function initializes the curses interface, sets up the color scheme,
     manages the application state, and handles the main event loop for user
-    interaction and display updates.
+    interaction and display updates. Sampling runs on a background Sampler
+    thread; this loop only renders its latest snapshot and handles input.
     """
     # Initialize curses interface and configure settings
     curses.start_color()
     curses.use_default_colors()
     curses.curs_set(0)
-    stdscr.timeout(1000)  # Set input timeout for updates
+    stdscr.timeout(max(1, int(1000 / render_rate)))  # Input timeout bounds the render rate
 
     # Initialize color pairs for enhanced purple theme
     curses.init_pair(1, 92, -1)      # Light purple for borders
@@ -52,166 +80,374 @@ def main(stdscr):
         pass
 
     # Initialize components
-    process_manager = ProcessManager()
+    process_manager = ProcessManager(create_collector(collector, cold_ticks))
+    if process_manager.collector.cold_ticks > 1 and 'age' not in columns:
+        columns = columns[:-1] + ('age',) + columns[-1:]
+    process_manager.set_columns(columns)
     ui = UserInterface(stdscr)
-    resource_history = ResourceHistory()
+    capture_writer = None
+    if replay is not None:
+        # The replay source stands in for the sampler
+        sampler = ReplaySource(CaptureReader(replay))
+        process_manager.cgroups = CgroupMonitor(None)  # The live cgroups say nothing about the capture
+    else:
+        resource_history = ResourceHistory()
+        on_sample = None
+        if capture is not None:
+            process_manager.add_base_fields(CAPTURE_FIELDS)
+            capture_writer = CaptureWriter(capture, process_manager.fields)
+            on_sample = lambda snapshot: capture_writer.write(snapshot, resource_history.last_values)
+        scheduler = AdaptiveScheduler(sample_interval, cpu_budget, max_interval)
+        sampler = Sampler(process_manager, resource_history, interval=sample_interval, on_sample=on_sample,
+                          scheduler=scheduler)
+        sampler.sample()  # Have a snapshot ready for the first frame
+        sampler.start()
+    resource_history = sampler.resource_history
     state = {
         'selected_idx': 0,
         'search_term': "",
         'sort_by': "cpu",
         'input_mode': "normal",
         'tree_view': True,
+        'group_by': None,       # Grouping mode, see process_viewer.grouping
+        'group_focus': None,    # Key of the group whose members are shown
+        'group_focus_name': "",
         'filters': {
             'status': None,
             'min_cpu': None,
             'min_memory': None,
             'user_filter': None
         },
+        'graph_mode': "block",
+        'cpu_view': "total",
+        'graph_resolution': resource_history.graph_resolution,
+        'graph_resolutions': resource_history.store.resolutions,
         'process_count': 0,
         'process_manager': process_manager,
         'processes': [],
-        'status_message': ""
+        'status_message': "",
+        'replay': sampler if replay is not None else None,
+        'scheduler': sampler.scheduler if replay is None else None,
+        'records': {},            # pid -> record of the current snapshot
+        'marked': set(),          # PIDs marked for a batched signal
+        'signal_selected': None,  # Row the signal menu was opened on
+        'signal_scope': 'selected',
+        'signal_idx': 0,          # Index into process_actions.SIGNALS
+        'signal_escalate': True,
+        'signal_batch': None,     # Running SignalBatch
+        'show_timings': False,    # Stage timing overlay, see process_viewer.profiling
     }
     running = True
     last_size = stdscr.getmaxyx()
+    view_key = None   # Snapshot and view settings the current process list was built from
+    drawn_key = None  # Process list and selection the screen currently shows
+    dirty = True      # Whether something other than the process list needs redrawing
+
+    try:
+        while running:
+            # Check terminal size
+            size_ok, debug_msg, is_compact = ui.check_terminal_size()
+            if not size_ok:
+                ui.begin_frame()
+                ui.draw_error(debug_msg)
+                ui.end_frame()
+                key = stdscr.getch()
+                if key in (ord('q'), ord('Q')):
+                    running = False
+                dirty = True
+                continue
+            
+            # Handle window resize
+            current_size = stdscr.getmaxyx()
+            if current_size != last_size:
+                curses.resize_term(*current_size)
+                ui.renderer.invalidate()
+                last_size = current_size
+                dirty = True
 
-    while running:
-        # Check terminal size
-        size_ok, debug_msg, is_compact = ui.check_terminal_size()
-        if not size_ok:
-            stdscr.clear()
-            ui.draw_error(debug_msg)
-            stdscr.refresh()
-            key = stdscr.getch()
-            if key in (ord('q'), ord('Q')):
-                running = False
-            continue
-        
-        # Show debug information if enabled
-        if ui.debug_mode:
-            stdscr.addstr(0, 0, debug_msg, curses.color_pair(1))
-            stdscr.refresh()
-
-        # Handle window resize
-        current_size = stdscr.getmaxyx()
-        if current_size != last_size:
-            stdscr.clear()
-            curses.resize_term(*current_size)
-            last_size = current_size
-
-        try:
-            # Get terminal dimensions
-            max_y, max_x = stdscr.getmaxyx()
-
-            # Update process list with error handling
-            try:
-                processes = process_manager.get_processes(state['sort_by'], state['tree_view'])
-                if ui.debug_mode:
-                    print(f"Debug: Retrieved {len(processes)} processes before filtering")
-                
-                processes = process_manager.filter_processes(
-                    processes,
-                    search_term=state['search_term'],
-                    status=state['filters']['status'],
-                    min_cpu=state['filters']['min_cpu'],
-                    min_memory=state['filters']['min_memory'],
-                    user_filter=state['filters']['user_filter']
-                )
-                
-                state['processes'] = processes
-                state['process_count'] = len(processes)
-                
-                if ui.debug_mode:
-                    print(f"Debug: {state['process_count']} processes after filtering")
-
-                # Handle empty process list
-                if not processes:
-                    state['status_message'] = "No processes found matching criteria"
-                    state['selected_idx'] = 0
-                else:
-                    # Ensure selected index is within bounds
-                    state['selected_idx'] = max(0, min(state['selected_idx'], len(processes) - 1))
-            except Exception as e:
-                state['status_message'] = f"Error updating process list: {str(e)}"
-                state['processes'] = []
-                state['process_count'] = 0
-                state['selected_idx'] = 0
-
-            # Draw UI with error handling
             try:
-                stdscr.clear()
-                # Verify terminal size before drawing
-                if max_y < ui.min_height or max_x < ui.min_width:
-                    raise curses.error(f"Terminal too small. Min size: {ui.min_width}x{ui.min_height}")
-                
-                ui.draw_header(max_x)
-                
-                # Update and draw resource graphs with error handling
-                try:
-                    update_success = resource_history.update()
-                    if not update_success:
-                        ui.safe_addstr(ui.header_height + 1, 2, "Failed to update system resources", curses.color_pair(4))
-                        start_y = ui.header_height + 2
+                # Get terminal dimensions
+                max_y, max_x = stdscr.getmaxyx()
+                if replay is not None:
+                    sampler.tick()
+                snapshot = sampler.latest
+                state['records'] = snapshot.processes
+
+                batch = state['signal_batch']
+                if batch is not None:
+                    if batch.poll():
+                        state['status_message'] = batch.summary()
+                        state['signal_batch'] = None
+                    else:
+                        state['status_message'] = batch.progress()
+
+                # Rebuild the process list only when a new snapshot arrived or the view changed
+                new_view_key = (snapshot.seq, state['sort_by'], state['tree_view'], process_manager.tree.version,
+                                state['search_term'], tuple(state['filters'].items()),
+                                state['group_by'], state['group_focus'])
+                if new_view_key != view_key:
+                    view_key = new_view_key
+                    view_started = time.perf_counter()
+                    try:
+                        if snapshot.error:
+                            raise RuntimeError(snapshot.error)
+                        filters = dict(search_term=state['search_term'],
+                                       status=state['filters']['status'],
+                                       min_cpu=state['filters']['min_cpu'],
+                                       min_memory=state['filters']['min_memory'],
+                                       user_filter=state['filters']['user_filter'])
+                        if state['group_by'] is not None:
+                            # Groups follow every snapshot, also while one group's members are shown
+                            groups = process_manager.group_processes(
+                                snapshot.processes, state['group_by'], state['sort_by'],
+                                snapshot.delta, snapshot.seq, **filters)
+                        else:
+                            process_manager.set_group_by(None)
+                        if state['group_by'] is not None and state['group_focus'] is None:
+                            processes = groups
+                        elif state['group_by'] is not None:
+                            processes = process_manager.view_processes(
+                                process_manager.groups.member_records(state['group_focus'], snapshot.processes),
+                                state['sort_by'], False, visible_rows=state['selected_idx'] + 2 * max_y, **filters)
+                        else:
+                            # Only the rows around the selection need ordering up front
+                            processes = process_manager.view_processes(
+                                snapshot.processes, state['sort_by'], state['tree_view'],
+                                snapshot.delta, snapshot.seq,
+                                visible_rows=state['selected_idx'] + 2 * max_y, **filters)
+                        
+                        state['processes'] = processes
+                        state['process_count'] = len(processes)
+                        
+                        if ui.debug_mode:
+                            print(f"Debug: {state['process_count']} processes after filtering")
+
+                        # Handle empty process list
+                        if not processes:
+                            state['status_message'] = "No processes found matching criteria"
+                            state['selected_idx'] = 0
+                        else:
+                            # Ensure selected index is within bounds
+                            state['selected_idx'] = max(0, min(state['selected_idx'], len(processes) - 1))
+                    except Exception as e:
+                        state['status_message'] = f"Error updating process list: {str(e)}"
+                        state['processes'] = []
+                        state['process_count'] = 0
+                        state['selected_idx'] = 0
+                    TIMINGS.record('view', time.perf_counter() - view_started)
+                processes = state['processes']
+
+                # Draw UI with error handling, skipping frames where nothing changed
+                frame_key = (view_key, state['selected_idx'], state['input_mode'], state['status_message'],
+                             len(state['marked']))
+                if dirty or frame_key != drawn_key:
+                    try:
+                        frame_started = time.perf_counter()
+                        ui.begin_frame()
+                        # Verify terminal size before drawing
+                        if max_y < ui.min_height or max_x < ui.min_width:
+                            raise curses.error(f"Terminal too small. Min size: {ui.min_width}x{ui.min_height}")
+                        
+                        ui.draw_header(max_x, sampler.resource_history.metrics.latest if replay is None else None)
+
+                        # Show debug information if enabled
+                        if ui.debug_mode:
+                            ui.safe_addstr(0, 0, debug_msg, ui.color_pair(1))
+                        
+                        # Draw resource graphs with error handling
+                        try:
+                            if not snapshot.resources_ok:
+                                ui.safe_addstr(ui.header_height + 1, 2, "Failed to update system resources", ui.color_pair(4))
+                                start_y = ui.header_height + 2
+                            else:
+                                resource_history = sampler.resource_history
+                                resource_history.graph_mode = state['graph_mode']
+                                resource_history.graph_resolution = state['graph_resolution']
+                                resource_history.cpu_view = state['cpu_view']
+                                with sampler.lock, TIMINGS.stage('graphs'):
+                                    start_y = ui.draw_resource_graphs(resource_history, ui.header_height + 1)
+                        except Exception as e:
+                            ui.safe_addstr(ui.header_height + 1, 2, f"Resource monitoring error: {str(e)}", ui.color_pair(4))
+                            start_y = ui.header_height + 2
+
+                        # Optimize vertical space allocation with debug output
+                        min_process_list_height = 5  # Increased minimum height
+                        remaining_height = max_y - start_y - ui.status_height - ui.help_height
+                        
+                        if ui.debug_mode:
+                            print(f"Debug: max_y={max_y}, start_y={start_y}, remaining_height={remaining_height}")
+                            print(f"Debug: Process count before display: {len(processes)}")
+                        
+                        # Ensure minimum space for process list
+                        if remaining_height < min_process_list_height:
+                            ui.graph_height = max(3, ui.graph_height - (min_process_list_height - remaining_height))
+                            start_y = ui.header_height + (ui.graph_height * 2) + 2  # Recalculate start_y with spacing
+                            remaining_height = max_y - start_y - ui.status_height - ui.help_height
+                            
+                            if ui.debug_mode:
+                                print(f"Debug: Adjusted graph_height={ui.graph_height}, new remaining_height={remaining_height}")
+                        
+                        with TIMINGS.stage('list'):
+                            if state['group_by'] is not None and state['group_focus'] is None:
+                                records = snapshot.processes
+                                ui.draw_process_list(processes, state['selected_idx'], remaining_height, False,
+                                                     CGROUP_GROUP_COLUMNS if state['group_by'] in CGROUP_MODES
+                                                     else DEFAULT_GROUP_COLUMNS,
+                                                     lambda rows: process_manager.groups.fetch_percentiles(records, rows),
+                                                     registry=GROUP_COLUMNS, count_label="groups")
+                            else:
+                                ui.draw_process_list(processes, state['selected_idx'], remaining_height,
+                                                     state['tree_view'] and state['group_by'] is None,
+                                                     process_manager.columns,
+                                                     process_manager.fetch_columns if replay is None else None,
+                                                     marked=state['marked'], tree=process_manager.tree)
+                        ui.draw_status_bar(max_x, state)
+                        ui.draw_help(max_x, replay=replay is not None)
+                        
+                        # Draw filter menu if in filter menu mode
+                        if state['input_mode'] == 'filter_menu':
+                            ui.draw_filter_menu()
+                        elif state['input_mode'] == 'signal_menu':
+                            counts = {scope: len(process_manager.signal_targets(
+                                          scope, snapshot.processes, state['signal_selected'], state['marked']))
+                                      for scope in ('selected', 'subtree', 'filter', 'marked')}
+                            ui.draw_signal_menu(state, counts)
+                        elif state['input_mode'] == 'details' and processes:
+                            selected = processes[state['selected_idx']]
+                            if replay is not None:
+                                details = record_details(selected)
+                            else:
+                                details = process_manager.get_process_details(selected['pid'])
+                            ui.draw_process_details(details, max_x)
+
+                        if state['show_timings']:
+                            ui.draw_timings(TIMINGS.summary(), max_x)
+                        TIMINGS.record('draw', time.perf_counter() - frame_started)
+                        with TIMINGS.stage('output'):
+                            ui.end_frame()
+                        drawn_key = frame_key
+                        dirty = False
+                        
+                    except curses.error as e:
+                        ui.begin_frame()
+                        ui.draw_error(f"Display error: {str(e)}")
+                        ui.end_frame()
+                        dirty = True
+                        continue
+
+                # Handle input
+                key = stdscr.getch()
+                if key != -1:
+                    dirty = True
+                    if state['scheduler'] is not None:
+                        state['scheduler'].interaction()
+                        sampler.wake()
+                    if key == curses.KEY_RESIZE:
+                        continue
+
+                    new_state = handle_input(key, state)
+                    if new_state is None:
+                        running = False
                     else:
-                        start_y = ui.draw_resource_graphs(resource_history, ui.header_height + 1)
-                except Exception as e:
-                    ui.safe_addstr(ui.header_height + 1, 2, f"Resource monitoring error: {str(e)}", curses.color_pair(4))
-                    start_y = ui.header_height + 2
-
-                # Optimize vertical space allocation with debug output
-                min_process_list_height = 5  # Increased minimum height
-                remaining_height = max_y - start_y - ui.status_height - ui.help_height
-                
-                if ui.debug_mode:
-                    print(f"Debug: max_y={max_y}, start_y={start_y}, remaining_height={remaining_height}")
-                    print(f"Debug: Process count before display: {len(processes)}")
-                
-                # Ensure minimum space for process list
-                if remaining_height < min_process_list_height:
-                    ui.graph_height = max(3, ui.graph_height - (min_process_list_height - remaining_height))
-                    start_y = ui.header_height + (ui.graph_height * 2) + 2  # Recalculate start_y with spacing
-                    remaining_height = max_y - start_y - ui.status_height - ui.help_height
-                    
-                    if ui.debug_mode:
-                        print(f"Debug: Adjusted graph_height={ui.graph_height}, new remaining_height={remaining_height}")
-                
-                ui.draw_process_list(processes, state['selected_idx'], remaining_height, state['tree_view'])
-                ui.draw_status_bar(max_x, state)
-                ui.draw_help(max_x)
-                
-                # Draw filter menu if in filter menu mode
-                if state['input_mode'] == 'filter_menu':
-                    ui.draw_filter_menu()
-                
+                        state = new_state
+
             except curses.error as e:
-                stdscr.clear()
+                ui.begin_frame()
                 ui.draw_error(f"Display error: {str(e)}")
-                stdscr.refresh()
+                ui.end_frame()
+                dirty = True
                 continue
+    finally:
+        sampler.stop()
+        if capture_writer is not None:
+            capture_writer.close()
 
-            # Handle input
-            key = stdscr.getch()
-            if key != -1:
-                if key == curses.KEY_RESIZE:
-                    continue
-
-                new_state = handle_input(key, state)
-                if new_state is None:
-                    running = False
-                else:
-                    state = new_state
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(prog="process-viewer", description="Terminal-based process viewer")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="seconds between process samples (default: 1.0)")
+    parser.add_argument("--render-rate", type=float, default=10.0,
+                        help="maximum screen refreshes per second (default: 10)")
+    parser.add_argument("--cpu-budget", type=float, default=DEFAULT_BUDGET * 100, metavar="PERCENT",
+                        help="share of one core the viewer may use before it samples less often; "
+                             f"0 samples every --interval regardless (default: {DEFAULT_BUDGET * 100:g})")
+    parser.add_argument("--max-interval", type=float, default=MAX_INTERVAL,
+                        help=f"longest interval the sampling backs off to (default: {MAX_INTERVAL:g})")
+    parser.add_argument("--cold-ticks", type=int, default=1, metavar="N",
+                        help="read idle processes only every N samples, in turns, and busy, visible and "
+                             "filtered ones every sample (procfs collector; default: 1, read everything)")
+    parser.add_argument("--collector", choices=("auto", "procfs", "psutil"), default="auto",
+                        help="process collector backend (default: auto)")
+    parser.add_argument("--columns", default=",".join(DEFAULT_COLUMNS),
+                        help=f"comma separated process table columns (default: {','.join(DEFAULT_COLUMNS)}; "
+                             f"available: {','.join(COLUMNS)})")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="profile the viewer and write the report to FILE on exit "
+                             "(cProfile binary stats if FILE ends in .prof, text otherwise)")
+    parser.add_argument("--profiler", choices=PROFILERS, default="cprofile",
+                        help="cprofile (UI thread, exact call counts) or sampling (all threads, "
+                             "collapsed stacks for flame graphs) (default: cprofile)")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--capture", metavar="FILE",
+                        help="append every sample to a capture file while viewing")
+    source.add_argument("--replay", metavar="FILE",
+                        help="browse a capture file instead of the live system")
 
-            stdscr.refresh()
+    output = parser.add_argument_group("streaming output", "write the process table to stdout instead of starting the UI")
+    output.add_argument("--output", choices=OUTPUT_FORMATS,
+                        help="write every sample to stdout as JSON Lines or CSV")
+    output.add_argument("--fields", default=",".join(DEFAULT_FIELDS),
+                        help=f"comma separated fields to write (default: {','.join(DEFAULT_FIELDS)})")
+    output.add_argument("--count", type=int, default=None,
+                        help="stop after this many samples (default: run until stopped)")
+    output.add_argument("--sort", choices=("cpu_avg", "cpu_peak") + tuple(COLUMNS), default="cpu",
+                        help="sort order of the rows: a column name, cpu_avg or cpu_peak (default: cpu)")
+    output.add_argument("--limit", type=int, default=None,
+                        help="only write the first N processes of each sample")
+    output.add_argument("--search", default="", help="search term, same syntax as the / search")
+    output.add_argument("--status", default=None, help="only processes with this status, e.g. running")
+    output.add_argument("--min-cpu", type=float, default=None, help="only processes using at least this CPU %%")
+    output.add_argument("--min-memory", type=float, default=None, help="only processes using at least this memory %%")
+    output.add_argument("--user", default=None, help="only processes owned by this user")
 
-        except curses.error as e:
-            stdscr.clear()
-            ui.draw_error(f"Display error: {str(e)}")
-            stdscr.refresh()
-            continue
+    args = parser.parse_args(argv)
+    if args.interval <= 0 or args.render_rate <= 0:
+        parser.error("--interval and --render-rate must be positive")
+    if args.cold_ticks < 1:
+        parser.error("--cold-ticks must be at least 1")
+    if args.cpu_budget < 0 or args.max_interval <= 0:
+        parser.error("--cpu-budget must not be negative and --max-interval must be positive")
+    if args.count is not None and args.count <= 0 or args.limit is not None and args.limit <= 0:
+        parser.error("--count and --limit must be positive")
+    try:
+        args.fields = parse_fields(args.fields)
+        args.columns = parse_columns(args.columns)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
 
-def run():
+def run(argv=None):
     """Entry point for the process viewer application"""
-    return curses.wrapper(main)
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] == "record":
+        return run_record(argv[1:])
+    if argv and argv[0] == "serve":
+        return run_serve(argv[1:])
+    args = parse_args(argv)
+    if args.profile:
+        return run_profiled(_run_mode, args.profile, args.profiler, args)
+    return _run_mode(args)
+
+def _run_mode(args):
+    """Run the UI or the streaming output as chosen by the parsed options"""
+    if args.output:
+        return stream_processes(args.output, args.fields, args.interval, args.count, args.sort, args.limit,
+                                args.collector, search_term=args.search, status=args.status,
+                                min_cpu=args.min_cpu, min_memory=args.min_memory, user_filter=args.user)
+    return curses.wrapper(main, args.interval, args.render_rate, args.collector, args.capture, args.replay,
+                          args.columns, args.cpu_budget / 100 if args.cpu_budget > 0 else None, args.max_interval,
+                          args.cold_ticks)
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,264 @@
+"""
+Batched process signalling.
+
+SignalBatch sends one signal to many processes at once, for fork bombs and
+runaway worker pools that a confirmation per process cannot keep up with.
+Every target is identified by its PID and start time, so a PID that was
+recycled since the sample is reported rather than signalled. Where the
+kernel supports pidfds (Linux 5.3+), the process is pinned with pidfd_open()
+before its start time is checked, which closes the window between the check
+and the kill; elsewhere psutil's own PID reuse check is used.
+
+Processes that survive SIGTERM or SIGINT for escalate_after seconds get
+SIGKILL. Signals go out at most SEND_SLICE per poll(), so a batch of thousands
+never stalls the UI loop that drives it. Once done, every PID has an outcome
+and summary() puts them into one line.
+"""
+
+import os
+import select
+import signal
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Mapping, Optional
+
+import psutil
+
+# Signals offered in the UI, in menu order
+SIGNALS = tuple((name, getattr(signal, 'SIG' + name))
+                for name in ('TERM', 'KILL', 'INT', 'HUP', 'STOP', 'CONT', 'USR1', 'USR2')
+                if hasattr(signal, 'SIG' + name))
+
+# Signals a batch waits on for the targets to exit; the others only report delivery
+TERMINATING = {signal.SIGTERM, signal.SIGINT} | ({signal.SIGKILL} if hasattr(signal, 'SIGKILL') else set())
+
+ESCALATE_AFTER = 5.0   # Seconds before survivors of SIGTERM/SIGINT get SIGKILL
+KILL_WAIT = 2.0        # Seconds to wait for exit after SIGKILL
+SEND_SLICE = 256       # Signals sent per poll()
+START_TOLERANCE = 0.05 # Seconds two start times may differ and still be the same process
+
+HAVE_PIDFD = hasattr(os, 'pidfd_open') and hasattr(signal, 'pidfd_send_signal')
+
+# Per-PID outcomes
+EXITED = 'exited'        # Exited after the signal
+KILLED = 'killed'        # Exited after escalating to SIGKILL
+SENT = 'sent'            # Delivered; the signal is not expected to end the process
+ALIVE = 'alive'          # Still running when the batch gave up waiting
+GONE = 'gone'            # Had already exited
+RECYCLED = 'recycled'    # The PID now belongs to another process
+DENIED = 'denied'
+SKIPPED = 'skipped'      # The viewer itself
+FAILED = 'failed'
+
+# Outcome order in summaries
+OUTCOMES = (EXITED, KILLED, SENT, ALIVE, GONE, RECYCLED, DENIED, SKIPPED, FAILED)
+
+# Outcomes worth listing PIDs for
+PROBLEMS = (ALIVE, RECYCLED, DENIED, FAILED)
+
+
+def signal_name(sig: int) -> str:
+    try:
+        return signal.Signals(sig).name
+    except ValueError:
+        return str(sig)
+
+
+def subtree_pids(records: Mapping[int, Dict], pid: int) -> List[int]:
+    """Return pid and all of its descendants in records, parents first"""
+    children = defaultdict(list)
+    for record in records.values():
+        children[record.get('ppid')].append(record['pid'])
+    result = [pid]
+    for parent in result:  # Grows while iterating: breadth first
+        result.extend(child for child in children.get(parent, ()) if child != parent)
+    return result
+
+
+class SignalBatch:
+    """One signal sent to a set of sampled processes, with optional escalation to SIGKILL."""
+
+    def __init__(self, targets: Iterable[Dict], sig: int = signal.SIGTERM,
+                 escalate_after: Optional[float] = ESCALATE_AFTER):
+        """
+        Args:
+            targets: Process records with 'pid' and, to detect recycled PIDs,
+                'create_time'
+            sig: Signal to send
+            escalate_after: Seconds after which survivors of SIGTERM/SIGINT
+                get SIGKILL, or None to only wait for them that long
+        """
+        self.sig = sig
+        self.escalate_after = escalate_after
+        self.started = time.monotonic()
+        self.names: Dict[int, str] = {}
+        self.outcomes: Dict[int, str] = {}
+        self.errors: Dict[int, str] = {}
+        self._queue: List[Dict] = []
+        seen = set()
+        for record in targets:
+            if record['pid'] not in seen:
+                seen.add(record['pid'])
+                self._queue.append(record)
+                self.names[record['pid']] = record.get('name', "")
+        self._handles: Dict[int, tuple] = {}    # pid -> (pidfd or None, psutil.Process)
+        self._waiting: Dict[int, float] = {}    # pid -> deadline
+        self._killed = set()
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def done(self) -> bool:
+        return not self._queue and not self._waiting
+
+    def _finish(self, pid: int, outcome: str, error: str = ""):
+        self.outcomes[pid] = outcome
+        if error:
+            self.errors[pid] = error
+        self._waiting.pop(pid, None)
+        pidfd = self._handles.pop(pid, (None,))[0]
+        if pidfd is not None:
+            os.close(pidfd)
+
+    def _open(self, record: Dict) -> Optional[str]:
+        """Pin a target and check it is still the sampled process; returns an outcome if not"""
+        pid = record['pid']
+        pidfd = None
+        if HAVE_PIDFD:
+            try:
+                pidfd = os.pidfd_open(pid)
+            except ProcessLookupError:
+                return GONE
+            except OSError:
+                pidfd = None  # Not supported by this kernel or sandbox
+        try:
+            process = psutil.Process(pid)
+            create_time = record.get('create_time')
+            if create_time is not None and abs(process.create_time() - create_time) > START_TOLERANCE:
+                outcome = RECYCLED
+            else:
+                self._handles[pid] = (pidfd, process)
+                return None
+        except psutil.NoSuchProcess:
+            outcome = GONE
+        except psutil.AccessDenied:
+            outcome = DENIED
+        if pidfd is not None:
+            os.close(pidfd)
+        return outcome
+
+    def _send(self, pid: int, sig: int) -> Optional[str]:
+        """Signal an opened target; returns an outcome if that failed"""
+        pidfd, process = self._handles[pid]
+        try:
+            if pidfd is not None:
+                signal.pidfd_send_signal(pidfd, sig)
+            else:
+                process.send_signal(sig)  # Raises NoSuchProcess if the PID was reused
+        except (ProcessLookupError, psutil.NoSuchProcess):
+            return GONE
+        except (PermissionError, psutil.AccessDenied):
+            return DENIED
+        except OSError as e:
+            self.errors[pid] = str(e)
+            return FAILED
+        return None
+
+    def _exited(self) -> List[int]:
+        """Return the waiting PIDs whose process has exited"""
+        exited = []
+        poller = None
+        by_fd = {}
+        for pid in self._waiting:
+            pidfd, process = self._handles[pid]
+            if pidfd is not None:
+                # A pidfd turns readable once its process exits
+                if poller is None:
+                    poller = select.poll()
+                poller.register(pidfd, select.POLLIN)
+                by_fd[pidfd] = pid
+            else:
+                try:
+                    if not process.is_running() or process.status() == psutil.STATUS_ZOMBIE:
+                        exited.append(pid)
+                except psutil.NoSuchProcess:
+                    exited.append(pid)
+        if poller is not None:
+            exited.extend(by_fd[fd] for fd, _ in poller.poll(0))
+        return exited
+
+    def poll(self) -> bool:
+        """
+        Send the next slice of signals, collect exits and escalate overdue
+        targets; returns True once every target has an outcome
+        """
+        now = time.monotonic()
+        wait = self.sig in TERMINATING
+        deadline = now + (KILL_WAIT if self.sig == getattr(signal, 'SIGKILL', None) else
+                          self.escalate_after if self.escalate_after is not None else ESCALATE_AFTER)
+
+        batch, self._queue = self._queue[:SEND_SLICE], self._queue[SEND_SLICE:]
+        for record in batch:
+            pid = record['pid']
+            if pid == os.getpid():
+                self._finish(pid, SKIPPED)
+                continue
+            outcome = self._open(record) or self._send(pid, self.sig)
+            if outcome is not None:
+                self._finish(pid, outcome)
+            elif wait:
+                self._waiting[pid] = deadline
+            else:
+                self._finish(pid, SENT)
+
+        for pid in self._exited():
+            self._finish(pid, KILLED if pid in self._killed else EXITED)
+
+        for pid, pid_deadline in list(self._waiting.items()):
+            if pid_deadline > now:
+                continue
+            if pid in self._killed or self.escalate_after is None or not hasattr(signal, 'SIGKILL') \
+                    or self.sig == signal.SIGKILL:
+                self._finish(pid, ALIVE)
+                continue
+            outcome = self._send(pid, signal.SIGKILL)
+            if outcome is not None:
+                self._finish(pid, EXITED if outcome == GONE else outcome)
+            else:
+                self._killed.add(pid)
+                self._waiting[pid] = now + KILL_WAIT
+        return self.done
+
+    def cancel(self):
+        """Stop sending and waiting; unsent targets are dropped, waiting ones reported alive"""
+        for pid in list(self._waiting):
+            self._finish(pid, ALIVE)
+        for record in self._queue:
+            del self.names[record['pid']]
+        self._queue = []
+
+    def progress(self) -> str:
+        """One line describing a running batch"""
+        sent = len(self) - len(self._queue)
+        text = f"{signal_name(self.sig)}: {sent}/{len(self)} sent"
+        if self._waiting:
+            text += f", {len(self._waiting)} still running"
+            if self._killed:
+                text += f" ({len(self._killed)} sent SIGKILL)"
+        return text
+
+    def summary(self, max_pids: int = 3) -> str:
+        """One line with the count of every outcome and the PIDs of the problem cases"""
+        counts = Counter(self.outcomes.values())
+        parts = []
+        for outcome in OUTCOMES:
+            if not counts[outcome]:
+                continue
+            part = f"{counts[outcome]} {outcome}"
+            if outcome in PROBLEMS:
+                pids = sorted(pid for pid, result in self.outcomes.items() if result == outcome)
+                part += " (" + ", ".join(map(str, pids[:max_pids]))
+                part += f", +{len(pids) - max_pids})" if len(pids) > max_pids else ")"
+            parts.append(part)
+        return f"{signal_name(self.sig)} to {len(self)} processes: " + ", ".join(parts)
@@ -0,0 +1,188 @@
+"""
+Per-process rolling history with bounded memory.
+
+Each tracked process owns a slot holding the last `points` samples of CPU%,
+RSS and IO rate. Slots live in slabs of SLAB_SIZE slots, one preallocated
+float array per metric and slab, so the memory in use grows in fixed steps
+and never exceeds max_processes slots. Slots of exited processes are freed
+immediately; when every slot is taken the least recently updated process is
+evicted.
+
+Writes are driven by ProcessTable deltas, so a tick only touches processes
+whose values changed. An unchanged process keeps its previous value: the
+ticks it skipped are filled in lazily, on its next write or when its history
+is read.
+"""
+
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+SLAB_SIZE = 1024
+
+METRICS = ('cpu', 'rss', 'io')
+
+
+class ProcessHistory:
+    """Rolling per-PID history for CPU%, RSS bytes and IO bytes/s."""
+
+    def __init__(self, points: int = 60, max_processes: int = 20000):
+        self.points = max(2, points)
+        self.max_processes = max(1, max_processes)
+        self.tick = 0
+        self._slabs: List[Dict[str, array]] = []
+        self._first = array('q')   # Per slot: tick of the first sample
+        self._last = array('q')    # Per slot: tick up to which the ring is filled
+        self._slots: "OrderedDict[int, int]" = OrderedDict()  # pid -> slot, least recently written first
+        self._free: List[int] = []
+        self._io = {}              # pid -> IO byte total at the previous write
+        self._aggregates = {}      # (metric, how, window) -> result for the current tick
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, pid: int) -> bool:
+        return pid in self._slots
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the slabs"""
+        return len(self._slabs) * SLAB_SIZE * self.points * len(METRICS) * 4
+
+    def _allocate(self, pid: int) -> int:
+        if not self._free:
+            if len(self._slabs) * SLAB_SIZE < self.max_processes:
+                start = len(self._slabs) * SLAB_SIZE
+                size = min(SLAB_SIZE, self.max_processes - start)
+                self._slabs.append({metric: array('f', [0]) * (SLAB_SIZE * self.points) for metric in METRICS})
+                self._first.extend([0] * SLAB_SIZE)
+                self._last.extend([0] * SLAB_SIZE)
+                self._free.extend(range(start + size - 1, start - 1, -1))
+            else:
+                # Evict the least recently updated process
+                evicted, slot = self._slots.popitem(last=False)
+                self._io.pop(evicted, None)
+                self._free.append(slot)
+
+        slot = self._free.pop()
+        slab = self._slabs[slot // SLAB_SIZE]
+        base = (slot % SLAB_SIZE) * self.points
+        zeros = array('f', [0]) * self.points
+        for metric in METRICS:
+            slab[metric][base:base + self.points] = zeros
+        self._first[slot] = self.tick
+        self._last[slot] = self.tick
+        self._slots[pid] = slot
+        return slot
+
+    def _fill(self, slot: int, until: int):
+        """Repeat the slot's last value for the ticks it was not written"""
+        last = self._last[slot]
+        if last >= until:
+            return
+        points = self.points
+        slab = self._slabs[slot // SLAB_SIZE]
+        base = (slot % SLAB_SIZE) * points
+        count = min(until - last, points - 1)
+        start = (last + 1) % points
+        head = min(count, points - start)
+        for values in slab.values():
+            fill = array('f', [values[base + last % points]])
+            values[base + start:base + start + head] = fill * head
+            if count > head:
+                values[base:base + count - head] = fill * (count - head)
+        self._last[slot] = until
+
+    def _write(self, slot: int, record: Dict, elapsed: float):
+        self._fill(slot, self.tick - 1)
+        slab = self._slabs[slot // SLAB_SIZE]
+        position = (slot % SLAB_SIZE) * self.points + self.tick % self.points
+        slab['cpu'][position] = record.get('cpu_percent', 0.0)
+        slab['rss'][position] = record.get('rss', 0)
+        if 'io_read' in record:
+            pid = record['pid']
+            total = record['io_read'] + record.get('io_write', 0)
+            previous = self._io.get(pid)
+            slab['io'][position] = (total - previous) / elapsed if previous is not None and elapsed > 0 else 0.0
+            self._io[pid] = total
+        self._last[slot] = self.tick
+
+    def apply(self, delta, elapsed: float = 1.0):
+        """
+        Advance one tick and record the processes that changed
+
+        Args:
+            delta: TableDelta of the refresh that produced this tick
+            elapsed: Seconds since the previous tick, used for IO rates
+        """
+        with self._lock:
+            self.tick += 1
+            self._aggregates = {}
+            slots = self._slots
+            for record in delta.removed:
+                slot = slots.pop(record['pid'], None)
+                if slot is not None:
+                    self._free.append(slot)
+                    self._io.pop(record['pid'], None)
+            for record in delta.added:
+                self._write(self._allocate(record['pid']), record, elapsed)
+            for record in delta.updated:
+                slot = slots.get(record['pid'])
+                if slot is None:
+                    slot = self._allocate(record['pid'])
+                else:
+                    slots.move_to_end(record['pid'])
+                self._write(slot, record, elapsed)
+
+    def _window(self, slot: int, metric: str, window: int) -> List[float]:
+        self._fill(slot, self.tick)
+        points = self.points
+        window = max(1, min(window, points, self.tick - self._first[slot] + 1))
+        values = self._slabs[slot // SLAB_SIZE][metric]
+        base = (slot % SLAB_SIZE) * points
+        end = self.tick % points + 1
+        if end >= window:
+            return values[base + end - window:base + end].tolist()
+        return values[base + points - (window - end):base + points].tolist() + values[base:base + end].tolist()
+
+    def series(self, pid: int, metric: str = 'cpu', window: Optional[int] = None) -> List[float]:
+        """Return up to window samples of a metric for pid, oldest first"""
+        with self._lock:
+            slot = self._slots.get(pid)
+            if slot is None:
+                return []
+            return self._window(slot, metric, window or self.points)
+
+    def aggregate(self, metric: str = 'cpu', how: str = 'avg', window: Optional[int] = None) -> Dict[int, float]:
+        """
+        Return pid -> average or peak of a metric over the last window ticks
+        for every tracked process
+
+        Results are cached until the next tick.
+        """
+        window = window or self.points
+        key = (metric, how, window)
+        points = self.points
+        first = self._first
+        peak = how == 'peak'
+        result = {}
+        with self._lock:
+            # Looked up under the lock, so apply() cannot reset the cache in between
+            cached = self._aggregates.get(key)
+            if cached is not None:
+                return cached
+            tick = self.tick
+            for pid, slot in self._slots.items():
+                if window < points:
+                    values = self._window(slot, metric, window)
+                    result[pid] = max(values) if peak else sum(values) / len(values)
+                    continue
+                # The whole ring is the window; samples before the first one are zero
+                self._fill(slot, tick)
+                base = (slot % SLAB_SIZE) * points
+                row = self._slabs[slot // SLAB_SIZE][metric][base:base + points]
+                result[pid] = max(row) if peak else sum(row) / min(points, tick - first[slot] + 1)
+            self._aggregates[key] = result
+        return result
@@ -1,65 +1,270 @@
+import sys
+import threading
+import time
 import psutil
 from datetime import datetime
 
+from process_viewer.cgroups import CgroupMonitor
+from process_viewer.collectors import BASIC_FIELDS, create_collector
+from process_viewer.columns import (BOOKKEEPING_FIELDS, CHEAP, COLUMNS, DEFAULT_COLUMNS, EXPENSIVE, column_fields,
+                                    static_fields)
+from process_viewer.filters import compile_filter
+from process_viewer.grouping import CGROUP_MODES, GROUP_FIELDS, ProcessGroups
+from process_viewer.lazy_sort import sorted_window
+from process_viewer.process_actions import ESCALATE_AFTER, SignalBatch, subtree_pids
+from process_viewer.process_history import ProcessHistory
+from process_viewer.profiling import TIMINGS
+from process_viewer.process_table import ProcessTable, TableDelta
+from process_viewer.process_tree import ProcessTree, sort_spec
+
+# Refreshes a field asked for through request_fields() stays collected after the last request
+REQUEST_TTL = 5
+
 class ProcessManager:
     """
     Manages system process operations and information retrieval.
     
     This class handles all process-related operations including:
     - Retrieving process information
+    - Keeping a persistent process table updated with per-tick deltas
+    - Telling a tiered collector which processes are on screen or filtered for
+    - Keeping a bounded per-process history of CPU, RSS and IO
     - Building process trees
+    - Grouping processes by name, user, parent, cgroup or pod
     - Filtering processes based on various criteria
-    - Process termination
+    - Process termination and batched signals
     """
 
-    def __init__(self):
-        """Initialize the ProcessManager."""
+    def __init__(self, collector=None, history=None, cgroups=None):
+        """
+        Initialize the ProcessManager.
+
+        Args:
+            collector: Collector backend used to read the process table. Defaults
+                to the /proc scanner on Linux and psutil elsewhere.
+            history: ProcessHistory fed from every refresh. IO rates are only
+                recorded when 'io_read'/'io_write' are among the collected fields.
+            cgroups: CgroupMonitor the cgroup and pod groups are read from;
+                defaults to the one at /sys/fs/cgroup
+        """
         self.process_list = []
+        self.collector = collector if collector is not None else create_collector()
+        self.base_fields = BASIC_FIELDS + ('create_time', 'rss')
+        self.fields = self.base_fields
+        self.columns = DEFAULT_COLUMNS
+        self._needed = {}  # 'columns'/'filter'/'sort'/'group'/'server' -> fields collected for every process
+        self._requested = {}  # field -> generation of its latest request_fields() call
+        self._requested_lock = threading.Lock()
+        self._extras = {}  # pid -> (create_time, generation, lazily fetched fields)
+        self._lazy_collector = None  # Collector used off the sampler thread
+        self._visible = frozenset()  # PIDs of the rows on screen, hot for a tiered collector
+        self._matching = frozenset()  # PIDs matching the active filters, hot as well
+        self.process_filter = compile_filter()
+        self.table = ProcessTable()
+        self.history = history if history is not None else ProcessHistory()
+        self.tree = ProcessTree()
+        self.tree.history = self.history
+        self.groups = ProcessGroups()
+        self.cgroups = cgroups
+        self._cgroup_usage = (None, {})  # ((generation, mode), group key -> row fields)
+        self.last_delta = TableDelta()
+        self.generation = 0  # Number of refreshes applied to the table
+        self._last_refresh = None
+
+    def _update_fields(self):
+        """Recompute the collected fields; the change applies from the next refresh on"""
+        fields = list(self.base_fields)
+        for needed in self._needed.values():
+            fields.extend(f for f in needed if f not in fields)
+        fields = tuple(fields)
+        if fields != self.fields:
+            self.fields = fields
+
+    def add_base_fields(self, fields):
+        """Collect fields on every refresh, in addition to the basics"""
+        self.base_fields += tuple(f for f in fields if f not in self.base_fields)
+        self._update_fields()
+
+    def request_fields(self, fields):
+        """
+        Collect fields for every process for as long as they keep being asked for
+
+        Safe to call from any thread, e.g. the metrics server's request
+        handlers. The fields are added on the sampler thread at the next
+        refresh and dropped again REQUEST_TTL refreshes after the last request.
+        """
+        if not fields:
+            return
+        with self._requested_lock:
+            for field in fields:
+                self._requested[field] = self.generation
+
+    def _apply_requested(self):
+        """Collect the requested fields from this refresh on and forget the stale ones"""
+        with self._requested_lock:
+            if self._requested:
+                oldest = self.generation - REQUEST_TTL
+                self._requested = {field: generation for field, generation in self._requested.items()
+                                   if generation >= oldest}
+            fields = tuple(self._requested)
+        if fields != self._needed.get('server', ()):
+            self._needed['server'] = fields
+            self._update_fields()
+
+    def set_columns(self, columns):
+        """
+        Set the columns of the process table
+
+        Cheap column fields are collected for every process. Expensive ones are
+        left to fetch_columns() for the rows on screen.
+        """
+        self.columns = tuple(columns)
+        self._needed['columns'] = column_fields(self.columns, CHEAP)
+        self._update_fields()
+
+    def set_sort(self, sort_by):
+        """Collect the field a column sort needs for every process"""
+        column = COLUMNS.get(sort_by)
+        # Bookkeeping fields such as the data age are not collected per process
+        wanted = column is not None and column.field not in BOOKKEEPING_FIELDS
+        self._needed['sort'] = (column.field,) if wanted else ()
+        self._update_fields()
+
+    def set_group_by(self, group_by):
+        """Group by one of GROUP_MODES, or stop grouping with None"""
+        self.groups.set_mode(group_by)
+        self._needed['group'] = GROUP_FIELDS.get(group_by, ())
+        self._update_fields()
 
-    def get_processes(self, sort_by='cpu', tree_view=False):
-        processes = []
-        process_dict = {}
-        
+    def _publish_hot(self, visible=None, matching=None):
+        """Hand the visible and filtered PIDs to the collector as its hot set"""
+        if visible is not None:
+            self._visible = visible
+        if matching is not None:
+            self._matching = matching
+        # Swapped in whole; the sampler thread reads it once per collect()
+        self.collector.hot_pids = self._visible | self._matching
+
+    def _publish_matching(self, process_filter, matching):
+        """Make the processes an active filter matches hot for a tiered collector"""
+        if self.collector.cold_ticks > 1 and (process_filter.active or self._matching):
+            self._publish_hot(matching=frozenset(record['pid'] for record in matching)
+                              if process_filter.active else frozenset())
+
+    def _collector_for_ui(self):
+        if self._lazy_collector is None:
+            self._lazy_collector = self.collector.clone()
+        return self._lazy_collector
+
+    def fetch_columns(self, records):
+        """
+        Fetch the expensive column fields that records do not carry
+
+        Meant for the rows on screen, which a tiered collector then reads on
+        every refresh. Static fields (owner, command line) are fetched once
+        per process lifetime, the others at most once per refresh; the data
+        age comes from the collector.
+
+        Returns:
+            pid -> dict of fetched fields
+        """
+        if self.collector.cold_ticks > 1:
+            self._publish_hot(visible=frozenset(record['pid'] for record in records))
+        wanted = [f for f in column_fields(self.columns, EXPENSIVE) if f not in BOOKKEEPING_FIELDS]
+        show_age = 'data_age' in column_fields(self.columns, EXPENSIVE)
+        if not wanted and not show_age:
+            return {}
+        static = static_fields()
+        generation = self.generation
+        extras = self._extras
+        result = {}
+        missing = {}
+        for record in records:
+            pid = record['pid']
+            fields = [f for f in wanted if f not in record]
+            if not fields:
+                continue
+            cached = extras.get(pid)
+            if cached is None or cached[0] != record.get('create_time'):
+                cached = extras[pid] = (record.get('create_time'), generation, {})
+                need = fields
+            else:
+                stale = cached[1] != generation
+                need = [f for f in fields if f not in cached[2] or (stale and f not in static)]
+            if need:
+                missing[pid] = need
+            result[pid] = cached[2]
+
+        if missing:
+            with TIMINGS.stage('fetch'):
+                fetched = self._collector_for_ui().collect_pids(
+                    missing, {field for fields in missing.values() for field in fields})
+            for pid in missing:
+                create_time, _, values = extras[pid]
+                values.update(fetched.get(pid, {}))
+                extras[pid] = (create_time, generation, values)
+
+        if show_age:
+            for record in records:
+                result.setdefault(record['pid'], {})['data_age'] = self.collector.data_age(record['pid'])
+
+        if len(extras) > 4 * len(result) + 1024:
+            # Forget processes that scrolled away long ago
+            self._extras = {pid: extras[pid] for pid in result}
+        return result
+
+    def add_listener(self, callback):
+        """Register a callback receiving the TableDelta of every refresh that changed something"""
+        self.table.add_listener(callback)
+
+    def refresh(self) -> TableDelta:
+        """Sample the collector once and apply the births, exits and updates to the table"""
+        self._apply_requested()
+        with TIMINGS.stage('collect'):
+            records = self.collector.collect(self.fields)
+        with TIMINGS.stage('table'):
+            self.last_delta = self.table.update(records)
+        self.generation += 1
+        now = time.monotonic()
+        elapsed = now - self._last_refresh if self._last_refresh is not None else 0.0
+        self._last_refresh = now
+        with TIMINGS.stage('history'):
+            self.history.apply(self.last_delta, elapsed)
+        return self.last_delta
+
+    def get_processes(self, sort_by='cpu', tree_view=False, refresh=True):
         try:
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status', 'ppid']):
-                try:
-                    pinfo = proc.info
-                    pinfo['cpu_percent'] = proc.cpu_percent()
-                    pinfo['memory_percent'] = proc.memory_percent()
-                    pinfo['ppid'] = proc.ppid()
-                    pinfo['level'] = 0  # Will be set properly if tree_view is enabled
-                    pinfo['children'] = []
-                    process_dict[pinfo['pid']] = pinfo
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    continue
+            if refresh:
+                self.refresh()
         except Exception as e:
-            print(f"Error getting process list: {e}")
+            # stdout may be a JSONL/CSV stream, see process_viewer.streaming
+            print(f"Error getting process list: {e}", file=sys.stderr)
             return []
 
+        return self.order_processes(self.table.records, sort_by, tree_view,
+                                    self.last_delta, self.generation)
+
+    def order_processes(self, process_dict, sort_by='cpu', tree_view=False, delta=None, generation=None):
+        """
+        Build the ordered process list from a pid -> record mapping
+
+        Args:
+            process_dict: Records to order, e.g. the table or a sampler snapshot
+            sort_by: 'cpu', 'mem', 'pid', 'name', or 'cpu_avg'/'cpu_peak' to rank
+                by the average or peak CPU over the history window
+            tree_view: Whether to lay the records out as a parent/child tree
+            delta: TableDelta that produced process_dict from the previous generation
+            generation: Sequence number of process_dict, used to decide whether the
+                tree can be updated from delta or has to be rebuilt
+
+        In tree view siblings are ordered by sort_by, so the hierarchy is kept.
+        """
         if tree_view:
-            # Build process tree
-            for pid, pinfo in process_dict.items():
-                ppid = pinfo['ppid']
-                if ppid in process_dict:
-                    process_dict[ppid]['children'].append(pid)
-            
-            # Calculate levels and create tree-ordered list
-            def add_to_tree(pid, level=0):
-                if pid not in process_dict:
-                    return
-                process = process_dict[pid]
-                process['level'] = level
-                processes.append(process)
-                for child_pid in sorted(process['children']):
-                    add_to_tree(child_pid, level + 1)
-            
-            # Start with init process (usually PID 1) and processes without parent
-            root_pids = [pid for pid, proc in process_dict.items() 
-                        if proc['ppid'] not in process_dict or pid == 1]
-            for pid in sorted(root_pids):
-                add_to_tree(pid)
-        else:
-            processes = list(process_dict.values())
+            with TIMINGS.stage('tree'):
+                self.tree.sync(process_dict, delta, generation)
+                return self.tree.flatten(process_dict, sort_by)
+
+        processes = list(process_dict.values())
 
         # Sort processes based on criteria
         if sort_by == 'cpu':
@@ -70,53 +275,180 @@ class ProcessManager:
             processes.sort(key=lambda x: x['pid'])
         elif sort_by == 'name':
             processes.sort(key=lambda x: x['name'].lower())
+        else:
+            # History and column sorts
+            key, reverse = sort_spec(sort_by, self.history)
+            processes.sort(key=key, reverse=reverse)
 
         return processes
 
+    def view_processes(self, process_dict, sort_by='cpu', tree_view=False, delta=None, generation=None,
+                       visible_rows=None, **filters):
+        """
+        Filter and order records for display
+
+        Args:
+            process_dict: pid -> record mapping, e.g. a sampler snapshot
+            sort_by, tree_view, delta, generation: See order_processes()
+            visible_rows: Rows that must be ordered up front. In flat view only
+                this many rows are selected and sorted; the rest are ordered
+                lazily when indexed. None sorts everything.
+            **filters: Keyword arguments accepted by filter_processes()
+
+        Returns:
+            A list, or a lazily sorted sequence supporting len() and indexing
+        """
+        process_filter = self.set_filters(**filters)
+        self.set_sort(sort_by)
+        if tree_view:
+            ordered = self.order_processes(process_dict, sort_by, True, delta, generation)
+            with TIMINGS.stage('filter'):
+                matching = process_filter.apply(ordered)
+            self._publish_matching(process_filter, matching)
+            return matching
+
+        # Filter before sorting so only matching rows are ordered
+        with TIMINGS.stage('filter'):
+            matching = process_filter.apply(process_dict.values())
+        self._publish_matching(process_filter, matching)
+        key, reverse = sort_spec(sort_by, self.history)
+        with TIMINGS.stage('sort'):
+            return sorted_window(matching, key or (lambda x: x['pid']), reverse, visible_rows)
+
+    def group_processes(self, process_dict, group_by, sort_by='cpu', delta=None, generation=None, **filters):
+        """
+        Aggregate the filtered records into one row per group
+
+        Args:
+            process_dict: pid -> record mapping, e.g. a sampler snapshot
+            group_by: One of GROUP_MODES
+            sort_by: Sort mode; 'cpu', 'mem', 'rss' and 'threads' order by the
+                group sums, 'name' by group name and 'pid' by member count
+            delta, generation: See order_processes(); consecutive generations
+                update the groups from delta instead of regrouping everything
+            **filters: Keyword arguments accepted by filter_processes()
+
+        Returns:
+            Record-like dicts with 'group', 'name', 'count' and the summed
+            'cpu_percent', 'memory_percent', 'rss' and 'num_threads'. Grouped by
+            cgroup or pod, CPU and memory come from the cgroup's own accounting
+            where cgroup v2 is mounted, along with 'memory', 'io_read_rate' and
+            'io_write_rate'.
+        """
+        process_filter = self.set_filters(**filters)
+        self.set_group_by(group_by)
+        with TIMINGS.stage('group'):
+            self.groups.sync(process_dict, delta, generation, process_filter)
+        extra = None
+        if group_by in CGROUP_MODES:
+            with TIMINGS.stage('cgroups'):
+                extra = self._cgroup_fields(generation)
+        return self.groups.rows(process_dict, sort_by, extra)
+
+    def _cgroup_fields(self, generation):
+        """Read the accounting of the current cgroup groups, once per generation"""
+        if self.cgroups is None:
+            self.cgroups = CgroupMonitor()
+        cached_key, fields = self._cgroup_usage
+        if generation is not None and cached_key == (generation, self.groups.mode):
+            return fields
+        fields = {}
+        for path, usage in self.cgroups.sample(self.groups.sums).items():
+            row = {'memory': usage.memory, 'io_read_rate': usage.io_read_rate,
+                   'io_write_rate': usage.io_write_rate}
+            # Until there is a previous sample, the members' CPU sum stands in
+            if usage.cpu_percent is not None:
+                row['cpu_percent'] = usage.cpu_percent
+            if usage.memory_percent is not None:
+                row['memory_percent'] = usage.memory_percent
+            fields[path] = row
+        self._cgroup_usage = ((generation, self.groups.mode), fields)
+        return fields
+
+    def set_filters(self, search_term="", status=None, min_cpu=None, min_memory=None, user_filter=None):
+        """
+        Compile the filter settings if they changed and return the ProcessFilter
+
+        Fields the filters need beyond the basics (uid, cmdline) are added to
+        the collected fields from the next refresh on; until then processes
+        missing them do not match.
+        """
+        self.process_filter = compile_filter(search_term, status, min_cpu, min_memory, user_filter,
+                                             previous=self.process_filter)
+        self._needed['filter'] = self.process_filter.fields
+        self._update_fields()
+        return self.process_filter
+
     def filter_processes(self, processes, search_term="", status=None, min_cpu=None, min_memory=None, user_filter=None):
-        filtered = processes
-        
-        # Apply text search filter
-        if search_term:
-            filtered = [p for p in filtered if search_term.lower() in p['name'].lower() or 
-                       str(p['pid']) == search_term]
-        
-        # Apply status filter
-        if status:
-            filtered = [p for p in filtered if p['status'] == status]
-        
-        # Apply CPU threshold filter
-        if min_cpu is not None:
-            filtered = [p for p in filtered if p['cpu_percent'] >= min_cpu]
-        
-        # Apply memory threshold filter
-        if min_memory is not None:
-            filtered = [p for p in filtered if p['memory_percent'] >= min_memory]
-        
-        # Apply user filter
-        if user_filter is not None:
-            try:
-                filtered = [p for p in filtered if psutil.Process(p['pid']).username() == user_filter]
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
-        
-        return filtered
+        """Return the processes matching all of the given filters, see set_filters()"""
+        return self.set_filters(search_term, status, min_cpu, min_memory, user_filter).apply(processes)
 
     def get_process_details(self, pid):
-        try:
-            proc = psutil.Process(pid)
-            return {
-                'pid': pid,
-                'name': proc.name(),
-                'status': proc.status(),
-                'cpu_percent': proc.cpu_percent(),
-                'memory_percent': proc.memory_percent(),
-                'create_time': datetime.fromtimestamp(proc.create_time()).strftime('%Y-%m-%d %H:%M:%S'),
-                'username': proc.username(),
-                'cmdline': ' '.join(proc.cmdline())
-            }
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
+        """
+        Return the details shown for one process, or None if it is gone
+
+        The sampled fields come from the process table; owner and command line
+        are read in a single collector pass.
+        """
+        record = self.table.records.get(pid)
+        if record is None:
             return None
+        extra = self._collector_for_ui().collect_pids([pid], ('username', 'cmdline')).get(pid)
+        if extra is None:
+            return None
+        return {
+            'pid': pid,
+            'name': record['name'],
+            'status': record['status'],
+            'cpu_percent': record['cpu_percent'],
+            'memory_percent': record['memory_percent'],
+            'create_time': datetime.fromtimestamp(record['create_time']).strftime('%Y-%m-%d %H:%M:%S'),
+            'username': extra.get('username', "?"),
+            'cmdline': extra.get('cmdline', ""),
+            'cpu_history': self.history.series(pid, 'cpu'),
+            'rss_history': self.history.series(pid, 'rss'),
+            'io_history': self.history.series(pid, 'io') if 'io_read' in self.fields else [],
+        }
+
+    def signal_targets(self, scope, records, selected=None, marked=()):
+        """
+        Return the records a batched signal goes to
+
+        Args:
+            scope: 'selected' (the selected process, or a group's members),
+                'subtree' (the selected process and its descendants),
+                'filter' (every process matching the current filters; none
+                while no filter is active) or 'marked' (the marked PIDs)
+            records: pid -> record mapping, e.g. a sampler snapshot
+            selected: Selected row of the process list, or None
+            marked: Marked PIDs
+        """
+        if scope == 'filter':
+            return self.process_filter.apply(records.values()) if self.process_filter.active else []
+        if scope == 'marked':
+            pids = marked
+        elif selected is None:
+            pids = ()
+        elif 'group' in selected:
+            pids = self.groups.members.get(selected['group'], ())
+        elif scope == 'subtree':
+            pids = subtree_pids(records, selected['pid'])
+        else:
+            pids = (selected['pid'],)
+        return [records[pid] for pid in pids if pid in records]
+
+    def signal_processes(self, targets, sig, escalate_after=ESCALATE_AFTER):
+        """
+        Start sending sig to targets; poll() the returned SignalBatch until done
+
+        Args:
+            targets: Records from signal_targets()
+            escalate_after: Seconds before survivors of SIGTERM/SIGINT get
+                SIGKILL, or None to never escalate
+        """
+        batch = SignalBatch(targets, sig, escalate_after)
+        batch.poll()
+        return batch
 
     def terminate_process(self, pid):
         """Terminate a process by PID"""
@@ -0,0 +1,130 @@
+"""
+Persistent process table updated incrementally from collector samples.
+
+Rather than throwing every process dict away on each tick, ProcessTable keeps
+one record per live process keyed on (pid, create_time) and only replaces the
+records whose values actually changed. Each refresh produces a TableDelta
+describing the births, exits and updates, which consumers can use to react to
+changes instead of rescanning the whole table.
+
+Each record also carries a 'name_lower' field, computed once when the process
+is first seen (or renamed) so filters never lowercase names per tick, and
+likewise a 'cmdline_lower' field while command lines are collected.
+
+Records are never modified after they have been stored: an update swaps in
+the new sample dict. Lists of records
+handed out earlier therefore keep showing the values they were built from.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+def _derive(sample: Dict, current: Optional[Dict] = None):
+    """Set the lowercased name and command line of sample, reusing current's where unchanged"""
+    name = sample.get('name', '')
+    if current is not None and name == current.get('name'):
+        sample['name_lower'] = current['name_lower']
+    else:
+        sample['name_lower'] = name.lower()
+    cmdline = sample.get('cmdline')
+    if cmdline is not None:
+        if current is not None and cmdline == current.get('cmdline'):
+            sample['cmdline_lower'] = current['cmdline_lower']
+        else:
+            sample['cmdline_lower'] = cmdline.lower()
+
+
+class TableDelta:
+    """Changes applied to a ProcessTable by a single update."""
+
+    __slots__ = ('added', 'removed', 'updated')
+
+    def __init__(self):
+        self.added: List[Dict] = []
+        self.removed: List[Dict] = []
+        self.updated: List[Dict] = []
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.updated)
+
+    def __repr__(self):
+        return (f"TableDelta(added={len(self.added)}, removed={len(self.removed)}, "
+                f"updated={len(self.updated)})")
+
+
+class ProcessTable:
+    """
+    Process records keyed on (pid, create_time).
+
+    A PID that reappears with a different create_time is a recycled PID and is
+    reported as one removal plus one addition rather than an update.
+    """
+
+    def __init__(self):
+        self.records: Dict[int, Dict] = {}
+        self._listeners: List[Callable[[TableDelta], None]] = []
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records.values())
+
+    def get(self, pid: int):
+        return self.records.get(pid)
+
+    def add_listener(self, callback: Callable[[TableDelta], None]):
+        """Register a callback invoked with every non-empty TableDelta"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[TableDelta], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def update(self, samples: Iterable[Dict]) -> TableDelta:
+        """
+        Merge a full collector sample into the table
+
+        Args:
+            samples: One dict per live process, as returned by Collector.collect()
+
+        Returns:
+            The TableDelta describing what changed since the previous update
+        """
+        delta = TableDelta()
+        records = self.records
+        seen = set()
+
+        for sample in samples:
+            pid = sample['pid']
+            seen.add(pid)
+            current = records.get(pid)
+
+            if current is sample:
+                continue  # Carried over unread by a tiered collector
+            if current is None:
+                _derive(sample)
+                records[pid] = sample
+                delta.added.append(sample)
+            elif current.get('create_time') != sample.get('create_time'):
+                _derive(sample)
+                delta.removed.append(current)
+                records[pid] = sample
+                delta.added.append(sample)
+            else:
+                for key, value in sample.items():
+                    if current.get(key) != value:
+                        # Derived fields are only recomputed when their source changed
+                        _derive(sample, current)
+                        records[pid] = sample
+                        delta.updated.append(sample)
+                        break
+
+        if len(seen) != len(records):
+            for pid in records.keys() - seen:
+                delta.removed.append(records.pop(pid))
+
+        if delta:
+            for callback in self._listeners:
+                callback(delta)
+        return delta
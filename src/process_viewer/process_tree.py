@@ -0,0 +1,225 @@
+"""
+Incremental parent/child tree for the process list.
+
+ProcessTree keeps the parent -> children adjacency between ticks and updates it
+from ProcessTable deltas, so a tick with few births and exits only touches the
+affected parents. Flattening into display order is iterative (an explicit
+stack instead of recursion), so arbitrarily deep fork chains cannot hit the
+recursion limit. Siblings are ordered by the active sort key, which keeps the
+hierarchy intact in every sort mode.
+"""
+
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from process_viewer.columns import COLUMNS
+
+# Sort modes ranking processes by their recent CPU history: mode -> aggregate
+HISTORY_SORTS = {'cpu_avg': 'avg', 'cpu_peak': 'peak'}
+
+# Sort modes whose keys never change for a live process; every other mode
+# (cpu, mem, status, rss, ...) has to re-sort siblings whose records changed
+STABLE_SORTS = ('pid', 'name', 'ppid') + tuple(name for name, column in COLUMNS.items() if column.static)
+
+
+def sort_spec(sort_by: str, history=None) -> Tuple[Optional[Callable[[Dict], object]], bool]:
+    """
+    Return the (key function, reverse) pair for a sort mode
+
+    Args:
+        sort_by: 'cpu', 'mem', 'pid', 'name', 'cpu_avg', 'cpu_peak' or the
+            name of any other column; records missing the column's field sort last
+        history: ProcessHistory used by the history sorts; their aggregates
+            are computed once here, not per comparison
+    """
+    how = HISTORY_SORTS.get(sort_by)
+    if how is not None:
+        if history is None:
+            return (lambda p: p['cpu_percent']), True
+        values = history.aggregate('cpu', how)
+        return (lambda p: values.get(p['pid'], 0.0)), True
+    if sort_by == 'cpu':
+        return (lambda p: p['cpu_percent']), True
+    if sort_by == 'mem':
+        return (lambda p: p['memory_percent']), True
+    if sort_by == 'name':
+        return (lambda p: p['name'].lower()), False
+    column = COLUMNS.get(sort_by)
+    if column is not None and sort_by != 'pid':
+        field = column.field
+        if column.numeric:
+            return (lambda p: p.get(field) or 0), True
+        return (lambda p: str(p.get(field) or '').lower()), False
+    return None, False  # 'pid' order
+
+
+class ProcessTree:
+    """
+    Parent -> children adjacency maintained across ticks.
+
+    Children are indexed by their ppid even when that parent is not in the
+    table; such children are the roots of the forest. flatten() keeps the
+    depth of every row it emits in `levels` rather than in the records, which
+    the sampler's snapshots share with other threads.
+    """
+
+    def __init__(self):
+        self.parents: Dict[int, int] = {}        # pid -> ppid
+        self.children: Dict[int, Set[int]] = {}  # ppid -> child pids
+        self.collapsed: Set[int] = set()
+        self.levels: Dict[int, int] = {}  # pid -> depth of the rows of the last flatten()
+        self.version = 0  # Bumped whenever collapse state changes
+        self.history = None  # ProcessHistory for the history sort modes
+        self._generation = None
+        self._sort_by = None
+        self._sorted: Dict[int, List[int]] = {}  # ppid -> ordered children cache
+        self._roots: Optional[List[int]] = None
+
+    def __len__(self):
+        return len(self.parents)
+
+    def _link(self, pid: int, ppid: int):
+        if ppid == pid:
+            ppid = 0  # Never let a process be its own parent
+        self.parents[pid] = ppid
+        self.children.setdefault(ppid, set()).add(pid)
+        self._sorted.pop(ppid, None)
+
+    def _unlink(self, pid: int):
+        ppid = self.parents.pop(pid)
+        siblings = self.children.get(ppid)
+        if siblings is not None:
+            siblings.discard(pid)
+            if not siblings:
+                del self.children[ppid]
+        self._sorted.pop(ppid, None)
+
+    def rebuild(self, records: Mapping[int, Dict]):
+        """Recompute the adjacency from scratch"""
+        self.parents = {}
+        self.children = {}
+        self._sorted = {}
+        self._roots = None
+        for pid, record in records.items():
+            self._link(pid, record['ppid'])
+
+    def apply(self, delta):
+        """Apply a ProcessTable delta to the adjacency"""
+        volatile = self._sort_by not in STABLE_SORTS
+        if self._sort_by in HISTORY_SORTS:
+            # History aggregates move for unchanged processes too
+            self._sorted = {}
+            self._roots = None
+        for record in delta.removed:
+            if record['pid'] in self.parents:
+                self._unlink(record['pid'])
+            self.collapsed.discard(record['pid'])
+        for record in delta.added:
+            pid = record['pid']
+            if pid in self.parents:
+                self._unlink(pid)
+            self._link(pid, record['ppid'])
+        for record in delta.updated:
+            pid = record['pid']
+            ppid = self.parents.get(pid)
+            if ppid != record['ppid']:
+                if ppid is not None:
+                    self._unlink(pid)
+                self._link(pid, record['ppid'])
+            elif volatile:
+                self._sorted.pop(ppid, None)
+        if delta.added or delta.removed:
+            self._roots = None
+        elif volatile and delta.updated:
+            self._roots = None
+
+    def sync(self, records: Mapping[int, Dict], delta=None, generation: Optional[int] = None):
+        """
+        Bring the adjacency up to date with records
+
+        The delta is applied only when generation directly follows the last
+        synced one; otherwise (first call, skipped ticks) the tree is rebuilt.
+        """
+        if generation is not None and generation == self._generation:
+            return
+        if (delta is not None and generation is not None and self._generation is not None
+                and generation == self._generation + 1):
+            self.apply(delta)
+        else:
+            self.rebuild(records)
+        self._generation = generation
+
+    def _order(self, pids: Iterable[int], records: Mapping[int, Dict], key, reverse) -> List[int]:
+        ordered = sorted(pids)
+        if key is not None:
+            ordered.sort(key=lambda pid: key(records[pid]), reverse=reverse)
+        return ordered
+
+    def roots(self, records: Mapping[int, Dict], key=None, reverse=False) -> List[int]:
+        """Return the root PIDs: processes whose parent is not in the table, ordered by key"""
+        if self._roots is None:
+            orphans = [pid for ppid, kids in self.children.items() if ppid not in self.parents for pid in kids]
+            self._roots = self._order(orphans, records, key, reverse)
+        return self._roots
+
+    def flatten(self, records: Mapping[int, Dict], sort_by: str = 'pid') -> List[Dict]:
+        """
+        Return records in depth-first display order
+
+        Args:
+            records: pid -> record mapping the adjacency was synced with
+            sort_by: Sort mode used to order siblings
+        """
+        if sort_by != self._sort_by:
+            self._sort_by = sort_by
+            self._sorted = {}
+            self._roots = None
+        key, reverse = sort_spec(sort_by, self.history)
+        children = self.children
+        cache = self._sorted
+        collapsed = self.collapsed
+        levels = {}
+        processes = []
+
+        stack = [(pid, 0) for pid in reversed(self.roots(records, key, reverse))]
+        while stack:
+            pid, level = stack.pop()
+            levels[pid] = level
+            processes.append(records[pid])
+
+            kids = children.get(pid)
+            if not kids or pid in collapsed:
+                continue
+            ordered = cache.get(pid)
+            if ordered is None:
+                ordered = cache[pid] = self._order(kids, records, key, reverse)
+            level += 1
+            stack.extend((child, level) for child in reversed(ordered))
+
+        self.levels = levels
+        return processes
+
+    def folded(self, pid: int) -> bool:
+        """Whether pid has children that are hidden because its subtree is collapsed"""
+        return pid in self.collapsed and bool(self.children.get(pid))
+
+    def toggle(self, pid: int):
+        """Collapse an expanded subtree or expand a collapsed one"""
+        if pid in self.collapsed:
+            self.expand(pid)
+        else:
+            self.collapse(pid)
+
+    def collapse(self, pid: int):
+        if pid in self.children and pid not in self.collapsed:
+            self.collapsed.add(pid)
+            self.version += 1
+
+    def expand(self, pid: int):
+        if pid in self.collapsed:
+            self.collapsed.discard(pid)
+            self.version += 1
+
+    def expand_all(self):
+        if self.collapsed:
+            self.collapsed.clear()
+            self.version += 1
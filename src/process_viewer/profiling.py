@@ -0,0 +1,232 @@
+"""
+Stage timing and profiling.
+
+Timings keeps a log-scaled histogram of durations per named stage of the
+sampling and drawing loops (collect, table, tree, filter, graphs, draw, ...).
+Recording a duration is a few integer operations and a list increment, cheap
+enough to stay on all the time, and percentiles are read off the histogram
+without keeping individual samples. TIMINGS is the instance the viewer
+records into; the 'p' overlay shows its p50 and p99 per stage.
+
+run_profiled() runs the viewer under cProfile, or under a sampling profiler
+that also sees the sampler thread, for --profile.
+"""
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple
+
+SUB_BUCKETS = 4                  # Histogram buckets per power of two, at most 25% apart
+NUM_BUCKETS = 64 * SUB_BUCKETS   # Enough for any 64-bit nanosecond count
+
+PROFILERS = ('cprofile', 'sampling')
+
+
+def _bucket(ns: int) -> int:
+    """Histogram bucket of a duration in nanoseconds"""
+    bits = ns.bit_length()
+    if bits <= 2:
+        return ns
+    return (bits - 2) * SUB_BUCKETS + ((ns >> (bits - 3)) & (SUB_BUCKETS - 1))
+
+
+def _bucket_limit(index: int) -> int:
+    """Largest duration in nanoseconds that falls into bucket index"""
+    if index < SUB_BUCKETS:
+        return index
+    bits, sub = divmod(index, SUB_BUCKETS)
+    return ((SUB_BUCKETS + sub + 1) << (bits - 1)) - 1
+
+
+class StageSummary(NamedTuple):
+    """Timing figures of one stage, in seconds."""
+    name: str
+    count: int
+    last: float
+    mean: float
+    p50: float
+    p99: float
+    max: float
+
+
+class StageStats:
+    """Count, total, maximum and histogram of one stage's durations."""
+
+    __slots__ = ('count', 'total_ns', 'max_ns', 'last_ns', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.last_ns = 0
+        self.buckets = [0] * NUM_BUCKETS
+
+    def add(self, ns: int):
+        self.count += 1
+        self.total_ns += ns
+        self.last_ns = ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.buckets[_bucket(ns)] += 1
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the q-th percentile bucket, in seconds"""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(q / 100 * self.count))
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(_bucket_limit(index), self.max_ns) / 1e9
+        return self.max_ns / 1e9
+
+
+class _Span:
+    __slots__ = ('stats', 'start')
+
+    def __init__(self, stats: StageStats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.add(time.perf_counter_ns() - self.start)
+        return False
+
+
+class Timings:
+    """
+    Named stage timers.
+
+    Each stage is expected to be timed from one thread at a time (collection
+    on the sampler thread, drawing on the UI thread), so no locking is done.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, StageStats] = {}
+
+    def _stats(self, name: str) -> StageStats:
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats()
+        return stats
+
+    def stage(self, name: str) -> _Span:
+        """Context manager timing one run of stage name"""
+        return _Span(self._stats(name))
+
+    def record(self, name: str, seconds: float):
+        """Record a duration measured elsewhere"""
+        self._stats(name).add(int(seconds * 1e9))
+
+    def reset(self):
+        self.stages = {}
+
+    def summary(self) -> List[StageSummary]:
+        """Figures of every stage, in the order the stages were first timed"""
+        return [StageSummary(name, stats.count, stats.last_ns / 1e9,
+                             stats.total_ns / stats.count / 1e9 if stats.count else 0.0,
+                             stats.percentile(50), stats.percentile(99), stats.max_ns / 1e9)
+                for name, stats in list(self.stages.items())]
+
+    def format_table(self) -> str:
+        """The summary as a plain text table in milliseconds"""
+        lines = [f"{'stage':<14} {'count':>8} {'mean':>9} {'p50':>9} {'p99':>9} {'max':>9}"]
+        for row in self.summary():
+            lines.append(f"{row.name:<14} {row.count:>8} {row.mean * 1e3:>9.3f} {row.p50 * 1e3:>9.3f} "
+                         f"{row.p99 * 1e3:>9.3f} {row.max * 1e3:>9.3f}")
+        return "\n".join(lines)
+
+
+# Timings of the running viewer
+TIMINGS = Timings()
+
+
+class SamplingProfiler(threading.Thread):
+    """
+    Statistical profiler that records the stacks of all other threads.
+
+    Unlike cProfile it sees every thread and barely slows the program down.
+    The output is in the collapsed stack format read by flamegraph.pl and
+    speedscope: one line per distinct stack with the number of samples.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        super().__init__(name="process-viewer-profiler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_qualname} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write(self, path: str):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def run_profiled(func: Callable, path: str, profiler: str = 'cprofile', *args, **kwargs):
+    """
+    Run func(*args, **kwargs) under a profiler and write its output to path
+
+    Args:
+        path: Output file. For cProfile, a path ending in '.prof' gets the
+            binary stats for snakeviz/pstats, any other a text report sorted
+            by cumulative time. The sampling profiler writes collapsed stacks.
+        profiler: 'cprofile' (the calling thread only) or 'sampling' (all threads)
+    """
+    if profiler == 'sampling':
+        sampler = SamplingProfiler()
+        sampler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sampler.stop()
+            sampler.write(path)
+            print(f"Profile of {sampler.samples} samples written to {path}", file=sys.stderr)
+            print(TIMINGS.format_table(), file=sys.stderr)
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profile.disable()
+        if path.endswith('.prof'):
+            profile.dump_stats(path)
+        else:
+            out = io.StringIO()
+            pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(60)
+            with open(path, 'w') as f:
+                f.write(TIMINGS.format_table() + "\n\n" + out.getvalue())
+        print(f"Profile written to {path}", file=sys.stderr)
+        print(TIMINGS.format_table(), file=sys.stderr)
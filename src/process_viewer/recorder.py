@@ -0,0 +1,94 @@
+"""
+Headless recording.
+
+`process-viewer record` samples processes and system resources on a fixed
+interval without starting curses, and appends every sample to a capture file
+(see process_viewer.capture). It is meant to run unattended under systemd or
+cron: SIGTERM and SIGINT end the recording cleanly, and --duration bounds it.
+"""
+
+import argparse
+import signal
+import sys
+from typing import Optional
+
+from process_viewer.capture import CAPTURE_FIELDS, CaptureWriter
+from process_viewer.collectors import create_collector
+from process_viewer.process_manager import ProcessManager
+from process_viewer.resource_graphs import ResourceHistory
+from process_viewer.sampler import Sampler
+
+
+def record(path: str, interval: float = 1.0, keyframe_interval: int = 60, duration: Optional[float] = None,
+           collector: str = "auto", quiet: bool = False) -> int:
+    """
+    Sample until stopped and append every sample to a capture file
+
+    Args:
+        path: Capture file, created or appended to
+        interval: Seconds between samples
+        keyframe_interval: Samples between full keyframes
+        duration: Stop after this many seconds; None records until signalled
+        collector: Process collector backend ('auto', 'procfs' or 'psutil')
+        quiet: Do not print the summary to stderr
+
+    Returns:
+        The process exit status
+    """
+    process_manager = ProcessManager(create_collector(collector))
+    process_manager.add_base_fields(CAPTURE_FIELDS)
+    resource_history = ResourceHistory()
+    writer = CaptureWriter(path, process_manager.fields, keyframe_interval)
+    deadline = None
+
+    def on_sample(snapshot):
+        writer.write(snapshot, resource_history.last_values)
+        if deadline is not None and snapshot.timestamp >= deadline:
+            sampler.stop()
+
+    sampler = Sampler(process_manager, resource_history, interval=interval, on_sample=on_sample)
+
+    def on_signal(signum, frame):
+        sampler.stop()
+
+    previous_handlers = {sig: signal.signal(sig, on_signal) for sig in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        first = sampler.sample()
+        if duration is not None:
+            deadline = first.timestamp + duration
+        sampler.run()  # Samples on this thread until stopped
+    finally:
+        writer.close()
+        for sig, handler in previous_handlers.items():
+            signal.signal(sig, handler)
+
+    if not quiet:
+        print(f"Recorded {writer.records_written} samples ({writer.bytes_written} bytes) to {path}", file=sys.stderr)
+    return 0
+
+
+def parse_record_args(argv=None):
+    """Parse the options of the record subcommand"""
+    parser = argparse.ArgumentParser(prog="process-viewer record",
+                                     description="Record process snapshots to a capture file without a UI")
+    parser.add_argument("-o", "--output", default="process-viewer.pvcap",
+                        help="capture file to append to (default: process-viewer.pvcap)")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="seconds between samples (default: 1.0)")
+    parser.add_argument("--keyframe-every", type=int, default=60,
+                        help="samples between full keyframes (default: 60)")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="stop after this many seconds (default: until SIGTERM/SIGINT)")
+    parser.add_argument("--collector", choices=("auto", "procfs", "psutil"), default="auto",
+                        help="process collector backend (default: auto)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not print a summary when done")
+    args = parser.parse_args(argv)
+    if args.interval <= 0 or args.keyframe_every <= 0:
+        parser.error("--interval and --keyframe-every must be positive")
+    return args
+
+
+def run_record(argv=None) -> int:
+    """Entry point for `process-viewer record`"""
+    args = parse_record_args(argv)
+    return record(args.output, args.interval, args.keyframe_every, args.duration, args.collector, args.quiet)
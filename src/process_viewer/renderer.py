@@ -0,0 +1,225 @@
+"""
+Damage-tracked screen rendering.
+
+UserInterface draws each frame into an off-screen Frame (a grid of characters
+and attributes) and hands it to a RenderTarget:
+
+- CursesRenderer compares it with the previously presented frame and only
+  sends the changed span of each changed row to curses, followed by a single
+  noutrefresh()/doupdate(). Nothing is cleared between frames, so an idle
+  screen costs no terminal output at all.
+- MemoryRenderer keeps the presented frame as an in-memory cell grid. It
+  needs no terminal, so the drawing code can run at full speed in benchmarks
+  and its output can be compared against golden frames.
+"""
+
+import curses
+import hashlib
+from typing import List, Optional, Tuple
+
+# Rough cost in bytes of the cursor move and attribute change sent per span
+SPAN_OVERHEAD = 12
+
+
+class Frame:
+    """Off-screen character and attribute grid for one frame."""
+
+    def __init__(self, height: int, width: int):
+        self.height = max(0, height)
+        self.width = max(0, width)
+        self.clear()
+
+    def clear(self):
+        """Blank every cell"""
+        self.chars: List[List[str]] = [[' '] * self.width for _ in range(self.height)]
+        self.attrs: List[List[int]] = [[0] * self.width for _ in range(self.height)]
+
+    def addstr(self, y: int, x: int, text: str, attr: int = 0) -> bool:
+        """Write text at (y, x), truncated at the right edge"""
+        if not (0 <= y < self.height and 0 <= x < self.width):
+            return False
+        text = text[:self.width - x]
+        if not text:
+            return False
+        end = x + len(text)
+        self.chars[y][x:end] = text
+        self.attrs[y][x:end] = [attr] * len(text)
+        return True
+
+    def lines(self) -> List[str]:
+        """Return the frame's text, one string per row"""
+        return [''.join(row) for row in self.chars]
+
+
+class RenderStats:
+    """Output counters for the renderer."""
+
+    def __init__(self):
+        self.frames = 0
+        self.total_bytes = 0
+        self.last_bytes = 0          # Bytes emitted for the most recent frame
+        self.last_rows_changed = 0   # Rows redrawn for the most recent frame
+
+    @property
+    def average_bytes(self) -> float:
+        return self.total_bytes / self.frames if self.frames else 0.0
+
+
+class RenderTarget:
+    """
+    Where UserInterface frames end up.
+
+    present() works out which spans of which rows changed since the previous
+    frame; subclasses implement size() and the _clear(), _write() and _flush()
+    hooks that output them.
+    """
+
+    def __init__(self):
+        self.previous: Optional[Frame] = None
+        self.stats = RenderStats()
+
+    def size(self) -> Tuple[int, int]:
+        """Return (height, width) in cells"""
+        raise NotImplementedError
+
+    def color_pair(self, number: int) -> int:
+        """Attribute for color pair number"""
+        return curses.color_pair(number)
+
+    def invalidate(self):
+        """Forget the previous frame so the next one is drawn in full"""
+        self.previous = None
+
+    def _clear(self):
+        pass
+
+    def _write(self, y: int, x: int, text: str, attr: int):
+        pass
+
+    def _flush(self):
+        pass
+
+    def present(self, frame: Frame):
+        """Output the differences between frame and the previous frame"""
+        previous = self.previous
+        full = previous is None or previous.height != frame.height or previous.width != frame.width
+        if full:
+            self._clear()
+
+        emitted = 0
+        rows_changed = 0
+        for y in range(frame.height):
+            chars = frame.chars[y]
+            attrs = frame.attrs[y]
+            if full:
+                # The target was cleared, so trailing blanks need not be sent
+                start, end = 0, frame.width
+                while end > start and chars[end - 1] == ' ' and attrs[end - 1] == 0:
+                    end -= 1
+            else:
+                old_chars = previous.chars[y]
+                old_attrs = previous.attrs[y]
+                if chars == old_chars and attrs == old_attrs:
+                    continue
+                start = 0
+                while chars[start] == old_chars[start] and attrs[start] == old_attrs[start]:
+                    start += 1
+                end = frame.width
+                while chars[end - 1] == old_chars[end - 1] and attrs[end - 1] == old_attrs[end - 1]:
+                    end -= 1
+            if start >= end:
+                continue
+
+            rows_changed += 1
+            x = start
+            while x < end:
+                attr = attrs[x]
+                run_end = x + 1
+                while run_end < end and attrs[run_end] == attr:
+                    run_end += 1
+                text = ''.join(chars[x:run_end])
+                self._write(y, x, text, attr)
+                emitted += len(text.encode('utf-8')) + SPAN_OVERHEAD
+                x = run_end
+
+        self._flush()
+        self.previous = frame
+        self.stats.frames += 1
+        self.stats.total_bytes += emitted
+        self.stats.last_bytes = emitted
+        self.stats.last_rows_changed = rows_changed
+
+
+class CursesRenderer(RenderTarget):
+    """
+    Present Frames on a curses window, emitting only what changed.
+
+    Bytes are counted as the UTF-8 size of the text handed to curses plus
+    SPAN_OVERHEAD per span, which approximates what reaches the terminal.
+    """
+
+    def __init__(self, window, doupdate=curses.doupdate):
+        super().__init__()
+        self.window = window
+        self.doupdate = doupdate
+
+    def size(self) -> Tuple[int, int]:
+        return self.window.getmaxyx()
+
+    def _clear(self):
+        self.window.erase()
+
+    def _write(self, y: int, x: int, text: str, attr: int):
+        try:
+            self.window.addstr(y, x, text, attr)
+        except curses.error:
+            pass  # Writing the bottom-right cell moves the cursor off-screen
+
+    def _flush(self):
+        self.window.noutrefresh()
+        self.doupdate()
+
+
+class MemoryRenderer(RenderTarget):
+    """
+    Headless target that keeps the last presented frame as a cell grid.
+
+    Color pairs are encoded the way curses does (pair number << 8), so
+    attributes are stable without a terminal. The span and byte statistics
+    are the same CursesRenderer would report for the same frames.
+    """
+
+    def __init__(self, height: int = 50, width: int = 160):
+        super().__init__()
+        self.height = height
+        self.width = width
+
+    def resize(self, height: int, width: int):
+        """Change the size reported to the UI, as a terminal resize would"""
+        self.height = height
+        self.width = width
+
+    def size(self) -> Tuple[int, int]:
+        return self.height, self.width
+
+    def color_pair(self, number: int) -> int:
+        return number << 8
+
+    def lines(self) -> List[str]:
+        """Text of the presented frame, one string per row without trailing blanks"""
+        if self.previous is None:
+            return []
+        return [line.rstrip() for line in self.previous.lines()]
+
+    def cell(self, y: int, x: int) -> Tuple[str, int]:
+        """Character and attribute of one cell of the presented frame"""
+        return self.previous.chars[y][x], self.previous.attrs[y][x]
+
+    def digest(self) -> str:
+        """Hash of every character and attribute of the presented frame"""
+        h = hashlib.sha1()
+        if self.previous is not None:
+            for chars, attrs in zip(self.previous.chars, self.previous.attrs):
+                h.update(''.join(chars).encode('utf-8'))
+                h.update(b'\0' + ','.join(map(str, attrs)).encode() + b'\n')
+        return h.hexdigest()
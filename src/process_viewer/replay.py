@@ -0,0 +1,121 @@
+"""
+Time-travel replay of capture files.
+
+ReplaySource stands in for the live Sampler: the curses loop reads
+`latest`, `lock` and `resource_history` from it exactly as it does from the
+sampler, so the process list, tree view, filters and graphs all run against
+the historical snapshots. The position is moved with step(), seek() and
+seek_time(), or advanced in recorded time while playing.
+"""
+
+import threading
+import time
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, Optional
+
+from process_viewer.capture import CaptureReader
+from process_viewer.resource_graphs import ResourceHistory
+from process_viewer.sampler import Snapshot
+from process_viewer.utils import username_for_uid
+
+
+class ReplaySource:
+    """Snapshots served from a capture file instead of a live system."""
+
+    def __init__(self, reader: CaptureReader, graph_points: int = 600):
+        """
+        Args:
+            reader: Open capture to replay
+            graph_points: Frames before the current one shown in the graphs
+        """
+        if reader.start >= len(reader):
+            raise ValueError(f"{reader.path} contains no complete frames")
+        self.reader = reader
+        self.graph_points = graph_points
+        self.lock = threading.Lock()
+        self.resource_history = ResourceHistory(max_points=graph_points)
+        self.playing = False
+        self.position = None
+        self._seq = 0
+        self._latest: Optional[Snapshot] = None
+        self._play_origin = None  # (wall clock, capture time) when playback started
+        self.seek(len(reader) - 1)
+
+    @property
+    def latest(self) -> Optional[Snapshot]:
+        return self._latest
+
+    def _load_graphs(self, index: int):
+        """Refill the graph history with the frames leading up to index, read from the index alone"""
+        history = self.resource_history
+        history.clear()
+        for timestamp, cpu, memory in self.reader.resources(index + 1 - self.graph_points, index + 1):
+            history.store.record({'cpu': cpu, 'memory': memory}, timestamp)
+
+    def seek(self, index: int):
+        """Move to frame index, clamped to the capture"""
+        index = max(self.reader.start, min(index, len(self.reader) - 1))
+        if index == self.position:
+            return
+        frame = self.reader.frame(index)
+        with self.lock:
+            self._load_graphs(index)
+        self.position = index
+        self._seq += 1
+        # No delta: consecutive replay positions need not be consecutive samples
+        self._latest = Snapshot(
+            seq=self._seq,
+            timestamp=frame.timestamp,
+            processes=MappingProxyType(frame.processes),
+            delta=None,
+            resources_ok=True,
+        )
+
+    def step(self, frames: int):
+        self.seek(self.position + frames)
+
+    def seek_time(self, timestamp: float):
+        """Move to the last frame recorded at or before timestamp"""
+        self.seek(self.reader.find(timestamp))
+
+    def toggle_play(self):
+        self.playing = not self.playing
+        if self.playing and self.position >= len(self.reader) - 1:
+            self.seek(self.reader.start)
+        self._play_origin = (time.monotonic(), self.reader.timestamp(self.position)) if self.playing else None
+
+    def tick(self):
+        """Advance playback to the frame matching the elapsed wall-clock time"""
+        if not self.playing:
+            return
+        started, capture_start = self._play_origin
+        self.seek_time(capture_start + time.monotonic() - started)
+        if self.position >= len(self.reader) - 1:
+            self.playing = False
+
+    def describe(self) -> str:
+        """Position summary for the status bar"""
+        when = datetime.fromtimestamp(self.reader.timestamp(self.position)).strftime('%Y-%m-%d %H:%M:%S')
+        state = "playing" if self.playing else "paused"
+        return f"Replay {when} ({self.position + 1}/{len(self.reader)}, {state})"
+
+    def stop(self):
+        self.playing = False
+        self.reader.close()
+
+
+def record_details(record: Dict) -> Dict:
+    """Build the process details dict of draw_process_details() from a captured record"""
+    create_time = record.get('create_time')
+    uid = record.get('uid')
+    return {
+        'pid': record['pid'],
+        'name': record.get('name', ""),
+        'status': record.get('status', "?"),
+        'cpu_percent': record.get('cpu_percent', 0.0),
+        'memory_percent': record.get('memory_percent', 0.0),
+        'create_time': datetime.fromtimestamp(create_time).strftime('%Y-%m-%d %H:%M:%S') if create_time else "?",
+        'username': username_for_uid(uid) if uid is not None else "?",
+        'cmdline': record.get('cmdline', ""),
+    }
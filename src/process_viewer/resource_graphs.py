@@ -1,51 +1,160 @@
+import math
 import psutil
 from collections import deque
-from datetime import datetime
-from typing import List, Tuple
+from itertools import islice
+from typing import Dict, List, Optional, Sequence, Tuple
 
-class ResourceHistory:
-    def __init__(self, max_points=60):
-        self.max_points = max(1, max_points)  # Ensure at least 1 point
-        self.cpu_history = deque(maxlen=max_points)
-        self.memory_history = deque(maxlen=max_points)
-        self.timestamps = deque(maxlen=max_points)
-        
-    def update(self):
-        """Update resource history with current values"""
-        try:
-            cpu = psutil.cpu_percent(interval=0)
-            memory = psutil.virtual_memory().percent
-            timestamp = datetime.now()
-            
-            # Ensure values are within valid range
-            cpu = max(0, min(100, cpu))
-            memory = max(0, min(100, memory))
-            
-            self.cpu_history.append(cpu)
-            self.memory_history.append(memory)
-            self.timestamps.append(timestamp)
-            return True
-        except Exception:
-            return False
+from process_viewer.cpu_stat import CpuSample, CpuStat
+from process_viewer.system_metrics import SystemMetrics, default_metrics
+from process_viewer.timeseries import DEFAULT_TIERS, RingBuffer, RowRing, SeriesStore
 
-    def get_cpu_graph(self, width: int, height: int) -> List[str]:
-        """Generate ASCII graph for CPU usage"""
-        return self._generate_graph(list(self.cpu_history), width, height, "CPU Usage %")
+# Braille dot bits for the four sub-rows of a cell, listed bottom to top
+BRAILLE_LEFT = (0x40, 0x04, 0x02, 0x01)
+BRAILLE_RIGHT = (0x80, 0x20, 0x10, 0x08)
+BRAILLE_BASE = 0x2800
 
-    def get_memory_graph(self, width: int, height: int) -> List[str]:
-        """Generate ASCII graph for memory usage"""
-        return self._generate_graph(list(self.memory_history), width, height, "Memory Usage %")
+GRAPH_MODES = ('block', 'braille')
 
-    def _generate_graph(self, data: List[float], width: int, height: int, title: str) -> List[str]:
-        """Generate ASCII graph from data points"""
+# 'total' graphs overall CPU usage, 'cores' shows the per-core heatmap
+CPU_VIEWS = ('total', 'cores')
+
+# Heatmap glyph for each whole CPU percentage: blank below 5 %, then one
+# shade per quarter
+HEAT_GLYPHS = tuple(" " if value < 5 else " ░▒▓█"[min(4, 1 + value // 25)] for value in range(101))
+
+
+class GraphRasterizer:
+    """
+    Incrementally maintained plot area for one data series.
+
+    The plot is kept as one string per row. When new samples arrive the rows
+    are shifted left and only the newest column is rasterized; a full rebuild
+    only happens when the size or mode changes or too many samples were
+    missed. Columns are cached by their fill level, so rasterizing a sample is
+    usually a dictionary lookup.
+
+    In 'block' mode each sample is one character column. In 'braille' mode
+    each character holds two samples side by side and four vertical dots,
+    doubling the horizontal and quadrupling the vertical resolution.
+    """
+
+    def __init__(self, mode: str = 'block'):
+        self.mode = mode
+        self._shape = None          # (mode, graph_width, graph_height) of the cached rows
+        self._rows: List[str] = []
+        self._total = 0             # Sample count the rows were built from
+        self._last_value = None     # Left half of a half-filled braille column
+        self._columns: Dict[Tuple, str] = {}
+        self._labels: List[str] = []
+
+    def _block_column(self, value: float, graph_height: int) -> str:
+        """Return a column (top to bottom) for one sample in block mode"""
+        scale = (graph_height - 1) / 100
+        height_at_x = value * scale
+        # Rows y with graph_height - y <= height_at_x are filled
+        filled = max(0, min(graph_height, graph_height - math.ceil(graph_height - height_at_x)))
+        if height_at_x >= graph_height * 0.8:
+            glyph = "▆"  # Full block for high values
+        elif height_at_x >= graph_height * 0.6:
+            glyph = "▅"  # High-medium block
+        elif height_at_x >= graph_height * 0.4:
+            glyph = "▄"  # Medium block
+        elif height_at_x >= graph_height * 0.2:
+            glyph = "▃"  # Low block
+        else:
+            glyph = "▂"  # Very low block
+        key = (filled, glyph)
+        column = self._columns.get(key)
+        if column is None:
+            column = self._columns[key] = " " * (graph_height - filled) + glyph * filled
+        return column
+
+    def _braille_column(self, left: Optional[float], right: Optional[float], graph_height: int) -> str:
+        """Return a column (top to bottom) holding two samples in braille mode"""
+        dots = graph_height * 4
+        left_level = round(left * dots / 100) if left is not None else 0
+        right_level = round(right * dots / 100) if right is not None else 0
+        key = (left_level, right_level)
+        column = self._columns.get(key)
+        if column is None:
+            cells = []
+            for row in range(graph_height):
+                base = (graph_height - 1 - row) * 4
+                code = BRAILLE_BASE
+                for sub in range(4):
+                    if base + sub < left_level:
+                        code |= BRAILLE_LEFT[sub]
+                    if base + sub < right_level:
+                        code |= BRAILLE_RIGHT[sub]
+                cells.append(chr(code) if code != BRAILLE_BASE else " ")
+            column = self._columns[key] = "".join(cells)
+        return column
+
+    def _rebuild(self, data: Sequence[float], total: int, graph_width: int, graph_height: int):
+        samples_per_column = 2 if self.mode == 'braille' else 1
+        wanted = graph_width * samples_per_column
+        tail = list(islice(reversed(data), wanted))[::-1]
+        first = total - len(tail)  # Absolute index of the first sample in tail
+
+        columns = []
+        if self.mode == 'braille':
+            index = 0
+            if first % 2 == 1 and tail:
+                # First sample is the right half of a column whose left half was dropped
+                columns.append(self._braille_column(None, tail[0], graph_height))
+                index = 1
+            while index < len(tail):
+                right = tail[index + 1] if index + 1 < len(tail) else None
+                columns.append(self._braille_column(tail[index], right, graph_height))
+                index += 2
+            self._last_value = tail[-1] if total % 2 == 1 and tail else None
+        else:
+            columns = [self._block_column(value, graph_height) for value in tail]
+        columns = columns[-graph_width:]
+
+        blank = " " * (graph_width - len(columns))
+        self._rows = [blank + "".join(column[y] for column in columns) for y in range(graph_height)]
+
+    def _append(self, values: Sequence[float], total: int, graph_height: int):
+        """Shift the rows for newly appended samples, rasterizing only the new columns"""
+        rows = self._rows
+        first = total - len(values)
+        for offset, value in enumerate(values):
+            index = first + offset
+            if self.mode == 'braille':
+                if index % 2 == 1:
+                    # Complete the half-filled newest column in place
+                    column = self._braille_column(self._last_value, value, graph_height)
+                    rows = [row[:-1] + column[y] for y, row in enumerate(rows)]
+                    self._last_value = None
+                    continue
+                column = self._braille_column(value, None, graph_height)
+                self._last_value = value
+            else:
+                column = self._block_column(value, graph_height)
+            rows = [row[1:] + column[y] for y, row in enumerate(rows)]
+        self._rows = rows
+
+    def render(self, data: Sequence[float], total: int, width: int, height: int, title: str) -> List[str]:
+        """
+        Render data as graph lines
+
+        Args:
+            data: Most recent samples, oldest first, already clamped to 0-100
+            total: Number of samples ever appended to the series; used to tell
+                how many of the samples in data are new since the last render
+            width, height: Size of the graph including title, labels and axis
+            title: Title shown above the graph
+        """
         # Ensure positive dimensions
         width = max(10, width)
         height = max(3, height)  # Minimum height for title and axis
-        
+
         # Handle empty data case
         if not data:
             empty_graph = [" " * width for _ in range(height)]
             empty_graph[0] = f"{title} (No data)".center(width)
+            self._shape = None
             return empty_graph
 
         try:
@@ -53,61 +162,229 @@ class ResourceHistory:
             graph_height = max(1, height - 2)  # Reserve space for title and labels
             graph_width = max(4, width - 6)    # Reserve space for y-axis labels
 
-            # Ensure proper bounds and scaling for percentage values
-            max_value = 100  # Fixed max for percentage values
-            min_value = 0    # Fixed min for percentage values
-            value_range = max_value - min_value
-            scale = (graph_height - 1) / value_range if value_range > 0 else 1
-            
-            # Ensure data points are within valid range
-            data = [max(min_value, min(max_value, d)) for d in data]
-
-            # Generate graph lines
-            lines = []
-            
-            # Add title
-            lines.append(f"{title:^{width}}")
-
-            # Generate graph body
-            for y in range(graph_height):
-                value = max_value - (y / scale) if scale != 0 else 0
-                line = f"{value:4.0f}│"
-                
-                for x in range(min(len(data), graph_width)):
-                    try:
-                        data_idx = -(graph_width - x)  # Start from the most recent data
-                        if abs(data_idx) <= len(data):
-                            data_value = data[data_idx]
-                            height_at_x = (data_value - min_value) * scale
-                            
-                            if graph_height - y <= height_at_x:
-                                # Use enhanced gradient effect with custom colors
-                                if height_at_x >= graph_height * 0.8:
-                                    line += "▆"  # Full block for high values
-                                elif height_at_x >= graph_height * 0.6:
-                                    line += "▅"  # High-medium block
-                                elif height_at_x >= graph_height * 0.4:
-                                    line += "▄"  # Medium block
-                                elif height_at_x >= graph_height * 0.2:
-                                    line += "▃"  # Low block
-                                else:
-                                    line += "▂"  # Very low block
-                            else:
-                                line += " "
-                        else:
-                            line += " "
-                    except IndexError:
-                        line += " "
-                
-                lines.append(line)
-
-            # Add x-axis
-            lines.append("    └" + "─" * graph_width)
+            shape = (self.mode, graph_width, graph_height)
+            new_samples = total - self._total
+            capacity = graph_width * (2 if self.mode == 'braille' else 1)
+            # Rebuild when samples older than the plot's left edge drop out of a short history
+            truncated = len(data) < capacity and total > len(data)
+            if shape != self._shape or new_samples < 0 or new_samples >= capacity or truncated:
+                if self._shape is None or (self._shape[0], self._shape[2]) != (self.mode, graph_height):
+                    # Cached columns and labels depend on the mode and plot height
+                    self._columns = {}
+                    scale = (graph_height - 1) / 100
+                    self._labels = [f"{100 - (y / scale) if scale != 0 else 0:4.0f}│" for y in range(graph_height)]
+                self._rebuild(data, total, graph_width, graph_height)
+                self._shape = shape
+            elif new_samples:
+                self._append(list(islice(reversed(data), new_samples))[::-1], total, graph_height)
+            self._total = total
 
+            lines = [f"{title:^{width}}"]
+            lines.extend([label + row for label, row in zip(self._labels, self._rows)])
+            lines.append("    └" + "─" * graph_width)
             return lines
-            
+
         except Exception:
             # Fallback to empty graph on error
+            self._shape = None
             empty_graph = [" " * width for _ in range(height)]
             empty_graph[0] = f"{title} (Error)".center(width)
             return empty_graph
+
+
+class ResourceHistory:
+    """
+    System-wide resource history kept in fixed-size ring buffers.
+
+    Every update appends one sample per series to a SeriesStore, which keeps
+    each series at 1 s, 10 s and 1 min resolution by default. Graphs are drawn
+    from the tier selected by graph_resolution.
+
+    Per-core usage is kept separately in a RowRing at full resolution only,
+    one row per update, and shown as a heatmap with one character per sample
+    and one row per group of cores. On machines with several NUMA nodes each
+    node's usage is also recorded as a 'nodeN' series.
+    """
+
+    def __init__(self, max_points=600, tiers=None, metrics: Optional[SystemMetrics] = None):
+        self.max_points = max(1, max_points)  # Ensure at least 1 point
+        if tiers is None:
+            tiers = ((1, self.max_points),) + DEFAULT_TIERS[1:]
+        self.store = SeriesStore(tiers, names=self.SERIES)
+        self.graph_mode = 'block'
+        self.graph_resolution = self.store.resolutions[0]
+        self._rasterizers: Dict[Tuple[str, int], GraphRasterizer] = {}
+        self._last_io = None  # (timestamp, disk counters, net counters) of the previous update
+        self.last_values: Dict[str, float] = {}  # Values recorded by the most recent update
+        self.metrics = metrics or default_metrics()  # Refreshed by every update
+        self.core_history: Optional[RowRing] = None  # Per-core usage, cores in CpuStat.cpus order
+        self.cpu_view = 'total'
+        self._heatmap = None  # (layout, total, deque of rendered sample columns)
+
+    # Series recorded on every update
+    SERIES = ('cpu', 'memory', 'swap', 'load', 'disk_read', 'disk_write', 'net_recv', 'net_sent')
+
+    @property
+    def cpu_history(self) -> RingBuffer:
+        return self.store['cpu'].view(self.graph_resolution)
+
+    @property
+    def memory_history(self) -> RingBuffer:
+        return self.store['memory'].view(self.graph_resolution)
+
+    @property
+    def timestamps(self) -> RingBuffer:
+        return self.store['cpu'].timestamps(self.graph_resolution)
+
+    @property
+    def cpu_stat(self) -> CpuStat:
+        return self.metrics.cpu_stat
+
+    @property
+    def samples(self) -> int:
+        """Total number of updates"""
+        return self.store['cpu'].values[0].total
+
+    def clear(self):
+        """Forget all recorded samples; the series rings are kept for reuse"""
+        self.store.clear()
+        self._rasterizers = {}  # They track sample totals, which no longer match the data
+        self._last_io = None
+        self.last_values = {}
+        self.core_history = None
+        self._heatmap = None
+
+    def _io_rates(self, timestamp: float) -> Dict[str, float]:
+        """Disk and network throughput in bytes/s since the previous update"""
+        disk = psutil.disk_io_counters()
+        net = psutil.net_io_counters()
+        rates = {}
+        if self._last_io is not None:
+            last_time, last_disk, last_net = self._last_io
+            elapsed = timestamp - last_time
+            if elapsed > 0:
+                if disk and last_disk:
+                    rates['disk_read'] = (disk.read_bytes - last_disk.read_bytes) / elapsed
+                    rates['disk_write'] = (disk.write_bytes - last_disk.write_bytes) / elapsed
+                if net and last_net:
+                    rates['net_recv'] = (net.bytes_recv - last_net.bytes_recv) / elapsed
+                    rates['net_sent'] = (net.bytes_sent - last_net.bytes_sent) / elapsed
+        self._last_io = (timestamp, disk, net)
+        return rates
+
+    def _record_cores(self, sample: CpuSample):
+        if self.core_history is None or self.core_history.width != len(sample.cores):
+            self.core_history = RowRing(self.max_points, len(sample.cores))
+        self.core_history.append(sample.cores)
+
+    def update(self):
+        """Update resource history with current values"""
+        try:
+            system = self.metrics.refresh()
+            sample = system.cpu
+            cpu = system.cpu_percent
+            memory = system.memory.percent
+            timestamp = system.timestamp
+
+            # Ensure values are within valid range
+            cpu = max(0, min(100, cpu))
+            memory = max(0, min(100, memory))
+
+            values = {
+                'cpu': cpu,
+                'memory': memory,
+                'swap': system.swap.percent,
+                'load': system.load[0],
+            }
+            values.update(self._io_rates(timestamp))
+            if sample is not None:
+                self._record_cores(sample)
+                if len(sample.nodes) > 1:
+                    values.update((f'node{index}', usage) for index, usage in enumerate(sample.nodes))
+            self.store.record(values, timestamp)
+            self.last_values = values
+            return True
+        except Exception:
+            return False
+
+    def _render(self, series: str, width: int, height: int, title: str) -> List[str]:
+        view = self.store[series].view(self.graph_resolution)
+        resolution = self.store[series].resolutions[self.store[series].tier_for(self.graph_resolution)]
+        key = (series, resolution)
+        rasterizer = self._rasterizers.get(key)
+        if rasterizer is None:
+            rasterizer = self._rasterizers[key] = GraphRasterizer()
+        rasterizer.mode = self.graph_mode
+        if resolution != self.store.resolutions[0]:
+            title = f"{title} ({resolution}s avg)"
+        return rasterizer.render(view, view.total, width, height, title)
+
+    def get_cpu_graph(self, width: int, height: int) -> List[str]:
+        """Generate ASCII graph for CPU usage"""
+        if self.cpu_view == 'cores':
+            return self.get_core_heatmap(width, height)
+        return self._render('cpu', width, height, "CPU Usage %")
+
+    def _heatmap_rows(self, cores: int, max_rows: int) -> Tuple[int, List[Tuple[int, int]]]:
+        """Group core positions into at most max_rows rows that never span two NUMA nodes"""
+        spans = self.cpu_stat.node_spans
+        if not spans or spans[-1][1] != cores:
+            spans = [(0, cores)]
+        per_row = max(1, -(-cores // max(1, max_rows)))
+        while True:
+            rows = [(first, min(first + per_row, end)) for start, end in spans for first in range(start, end, per_row)]
+            if len(rows) <= max_rows or per_row >= cores:
+                return per_row, rows
+            per_row += 1
+
+    def get_core_heatmap(self, width: int, height: int) -> List[str]:
+        """
+        Render per-core usage as a heatmap: one row per group of cores, one
+        column per sample, shaded by the busiest core of the group
+        """
+        width = max(10, width)
+        height = max(3, height)
+        title = "CPU Cores %"
+        history = self.core_history
+        if history is None or not len(history):
+            lines = [" " * width for _ in range(height)]
+            lines[0] = f"{title} (No data)".center(width)
+            return lines
+
+        graph_width = max(4, width - 6)
+        per_row, rows = self._heatmap_rows(history.width, max(1, height - 2))
+        layout = (graph_width, tuple(rows))
+        cached = self._heatmap
+        if cached is None or cached[0] != layout or history.total - cached[1] > graph_width:
+            columns = deque(maxlen=graph_width)
+            new_rows = history.rows(graph_width)
+        else:
+            columns = cached[2]
+            new_rows = history.rows(history.total - cached[1])
+        for sample in new_rows:
+            columns.append("".join([HEAT_GLYPHS[max(0, min(100, int(max(sample[start:end]))))] for start, end in rows]))
+        self._heatmap = (layout, history.total, columns)
+
+        if per_row > 1:
+            title = f"{title} (busiest of {per_row} per row)"
+        node_values = [self.last_values.get(f'node{index}') for index in range(len(self.cpu_stat.node_spans))]
+        if len(node_values) > 1 and None not in node_values:
+            title += "  " + " ".join(f"N{index}:{usage:.0f}%" for index, usage in enumerate(node_values))
+
+        blank = " " * (graph_width - len(columns))
+        cpus = self.cpu_stat.cpus
+        lines = [f"{title:^{width}}"]
+        for y, (start, _) in enumerate(rows):
+            label = f"{cpus[start] if start < len(cpus) else start:>4}│"
+            lines.append(label + blank + "".join(column[y] for column in columns))
+        lines.append("    └" + "─" * graph_width)
+        return lines
+
+    def get_memory_graph(self, width: int, height: int) -> List[str]:
+        """Generate ASCII graph for memory usage"""
+        return self._render('memory', width, height, "Memory Usage %")
+
+    def _generate_graph(self, data: List[float], width: int, height: int, title: str) -> List[str]:
+        """Generate ASCII graph from data points without using the incremental cache"""
+        data = [max(0, min(100, d)) for d in data]
+        return GraphRasterizer(self.graph_mode).render(data, len(data), width, height, title)
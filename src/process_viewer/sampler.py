@@ -0,0 +1,141 @@
+"""
+Background sampling of processes and system resources.
+
+The Sampler thread refreshes the ProcessManager table and the ResourceHistory
+on a fixed cadence and publishes the result as an immutable Snapshot. The
+curses loop only ever reads the latest snapshot, so a slow /proc scan no
+longer delays keystrokes and the graph samples stay evenly spaced. Given an
+AdaptiveScheduler, the cadence follows the viewer's own CPU cost instead.
+"""
+
+import threading
+import time
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional
+
+from process_viewer.process_table import TableDelta
+from process_viewer.profiling import TIMINGS
+from process_viewer.scheduler import AdaptiveScheduler
+
+
+class Snapshot(NamedTuple):
+    """One published sample of the process table"""
+    seq: int                      # Increments with every published snapshot
+    timestamp: float              # Wall-clock time the sample was taken
+    processes: Mapping[int, dict]  # Read-only pid -> record view
+    delta: TableDelta             # Changes since the previous snapshot
+    resources_ok: bool            # Whether ResourceHistory.update() succeeded
+    error: Optional[str] = None   # Collection error message, if any
+
+
+class Sampler(threading.Thread):
+    """
+    Collector thread publishing snapshots at a fixed interval.
+
+    ResourceHistory is written by this thread, so readers on other threads
+    should hold `lock` while generating graphs from it. run() may also be
+    called directly to sample on the calling thread, as headless recording
+    does.
+    """
+
+    def __init__(self, process_manager, resource_history, interval: float = 1.0, on_sample=None,
+                 scheduler: Optional[AdaptiveScheduler] = None):
+        """
+        Args:
+            process_manager: ProcessManager refreshed on every tick
+            resource_history: ResourceHistory updated on every tick
+            interval: Seconds between samples
+            on_sample: Optional callback receiving each published Snapshot on
+                the sampling thread
+            scheduler: Optional AdaptiveScheduler that sets the interval after
+                every sample
+        """
+        super().__init__(name="process-viewer-sampler", daemon=True)
+        self.process_manager = process_manager
+        self.resource_history = resource_history
+        self.interval = max(0.05, interval)
+        self.on_sample = on_sample
+        self.scheduler = scheduler
+        self.lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._seq = 0
+        self._latest: Optional[Snapshot] = None
+        self._generation = None  # Table generation of the latest snapshot
+
+    @property
+    def latest(self) -> Optional[Snapshot]:
+        """The most recently published snapshot"""
+        return self._latest
+
+    def sample(self) -> Snapshot:
+        """Take one sample and publish it"""
+        error = None
+        try:
+            delta = self.process_manager.refresh()
+        except Exception as e:
+            delta = TableDelta()
+            error = f"Error updating process list: {str(e)}"
+
+        with self.lock, TIMINGS.stage('resources'):
+            resources_ok = self.resource_history.update()
+
+        # Copying the table is O(N); when nothing changed since the previous
+        # snapshot (and nothing else refreshed the table), its view is still exact
+        generation = self.process_manager.generation
+        previous = self._latest
+        if previous is not None and not delta and generation == self._generation + 1:
+            processes = previous.processes
+        else:
+            processes = MappingProxyType(dict(self.process_manager.table.records))
+        self._generation = generation
+
+        self._seq += 1
+        snapshot = Snapshot(
+            seq=self._seq,
+            timestamp=time.time(),
+            processes=processes,
+            delta=delta,
+            resources_ok=resources_ok,
+            error=error,
+        )
+        self._latest = snapshot
+        if self.on_sample is not None:
+            self.on_sample(snapshot)
+        return snapshot
+
+    def run(self):
+        next_tick = time.monotonic()
+        if self._latest is not None:
+            # A sample was just taken synchronously; CPU deltas need a full interval
+            next_tick += self.interval
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            if now >= next_tick:
+                self.sample()
+                if self.scheduler is not None:
+                    self.interval = self.scheduler.tick(self.resource_history.last_values.get('cpu'))
+                # Keep a fixed cadence; skip ticks rather than bunching them up
+                next_tick += self.interval
+                now = time.monotonic()
+                if next_tick < now:
+                    next_tick = now + self.interval - (now - next_tick) % self.interval
+            self._wake_event.wait(next_tick - now)
+            if self._wake_event.is_set():
+                self._wake_event.clear()
+                if self.scheduler is not None:
+                    # The interval may have shortened; bring the next tick forward
+                    previous_tick = next_tick - self.interval
+                    self.interval = self.scheduler.next_interval()
+                    next_tick = min(next_tick, previous_tick + self.interval)
+
+    def wake(self):
+        """Have the scheduler reconsider the interval now, e.g. after a key press"""
+        self._wake_event.set()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Ask the thread to exit and wait for it"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self.is_alive():
+            self.join(timeout)
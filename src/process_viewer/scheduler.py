@@ -0,0 +1,105 @@
+"""
+Adaptive sampling interval.
+
+A full scan costs the viewer CPU time in proportion to the number of
+processes, so a fixed one second interval that is free on a laptop makes the
+viewer a noticeable load on a host with tens of thousands of PIDs.
+AdaptiveScheduler measures the viewer's own CPU time (all threads: sampling,
+history and drawing) per sample and stretches the interval until that cost
+stays within a budget, a fraction of one core. The budget is raised while the
+system is calm, since spare CPU is then there for the taking, and while the
+user is interacting, so the screen keeps up with them. The interval never
+drops below the requested one.
+"""
+
+import time
+from typing import Optional
+
+DEFAULT_BUDGET = 0.02    # Fraction of one core the viewer may use
+MAX_INTERVAL = 10.0      # Longest interval the scheduler backs off to, in seconds
+CALM_CPU = 25.0          # System CPU % below which the system counts as calm
+CALM_BOOST = 2.0         # Budget multiplier while the system is calm
+INTERACTIVE_BOOST = 4.0  # Budget multiplier while the user is interacting
+INTERACTIVE_HOLD = 5.0   # Seconds after the last key that count as interacting
+SMOOTHING = 0.3          # Weight of the newest cost in the moving average
+
+
+class AdaptiveScheduler:
+    """Sampling interval that keeps the viewer's own CPU use within a budget."""
+
+    def __init__(self, interval: float = 1.0, budget: Optional[float] = DEFAULT_BUDGET,
+                 max_interval: float = MAX_INTERVAL, clock=time.monotonic, cpu_clock=time.process_time):
+        """
+        Args:
+            interval: Shortest interval, the one asked for with --interval
+            budget: Fraction of one core the viewer may use, or None to
+                always sample at interval
+            max_interval: Longest interval to back off to
+            clock, cpu_clock: Wall clock and process CPU clock, in seconds
+        """
+        self.min_interval = interval
+        self.max_interval = max(interval, max_interval)
+        self.budget = budget
+        self.interval = interval
+        self.cost: Optional[float] = None   # Smoothed CPU seconds spent per sample
+        self.usage = 0.0                    # Fraction of a core used over the last sample
+        self.calm = False
+        self._clock = clock
+        self._cpu_clock = cpu_clock
+        self._last = None                   # (wall, cpu) time of the previous tick
+        self._last_input = None
+
+    def interaction(self):
+        """Note a key press; the budget is raised for INTERACTIVE_HOLD seconds"""
+        self._last_input = self._clock()
+
+    @property
+    def interacting(self) -> bool:
+        return self._last_input is not None and self._clock() - self._last_input < INTERACTIVE_HOLD
+
+    @property
+    def effective_budget(self) -> Optional[float]:
+        if self.budget is None:
+            return None
+        budget = self.budget
+        if self.calm:
+            budget *= CALM_BOOST
+        if self.interacting:
+            budget *= INTERACTIVE_BOOST
+        return budget
+
+    def tick(self, system_cpu: Optional[float] = None) -> float:
+        """
+        Account for the sample just taken and return the interval until the next
+
+        Args:
+            system_cpu: System-wide CPU usage in percent, if known
+        """
+        now, cpu = self._clock(), self._cpu_clock()
+        if self._last is not None:
+            wall, spent = now - self._last[0], cpu - self._last[1]
+            self.usage = spent / wall if wall > 0 else 0.0
+            self.cost = spent if self.cost is None else SMOOTHING * spent + (1 - SMOOTHING) * self.cost
+        self._last = (now, cpu)
+        self.calm = system_cpu is not None and system_cpu < CALM_CPU
+        return self.next_interval()
+
+    def next_interval(self) -> float:
+        """The interval the current cost and budget call for"""
+        budget = self.effective_budget
+        if budget is None or not budget > 0 or self.cost is None:
+            self.interval = self.min_interval
+        else:
+            self.interval = max(self.min_interval, min(self.max_interval, self.cost / budget))
+        return self.interval
+
+    def describe(self) -> str:
+        """Effective rate for the status bar"""
+        if self.interval >= 1.0:
+            rate = f"every {self.interval:.1f}s"
+        else:
+            rate = f"{1 / self.interval:.1f}/s"
+        text = f"Rate: {rate}"
+        if self.budget is not None:
+            text += f" (self {self.usage * 100:.1f}% of {self.effective_budget * 100:.3g}%)"
+        return text
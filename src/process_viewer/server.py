@@ -0,0 +1,410 @@
+"""
+Metrics endpoint.
+
+`process-viewer serve` samples processes and system resources on one
+background Sampler and answers any number of clients from it, over localhost
+HTTP or a Unix socket:
+
+    GET /metrics          Prometheus text exposition of the system figures
+                          and one series per process (?limit=N keeps the
+                          top N by CPU)
+    GET /api/processes    JSON process table; ?sort=cpu|mem|<column>,
+                          ?limit=N, ?name=<search term>, ?user=<name>,
+                          ?status=, ?min_cpu=, ?min_memory=
+    GET /api/system       JSON system snapshot and latest resource values
+    GET /api/history      JSON ResourceHistory series; ?series=cpu,
+                          ?points=N, ?resolution=seconds
+
+Responses are cached per sampling tick and query string, so any number of
+concurrent scrapes between two ticks cost one rendering each and never
+trigger a /proc scan of their own.
+"""
+
+import argparse
+import heapq
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from process_viewer.collectors import create_collector
+from process_viewer.filters import ProcessFilter
+from process_viewer.process_manager import ProcessManager
+from process_viewer.process_tree import sort_spec
+from process_viewer.resource_graphs import ResourceHistory
+from process_viewer.sampler import Sampler
+from process_viewer.utils import username_for_uid
+
+DEFAULT_LISTEN = "127.0.0.1:9775"
+
+# Cached responses kept per tick; distinct query strings beyond this are
+# rendered but not cached
+MAX_CACHED_RESPONSES = 256
+
+# Pending connections queued by the kernel, enough for a burst of scrapers
+REQUEST_QUEUE_SIZE = 128
+
+# Record keys that are not part of the public process fields
+PRIVATE_FIELDS = frozenset(('name_lower', 'cmdline_lower'))
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+JSON_CONTENT_TYPE = "application/json"
+
+
+class RequestError(Exception):
+    """A client error answered with an HTTP status code."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _label(value) -> str:
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _int_param(query: Dict[str, str], name: str, default: Optional[int] = None) -> Optional[int]:
+    value = query.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise RequestError(400, f"{name} must be an integer")
+    if number <= 0:
+        raise RequestError(400, f"{name} must be positive")
+    return number
+
+
+def _float_param(query: Dict[str, str], name: str) -> Optional[float]:
+    value = query.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise RequestError(400, f"{name} must be a number")
+
+
+class MetricsService:
+    """Renders endpoint responses from the latest sample, cached per tick."""
+
+    def __init__(self, sampler: Sampler):
+        """
+        Args:
+            sampler: Sampler whose snapshots and ResourceHistory are served
+        """
+        self.sampler = sampler
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Tuple[str, bytes]] = {}
+        self._cache_seq = None
+        self.routes = {
+            '/metrics': self.metrics,
+            '/api/processes': self.processes,
+            '/api/system': self.system,
+            '/api/history': self.history,
+        }
+
+    def respond(self, target: str) -> Tuple[str, bytes]:
+        """
+        Return (content type, body) for a request target
+
+        Raises:
+            RequestError: The path is unknown or a parameter is invalid
+        """
+        url = urlsplit(target)
+        handler = self.routes.get(url.path.rstrip('/') or '/')
+        if handler is None:
+            raise RequestError(404, f"Unknown path: {url.path}")
+        snapshot = self.sampler.latest
+        if snapshot is None:
+            raise RequestError(503, "No sample taken yet")
+        key = f"{url.path}?{url.query}"
+        # Rendering happens under the lock, so concurrent identical requests
+        # wait for the first one instead of rendering the same response again
+        with self._lock:
+            if self._cache_seq != snapshot.seq:
+                self._cache = {}
+                self._cache_seq = snapshot.seq
+            response = self._cache.get(key)
+            if response is None:
+                query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                response = handler(snapshot, query)
+                if len(self._cache) < MAX_CACHED_RESPONSES:
+                    self._cache[key] = response
+        return response
+
+    def _select(self, snapshot, query: Dict[str, str], default_sort: str = 'cpu') -> List[Dict]:
+        """Filter, sort and limit the snapshot's processes as the query asks"""
+        process_filter = ProcessFilter(
+            search_term=query.get('name', ""),
+            status=query.get('status'),
+            min_cpu=_float_param(query, 'min_cpu'),
+            min_memory=_float_param(query, 'min_memory'),
+            user_filter=query.get('user'),
+        )
+        # Fields a filter needs beyond the basics (cmdline for cmd:) are collected
+        # from the next sample on, for as long as requests keep asking for them;
+        # until then nothing matches on them
+        self.sampler.process_manager.request_fields(process_filter.fields)
+        processes = process_filter.apply(snapshot.processes.values())
+        limit = _int_param(query, 'limit')
+        key, reverse = sort_spec(query.get('sort', default_sort), self.sampler.process_manager.history)
+        if key is None:
+            key = lambda p: p['pid']
+        if limit is not None:
+            return heapq.nlargest(limit, processes, key) if reverse else heapq.nsmallest(limit, processes, key)
+        return sorted(processes, key=key, reverse=reverse)
+
+    def processes(self, snapshot, query: Dict[str, str]) -> Tuple[str, bytes]:
+        rows = [{field: value for field, value in process.items() if field not in PRIVATE_FIELDS}
+                for process in self._select(snapshot, query)]
+        body = {'timestamp': snapshot.timestamp, 'seq': snapshot.seq, 'count': len(rows), 'processes': rows}
+        return JSON_CONTENT_TYPE, json.dumps(body, separators=(',', ':')).encode()
+
+    def system(self, snapshot, query: Dict[str, str]) -> Tuple[str, bytes]:
+        resource_history = self.sampler.resource_history
+        with self.sampler.lock:
+            values = dict(resource_history.last_values)
+        body = {'timestamp': snapshot.timestamp, 'seq': snapshot.seq, 'resources': values}
+        system = resource_history.metrics.latest
+        if system is not None:
+            body.update({
+                'cpu_percent': system.cpu_percent,
+                'cores': system.cpu.cores if system.cpu is not None else None,
+                'memory': system.memory._asdict(),
+                'swap': system.swap._asdict(),
+                'load': system.load,
+                'pressure': {resource: {kind: value._asdict() for kind, value in kinds.items()}
+                             for resource, kinds in system.pressure.items()},
+                'ctx_switches_per_sec': system.ctx_switches,
+                'interrupts_per_sec': system.interrupts,
+                'procs_running': system.procs_running,
+                'procs_blocked': system.procs_blocked,
+            })
+        return JSON_CONTENT_TYPE, json.dumps(body, separators=(',', ':')).encode()
+
+    def history(self, snapshot, query: Dict[str, str]) -> Tuple[str, bytes]:
+        store = self.sampler.resource_history.store
+        name = query.get('series', 'cpu')
+        if name not in store:
+            raise RequestError(404, f"Unknown series: {name}. Available: {', '.join(store.series)}")
+        points = _int_param(query, 'points', 60)
+        resolution = _float_param(query, 'resolution')
+        with self.sampler.lock:
+            series = store[name]
+            values = series.view(resolution).last(points)
+            times = series.timestamps(resolution).last(points)
+            tier_resolution = series.resolutions[series.tier_for(resolution)]
+        body = {'series': name, 'resolution': tier_resolution, 'timestamps': times, 'values': values}
+        return JSON_CONTENT_TYPE, json.dumps(body, separators=(',', ':')).encode()
+
+    def metrics(self, snapshot, query: Dict[str, str]) -> Tuple[str, bytes]:
+        lines = []
+
+        def gauge(name: str, help_text: str, samples):
+            lines.append(f"# HELP process_viewer_{name} {help_text}")
+            lines.append(f"# TYPE process_viewer_{name} gauge")
+            for labels, value in samples:
+                lines.append(f"process_viewer_{name}{labels} {value}")
+
+        resource_history = self.sampler.resource_history
+        with self.sampler.lock:
+            values = dict(resource_history.last_values)
+        system = resource_history.metrics.latest
+        gauge('cpu_percent', "System-wide CPU usage in percent", [("", values.get('cpu', 0.0))])
+        gauge('memory_percent', "System-wide memory usage in percent", [("", values.get('memory', 0.0))])
+        gauge('swap_percent', "Swap usage in percent", [("", values.get('swap', 0.0))])
+        for name, help_text in (('disk_read', "Disk read throughput"), ('disk_write', "Disk write throughput"),
+                                ('net_recv', "Network receive throughput"), ('net_sent', "Network send throughput")):
+            if name in values:
+                gauge(f"{name}_bytes_per_second", f"{help_text} in bytes per second", [("", values[name])])
+        if system is not None:
+            gauge('load_average', "Load average", [(f'{{period="{period}"}}', load)
+                                                   for period, load in zip(("1m", "5m", "15m"), system.load)])
+            gauge('pressure_avg10_percent', "Share of the last 10 s with tasks stalled on a resource",
+                  [(f'{{resource="{resource}",kind="{kind}"}}', value.avg10)
+                   for resource, kinds in system.pressure.items() for kind, value in kinds.items()])
+            gauge('context_switches_per_second', "Context switches per second", [("", system.ctx_switches)])
+            gauge('interrupts_per_second', "Interrupts per second", [("", system.interrupts)])
+            if system.cpu is not None:
+                gauge('core_cpu_percent', "Per-core CPU usage in percent",
+                      [(f'{{cpu="{cpu}"}}', usage) for cpu, usage in zip(resource_history.cpu_stat.cpus, system.cpu.cores)])
+
+        counts: Dict[str, int] = {}
+        for process in snapshot.processes.values():
+            counts[process['status']] = counts.get(process['status'], 0) + 1
+        gauge('processes', "Number of processes by status",
+              [(f'{{status="{_label(status)}"}}', count) for status, count in sorted(counts.items())])
+
+        processes = self._select(snapshot, query)
+        # Only the uid is collected by every backend; the name comes from the cached lookup
+        labels = [f'{{pid="{p["pid"]}",name="{_label(p["name"])}",'
+                  f'user="{_label(username_for_uid(p["uid"]) if p.get("uid") is not None else "")}"}}'
+                  for p in processes]
+        gauge('process_cpu_percent', "Per-process CPU usage in percent",
+              [(label, p['cpu_percent']) for label, p in zip(labels, processes)])
+        gauge('process_memory_percent', "Per-process memory usage in percent",
+              [(label, p['memory_percent']) for label, p in zip(labels, processes)])
+        gauge('process_rss_bytes', "Per-process resident set size in bytes",
+              [(label, p.get('rss', 0)) for label, p in zip(labels, processes)])
+        lines.append("")
+        return PROMETHEUS_CONTENT_TYPE, "\n".join(lines).encode()
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Answers GET requests from the server's MetricsService."""
+
+    server_version = "process-viewer"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        try:
+            content_type, body = self.server.service.respond(self.path)
+            status = 200
+        except RequestError as e:
+            content_type, body, status = "text/plain; charset=utf-8", f"{e}\n".encode(), e.status
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class MetricsHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server on a TCP address."""
+    daemon_threads = True
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+    def __init__(self, address, service: MetricsService, verbose: bool = False):
+        self.service = service
+        self.verbose = verbose
+        if ':' in address[0]:
+            self.address_family = socket.AF_INET6
+        super().__init__(address, MetricsRequestHandler)
+
+
+class UnixMetricsHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded HTTP server on a Unix socket."""
+    daemon_threads = True
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+    def __init__(self, path: str, service: MetricsService, verbose: bool = False):
+        self.service = service
+        self.verbose = verbose
+        # Replace a socket left behind by a previous run, but never a regular file
+        try:
+            if stat.S_ISSOCK(os.stat(path).st_mode):
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+        super().__init__(path, MetricsRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def parse_listen(spec: str) -> Tuple[str, int]:
+    """Parse a HOST:PORT (or bare PORT) --listen value"""
+    host, _, port = spec.rpartition(':')
+    host = host.strip('[]') or "127.0.0.1"
+    try:
+        return host, int(port)
+    except ValueError:
+        raise ValueError(f"Invalid listen address: {spec}")
+
+
+def serve(listen: Optional[str] = DEFAULT_LISTEN, unix_socket: Optional[str] = None, interval: float = 1.0,
+          collector: str = "auto", verbose: bool = False) -> int:
+    """
+    Sample until stopped and serve the samples over HTTP
+
+    Args:
+        listen: HOST:PORT to listen on; ignored when unix_socket is given
+        unix_socket: Path of a Unix socket to listen on instead of TCP
+        interval: Seconds between samples
+        collector: Process collector backend ('auto', 'procfs' or 'psutil')
+        verbose: Log every request to stderr
+
+    Returns:
+        The process exit status
+    """
+    process_manager = ProcessManager(create_collector(collector))
+    # Owner lookups for ?user= and the user label come from the sample, not per request
+    process_manager.add_base_fields(('uid',))
+    sampler = Sampler(process_manager, ResourceHistory(), interval=interval)
+    service = MetricsService(sampler)
+    if unix_socket:
+        server = UnixMetricsHTTPServer(unix_socket, service, verbose)
+        where = unix_socket
+    else:
+        host, port = parse_listen(listen)
+        server = MetricsHTTPServer((host, port), service, verbose)
+        where = f"http://{listen}"
+
+    def on_signal(signum, frame):
+        sampler.stop()
+
+    previous_handlers = {sig: signal.signal(sig, on_signal) for sig in (signal.SIGTERM, signal.SIGINT)}
+    sampler.sample()
+    server_thread = threading.Thread(target=server.serve_forever, name="process-viewer-server", daemon=True)
+    server_thread.start()
+    if verbose:
+        print(f"Serving on {where}", file=sys.stderr)
+    try:
+        sampler.run()  # Samples on this thread until stopped
+    finally:
+        server.shutdown()
+        server.server_close()
+        for sig, handler in previous_handlers.items():
+            signal.signal(sig, handler)
+    return 0
+
+
+def parse_serve_args(argv=None):
+    """Parse the options of the serve subcommand"""
+    parser = argparse.ArgumentParser(prog="process-viewer serve",
+                                     description="Serve process and system metrics over HTTP (Prometheus and JSON)")
+    address = parser.add_mutually_exclusive_group()
+    address.add_argument("--listen", default=DEFAULT_LISTEN,
+                         help=f"HOST:PORT to listen on (default: {DEFAULT_LISTEN})")
+    address.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="seconds between samples (default: 1.0)")
+    parser.add_argument("--collector", choices=("auto", "procfs", "psutil"), default="auto",
+                        help="process collector backend (default: auto)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request to stderr")
+    args = parser.parse_args(argv)
+    if args.interval <= 0:
+        parser.error("--interval must be positive")
+    try:
+        parse_listen(args.listen)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+
+def run_serve(argv=None) -> int:
+    """Entry point for `process-viewer serve`"""
+    args = parse_serve_args(argv)
+    return serve(args.listen, args.unix, args.interval, args.collector, args.verbose)
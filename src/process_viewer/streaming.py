@@ -0,0 +1,151 @@
+"""
+Machine-readable streaming output.
+
+`process-viewer --output jsonl|csv` writes the filtered, sorted process table
+to stdout once per interval instead of starting curses, for scripts that
+would otherwise run `ps` over and over. Every row carries the sample's
+timestamp; CSV output starts with a header line.
+
+Output goes through a fixed-size buffer that is flushed at the end of every
+tick. Writes block while the consumer is not reading, which stalls sampling;
+ticks missed that way are skipped rather than queued, so a slow consumer
+never makes memory grow.
+"""
+
+import csv
+import io
+import json
+import os
+import signal
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from process_viewer.collectors import FIELD_SOURCES, create_collector
+from process_viewer.process_manager import ProcessManager
+
+OUTPUT_FORMATS = ('jsonl', 'csv')
+
+DEFAULT_FIELDS = ('pid', 'name', 'status', 'cpu_percent', 'memory_percent')
+
+# Fields that can be requested with --fields
+STREAM_FIELDS = tuple(FIELD_SOURCES)
+
+
+def parse_fields(spec: str) -> List[str]:
+    """Parse a comma separated --fields value, rejecting unknown fields"""
+    fields = [field.strip() for field in spec.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in STREAM_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(STREAM_FIELDS)}")
+    return fields
+
+
+class StreamWriter:
+    """Encode process rows as JSON Lines or CSV into a bounded output buffer."""
+
+    def __init__(self, fmt: str, fields: Sequence[str], fd: int = 1, buffer_size: int = 65536):
+        """
+        Args:
+            fmt: 'jsonl' or 'csv'
+            fields: Record fields written per row, after the timestamp
+            fd: File descriptor to write to (stdout by default)
+            buffer_size: Bytes buffered before a write to fd is forced
+        """
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {fmt}")
+        self.fmt = fmt
+        self.fields = tuple(fields)
+        raw = io.FileIO(fd, 'w', closefd=False)
+        self.stream = io.TextIOWrapper(io.BufferedWriter(raw, buffer_size), encoding='utf-8', newline='')
+        self._csv = csv.writer(self.stream, lineterminator='\n') if fmt == 'csv' else None
+        if self._csv is not None:
+            self._csv.writerow(('timestamp',) + self.fields)
+
+    def write_tick(self, timestamp: float, processes: Iterable[Dict]):
+        """Write one row per process and flush, blocking until the consumer has room"""
+        fields = self.fields
+        timestamp = round(timestamp, 3)
+        if self._csv is not None:
+            writerow = self._csv.writerow
+            for process in processes:
+                writerow([timestamp] + [process.get(field, "") for field in fields])
+        else:
+            write = self.stream.write
+            dumps = json.dumps
+            for process in processes:
+                row = {'timestamp': timestamp}
+                for field in fields:
+                    row[field] = process.get(field)
+                write(dumps(row, separators=(',', ':')))
+                write('\n')
+        self.stream.flush()
+
+    def close(self):
+        try:
+            self.stream.flush()
+        except BrokenPipeError:
+            pass
+
+
+def stream_processes(fmt: str, fields: Sequence[str] = DEFAULT_FIELDS, interval: float = 1.0,
+                     count: Optional[int] = None, sort_by: str = 'cpu', limit: Optional[int] = None,
+                     collector: str = "auto", **filters) -> int:
+    """
+    Write the process table every interval until stopped
+
+    Args:
+        fmt: 'jsonl' or 'csv'
+        fields: Record fields to write
+        interval: Seconds between samples
+        count: Number of samples to write; None streams until the consumer
+            goes away or SIGTERM/SIGINT arrives
+        sort_by: Sort mode, see ProcessManager.order_processes()
+        limit: Only write the first limit processes of each sample
+        collector: Process collector backend ('auto', 'procfs' or 'psutil')
+        **filters: Keyword arguments accepted by ProcessManager.filter_processes()
+
+    Returns:
+        The process exit status
+    """
+    process_manager = ProcessManager(create_collector(collector))
+    process_manager.add_base_fields(fields)
+    # Collect the fields the filters and sort need from the first sample on
+    process_manager.set_filters(**filters)
+    process_manager.set_sort(sort_by)
+    writer = StreamWriter(fmt, fields)
+    stopping = []
+
+    def on_signal(signum, frame):
+        stopping.append(signum)
+
+    previous_handler = signal.signal(signal.SIGTERM, on_signal)
+    written = 0
+    next_tick = time.monotonic()
+    try:
+        while not stopping and (count is None or written < count):
+            processes = process_manager.filter_processes(
+                process_manager.get_processes(sort_by, tree_view=False, refresh=True), **filters)
+            writer.write_tick(time.time(), processes[:limit] if limit is not None else processes)
+            written += 1
+            if count is not None and written >= count:
+                break
+
+            # Keep a fixed cadence; ticks missed while blocked on the consumer are skipped
+            next_tick += interval
+            now = time.monotonic()
+            if next_tick < now:
+                next_tick = now + interval - (now - next_tick) % interval
+            time.sleep(next_tick - now)
+    except BrokenPipeError:
+        # The consumer went away (e.g. `| head`); point stdout at /dev/null so
+        # the interpreter does not complain again while exiting
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        os.close(devnull)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+        signal.signal(signal.SIGTERM, previous_handler)
+    return 0
@@ -0,0 +1,152 @@
+"""
+Shared, non-blocking system metrics.
+
+SystemMetrics takes one sample of the machine-wide figures (CPU usage, memory,
+swap, load average, pressure stall information, context switch and interrupt
+rates) and keeps it as an immutable SystemSnapshot. CPU usage and the rates
+are computed from the difference to the previous sample, so taking a sample
+never sleeps; the very first snapshot reports the average CPU usage since
+boot instead.
+
+The Sampler refreshes the snapshot on every tick through ResourceHistory.
+Other consumers call snapshot(), which returns the cached sample while it is
+younger than the TTL and only samples on its own once it has gone stale.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import psutil
+
+from process_viewer.cpu_stat import CpuSample, CpuStat
+
+PRESSURE_ROOT = '/proc/pressure'
+PRESSURE_RESOURCES = ('cpu', 'memory', 'io')
+
+
+class Pressure(NamedTuple):
+    """One line of a /proc/pressure file: share of time stalled, in percent."""
+    avg10: float
+    avg60: float
+    avg300: float
+    total: int  # Cumulative stall time in microseconds
+
+
+class SystemSnapshot(NamedTuple):
+    """Machine-wide metrics taken at one point in time."""
+    timestamp: float
+    cpu_percent: float
+    cpu: Optional[CpuSample]              # Per-core and per-node usage; None on the first sample
+    memory: Tuple                         # psutil.virtual_memory()
+    swap: Tuple                           # psutil.swap_memory()
+    load: Tuple[float, float, float]
+    pressure: Dict[str, Dict[str, Pressure]]  # 'cpu'/'memory'/'io' -> 'some'/'full' -> Pressure
+    ctx_switches: float                   # Per second since the previous sample
+    interrupts: float                     # Per second since the previous sample
+    procs_running: int
+    procs_blocked: int
+
+
+def read_pressure(root: str = PRESSURE_ROOT) -> Dict[str, Dict[str, Pressure]]:
+    """Parse /proc/pressure/*; returns {} on kernels without PSI"""
+    pressure = {}
+    for resource in PRESSURE_RESOURCES:
+        try:
+            with open(os.path.join(root, resource)) as f:
+                lines = f.read().splitlines()
+        except OSError:
+            continue
+        kinds = {}
+        for line in lines:
+            kind, *pairs = line.split()
+            values = dict(pair.split('=', 1) for pair in pairs)
+            kinds[kind] = Pressure(float(values['avg10']), float(values['avg60']),
+                                   float(values['avg300']), int(values['total']))
+        pressure[resource] = kinds
+    return pressure
+
+
+class SystemMetrics:
+    """Cached provider of SystemSnapshot, safe to share between threads."""
+
+    def __init__(self, ttl: float = 1.0, cpu_stat: Optional[CpuStat] = None, pressure_root: str = PRESSURE_ROOT):
+        """
+        Args:
+            ttl: Seconds a snapshot is served from the cache by snapshot()
+            cpu_stat: CpuStat to read CPU usage and /proc/stat counters from
+            pressure_root: Directory holding the PSI files
+        """
+        self.ttl = ttl
+        self.cpu_stat = cpu_stat or CpuStat()
+        self.pressure_root = pressure_root
+        self._lock = threading.Lock()
+        self._latest: Optional[SystemSnapshot] = None
+        self._taken = 0.0       # time.monotonic() of the latest sample
+        self._counters = None   # (monotonic time, /proc/stat counters) of the latest sample
+
+    @property
+    def latest(self) -> Optional[SystemSnapshot]:
+        """The most recent snapshot, however old, without sampling"""
+        return self._latest
+
+    def refresh(self) -> SystemSnapshot:
+        """Take a new sample now and cache it"""
+        with self._lock:
+            return self._sample()
+
+    def snapshot(self) -> SystemSnapshot:
+        """Return the cached snapshot, sampling first if it is older than the TTL"""
+        with self._lock:
+            if self._latest is not None and time.monotonic() - self._taken < self.ttl:
+                return self._latest
+            return self._sample()
+
+    def _rate(self, name: str, counters: Dict[str, int], now: float) -> float:
+        if self._counters is None:
+            return 0.0
+        last_time, last = self._counters
+        elapsed = now - last_time
+        if elapsed <= 0 or name not in counters or name not in last:
+            return 0.0
+        return max(0, counters[name] - last[name]) / elapsed
+
+    def _sample(self) -> SystemSnapshot:
+        now = time.monotonic()
+        cpu = self.cpu_stat.sample()
+        if cpu is not None:
+            cpu_percent = cpu.total
+        else:
+            cpu_percent = self.cpu_stat.boot_percent
+            if cpu_percent is None:
+                cpu_percent = psutil.cpu_percent(interval=0)
+        counters = self.cpu_stat.counters
+        snapshot = SystemSnapshot(
+            timestamp=time.time(),
+            cpu_percent=max(0.0, min(100.0, cpu_percent)),
+            cpu=cpu,
+            memory=psutil.virtual_memory(),
+            swap=psutil.swap_memory(),
+            load=os.getloadavg() if hasattr(os, 'getloadavg') else (0.0, 0.0, 0.0),
+            pressure=read_pressure(self.pressure_root),
+            ctx_switches=self._rate('ctxt', counters, now),
+            interrupts=self._rate('intr', counters, now),
+            procs_running=counters.get('procs_running', 0),
+            procs_blocked=counters.get('procs_blocked', 0),
+        )
+        self._counters = (now, counters)
+        self._latest = snapshot
+        self._taken = now
+        return snapshot
+
+
+_default: Optional[SystemMetrics] = None
+
+
+def default_metrics() -> SystemMetrics:
+    """Process-wide SystemMetrics for consumers that are not handed one"""
+    global _default
+    if _default is None:
+        _default = SystemMetrics()
+    return _default
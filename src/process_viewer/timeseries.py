@@ -0,0 +1,240 @@
+"""
+Compact time series storage.
+
+RingBuffer keeps a fixed number of values in a preallocated array, so memory
+per series never grows. TieredSeries feeds every sample into several rings of
+increasing resolution (by default 1 s for 10 minutes, 10 s for 6 hours and
+1 minute for 3 days), each bucket holding the mean of the raw samples that fell
+into it. SeriesStore groups named series that are sampled together.
+RowRing keeps a fixed number of equal-length rows (one value per CPU core,
+say) back to back in a single array.
+
+Reads never copy: RingBuffer.segments() returns at most two memoryviews over
+the underlying array, and iteration walks them in place.
+"""
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# (resolution in seconds, number of points) for each tier, finest first
+DEFAULT_TIERS = ((1, 600), (10, 2160), (60, 4320))
+
+
+class RingBuffer:
+    """Fixed-capacity ring of numbers backed by an array."""
+
+    __slots__ = ('capacity', 'total', '_data', '_start', '_len')
+
+    def __init__(self, capacity: int, typecode: str = 'f'):
+        self.capacity = max(1, capacity)
+        self.total = 0  # Number of values ever appended
+        self._data = array(typecode, [0]) * self.capacity
+        self._start = 0
+        self._len = 0
+
+    def append(self, value: float):
+        end = self._start + self._len
+        if end >= self.capacity:
+            end -= self.capacity
+        self._data[end] = value
+        if self._len < self.capacity:
+            self._len += 1
+        else:
+            self._start = end + 1 if end + 1 < self.capacity else 0
+        self.total += 1
+
+    def clear(self):
+        self._start = 0
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, index: int) -> float:
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("RingBuffer index out of range")
+        index += self._start
+        if index >= self.capacity:
+            index -= self.capacity
+        return self._data[index]
+
+    def segments(self, count: Optional[int] = None) -> List[memoryview]:
+        """
+        Return the newest count values (all by default), oldest first, as
+        one or two memoryviews into the ring without copying
+        """
+        count = self._len if count is None else max(0, min(count, self._len))
+        if not count:
+            return []
+        view = memoryview(self._data)
+        first = self._start + self._len - count
+        if first >= self.capacity:
+            first -= self.capacity
+        end = first + count
+        if end <= self.capacity:
+            return [view[first:end]]
+        return [view[first:], view[:end - self.capacity]]
+
+    def __iter__(self) -> Iterator[float]:
+        for segment in self.segments():
+            yield from segment
+
+    def __reversed__(self) -> Iterator[float]:
+        for segment in reversed(self.segments()):
+            yield from reversed(segment)
+
+    def last(self, count: int) -> List[float]:
+        """Return a copy of the newest count values, oldest first"""
+        values = []
+        for segment in self.segments(count):
+            values.extend(segment)
+        return values
+
+    @property
+    def nbytes(self) -> int:
+        return self.capacity * self._data.itemsize
+
+
+class RowRing:
+    """Fixed-capacity ring of equal-length rows backed by one array."""
+
+    __slots__ = ('capacity', 'width', 'total', '_data', '_len')
+
+    def __init__(self, capacity: int, width: int, typecode: str = 'f'):
+        self.capacity = max(1, capacity)
+        self.width = width
+        self.total = 0  # Number of rows ever appended
+        self._data = array(typecode, [0]) * (self.capacity * width)
+        self._len = 0
+
+    def append(self, row: Sequence[float]):
+        """Append a row of exactly width values"""
+        start = (self.total % self.capacity) * self.width
+        self._data[start:start + self.width] = array(self._data.typecode, row)
+        self.total += 1
+        if self._len < self.capacity:
+            self._len += 1
+
+    def __len__(self):
+        return self._len
+
+    def rows(self, count: Optional[int] = None) -> List[memoryview]:
+        """Return the newest count rows (all by default), oldest first, as memoryviews"""
+        count = self._len if count is None else max(0, min(count, self._len))
+        view = memoryview(self._data)
+        width = self.width
+        rows = []
+        for index in range(self.total - count, self.total):
+            start = (index % self.capacity) * width
+            rows.append(view[start:start + width])
+        return rows
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._data) * self._data.itemsize
+
+
+class TieredSeries:
+    """One metric stored at several resolutions."""
+
+    def __init__(self, tiers: Sequence[Tuple[int, int]] = DEFAULT_TIERS):
+        self.resolutions = tuple(resolution for resolution, _ in tiers)
+        self.values = [RingBuffer(points) for _, points in tiers]
+        self.times = [RingBuffer(points, 'd') for _, points in tiers]
+        # Open bucket per coarse tier: [bucket number, sum, count]
+        self._buckets: List[Optional[list]] = [None] * len(tiers)
+
+    def append(self, value: float, timestamp: float):
+        self.values[0].append(value)
+        self.times[0].append(timestamp)
+        for tier in range(1, len(self.resolutions)):
+            resolution = self.resolutions[tier]
+            bucket_id = int(timestamp // resolution)
+            bucket = self._buckets[tier]
+            if bucket is None:
+                self._buckets[tier] = [bucket_id, value, 1]
+            elif bucket[0] == bucket_id:
+                bucket[1] += value
+                bucket[2] += 1
+            else:
+                # Close the previous bucket with the mean of its samples
+                self.values[tier].append(bucket[1] / bucket[2])
+                self.times[tier].append(bucket[0] * resolution)
+                self._buckets[tier] = [bucket_id, value, 1]
+
+    def clear(self):
+        """Drop every sample, keeping the allocated rings"""
+        for ring in self.values + self.times:
+            ring.clear()
+        self._buckets = [None] * len(self.resolutions)
+
+    def tier_for(self, resolution: Optional[float] = None) -> int:
+        """Return the finest tier whose resolution is at least resolution"""
+        if resolution is None:
+            return 0
+        for tier, tier_resolution in enumerate(self.resolutions):
+            if tier_resolution >= resolution:
+                return tier
+        return len(self.resolutions) - 1
+
+    def view(self, resolution: Optional[float] = None) -> RingBuffer:
+        """Return the value ring for a resolution (finest by default)"""
+        return self.values[self.tier_for(resolution)]
+
+    def timestamps(self, resolution: Optional[float] = None) -> RingBuffer:
+        """Return the timestamp ring matching view(resolution)"""
+        return self.times[self.tier_for(resolution)]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(ring.nbytes for ring in self.values) + sum(ring.nbytes for ring in self.times)
+
+
+class SeriesStore:
+    """Named TieredSeries sharing one tier layout."""
+
+    def __init__(self, tiers: Sequence[Tuple[int, int]] = DEFAULT_TIERS, names: Iterable[str] = ()):
+        self.tiers = tuple(tiers)
+        self.series: Dict[str, TieredSeries] = {}
+        for name in names:
+            self.add(name)
+
+    def add(self, name: str) -> TieredSeries:
+        series = self.series.get(name)
+        if series is None:
+            series = self.series[name] = TieredSeries(self.tiers)
+        return series
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.series
+
+    def __getitem__(self, name: str) -> TieredSeries:
+        return self.series[name]
+
+    def clear(self):
+        """Drop the samples of every series, keeping the allocated rings"""
+        for series in self.series.values():
+            series.clear()
+
+    def append(self, name: str, value: float, timestamp: float):
+        """Append a sample, creating the series on first use"""
+        self.add(name).append(value, timestamp)
+
+    def record(self, values: Dict[str, float], timestamp: float):
+        """Append one sample for each named value"""
+        for name, value in values.items():
+            self.append(name, value, timestamp)
+
+    def last(self, name: str, count: int, resolution: Optional[float] = None) -> List[memoryview]:
+        """Return the newest count points of a series at a resolution as memoryview segments"""
+        return self.series[name].view(resolution).segments(count)
+
+    @property
+    def resolutions(self) -> Tuple[int, ...]:
+        return tuple(resolution for resolution, _ in self.tiers)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(series.nbytes for series in self.series.values())
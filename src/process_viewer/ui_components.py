@@ -1,8 +1,32 @@
 import curses
 from typing import Dict, List, Tuple, Optional
 
+from process_viewer.columns import COLUMNS, DEFAULT_COLUMNS, column_widths, format_header, format_row
+from process_viewer.process_actions import ESCALATE_AFTER, SIGNALS
+from process_viewer.renderer import CursesRenderer, Frame, RenderTarget
+from process_viewer.utils import get_size_str
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+def sparkline(values: List[float], width: int) -> str:
+    """Render the newest width values as a one-line sparkline scaled to their peak"""
+    values = values[-width:] if width > 0 else []
+    if not values:
+        return ""
+    peak = max(values) or 1.0
+    top = len(SPARK_CHARS) - 1
+    return "".join(SPARK_CHARS[min(top, int(value / peak * top + 0.5))] for value in values)
+
+
 class UserInterface:
-    def __init__(self, stdscr):
+    def __init__(self, stdscr=None, target: Optional[RenderTarget] = None):
+        """
+        Args:
+            stdscr: curses screen to draw on
+            target: RenderTarget to draw to instead, e.g. a MemoryRenderer
+                to draw without a terminal
+        """
         self.stdscr = stdscr
         self.header_height = 1
         self.status_height = 2
@@ -15,10 +39,13 @@ class UserInterface:
         self.graph_width = 60   # Width of resource graphs
         self.min_graph_height = 3  # Minimum height for graphs
         self.min_graph_width = 20  # Minimum width for graphs
+        self.renderer = target if target is not None else CursesRenderer(stdscr)
+        self.color_pair = self.renderer.color_pair
+        self.begin_frame()
 
     def check_terminal_size(self) -> Tuple[bool, str, bool]:
         """Check if terminal size is adequate and determine display mode"""
-        height, width = self.stdscr.getmaxyx()
+        height, width = self.renderer.size()
         debug_msg = f"Terminal size: {width}x{height}"
         
         if width < self.min_width or height < self.min_height:
@@ -27,24 +54,27 @@ class UserInterface:
         is_compact = height < 24 or width < 80  # Reduced thresholds for compact mode
         return True, debug_msg, is_compact
 
+    def begin_frame(self):
+        """Start drawing a new frame into an off-screen buffer"""
+        self.height, self.width = self.renderer.size()
+        self.frame = Frame(self.height, self.width)
+
+    def end_frame(self):
+        """Send the parts of the frame that changed since the last one to the terminal"""
+        self.renderer.present(self.frame)
+
+    def get_size(self) -> Tuple[int, int]:
+        """Return (height, width) of the frame being drawn"""
+        return self.height, self.width
+
     def safe_addstr(self, y: int, x: int, text: str, attr: int = 0) -> bool:
-        """Safely add string to screen, handling boundary conditions"""
-        try:
-            height, width = self.stdscr.getmaxyx()
-            if 0 <= y < height and 0 <= x < width:
-                # Truncate string if it would exceed screen width
-                max_length = width - x
-                if max_length > 0:
-                    self.stdscr.addstr(y, x, text[:max_length], attr)
-                    return True
-        except curses.error:
-            pass
-        return False
+        """Safely add string to the current frame, truncating at the screen edge"""
+        return self.frame.addstr(y, x, text, attr)
 
     def draw_resource_graphs(self, resource_history, start_y: int) -> int:
         """Draw CPU and Memory usage graphs with fallback displays"""
         try:
-            height, width = self.stdscr.getmaxyx()
+            height, width = self.get_size()
             
             # Adjust graph dimensions based on terminal size
             available_width = width - 8  # Leave margin for labels
@@ -56,52 +86,86 @@ class UserInterface:
             
             # Skip drawing graphs if terminal is too small
             if available_width < self.min_graph_width or available_height < (self.min_graph_height * 2 + 2):
-                self.safe_addstr(start_y, 2, "Terminal too small for graphs", curses.color_pair(3))
+                self.safe_addstr(start_y, 2, "Terminal too small for graphs", self.color_pair(3))
                 return start_y + 1
             
             try:
                 # Draw CPU graph
                 cpu_graph = resource_history.get_cpu_graph(actual_width, actual_height)
                 for i, line in enumerate(cpu_graph):
-                    self.safe_addstr(start_y + i, 2, line, curses.color_pair(1))
+                    self.safe_addstr(start_y + i, 2, line, self.color_pair(1))
                 
                 # Draw Memory graph below CPU graph
                 start_y += actual_height
                 mem_graph = resource_history.get_memory_graph(actual_width, actual_height)
                 for i, line in enumerate(mem_graph):
-                    self.safe_addstr(start_y + i, 2, line, curses.color_pair(1))
+                    self.safe_addstr(start_y + i, 2, line, self.color_pair(1))
                 
                 return start_y + actual_height + 1
                 
             except Exception as e:
                 # Fallback display if graph generation fails
-                self.safe_addstr(start_y, 2, "Error drawing resource graphs", curses.color_pair(4))
+                self.safe_addstr(start_y, 2, "Error drawing resource graphs", self.color_pair(4))
                 return start_y + 1
                 
         except curses.error:
             return start_y
 
-    def draw_header(self, width: int):
-        """Draw application header"""
+    def draw_header(self, width: int, system=None):
+        """
+        Draw application header
+
+        Args:
+            system: Optional SystemSnapshot summarised at the right edge
+        """
         header = "Process Monitor"
-        self.safe_addstr(0, (width - len(header)) // 2, header, curses.color_pair(3) | curses.A_BOLD)
+        header_x = (width - len(header)) // 2
+        self.safe_addstr(0, header_x, header, self.color_pair(3) | curses.A_BOLD)
+        if system is not None:
+            parts = ["Load " + " ".join(f"{load:.2f}" for load in system.load)]
+            pressure = [f"{kinds['some'].avg10:.1f}" for kinds in system.pressure.values() if 'some' in kinds]
+            if len(pressure) == 3:
+                parts.append("PSI c/m/i " + "/".join(pressure))
+            parts.append(f"{system.ctx_switches / 1000:.1f}k cs/s")
+            # Drop trailing parts until the summary fits right of the title
+            room = width - header_x - len(header) - 3
+            while parts and len("  ".join(parts)) > room:
+                parts.pop()
+            summary = "  ".join(parts)
+            if summary:
+                self.safe_addstr(0, width - len(summary) - 1, summary, self.color_pair(1))
 
-    def draw_process_list(self, processes: List[Dict], selected_idx: int, max_height: int, tree_view: bool):
-        """Draw process list with tree view support"""
+    def draw_process_list(self, processes: List[Dict], selected_idx: int, max_height: int, tree_view: bool,
+                          columns=DEFAULT_COLUMNS, fetch_columns=None, registry=COLUMNS, count_label="processes",
+                          marked=(), tree=None):
+        """
+        Draw process list with tree view support
+
+        Args:
+            columns: Names of the columns to show, see process_viewer.columns
+            fetch_columns: Callable returning pid -> fields missing from the
+                records, called with only the visible rows
+            registry: Column registry the names refer to; GROUP_COLUMNS for
+                the grouped table
+            count_label: What the rows are, for the total line
+            marked: PIDs marked for a batched signal, shown with a '*'
+            tree: ProcessTree whose flatten() returned processes, for the
+                indentation and fold markers of the tree view
+        """
         if not processes:
-            self.safe_addstr(self.header_height + 1, 2, "No processes found (0 processes)", curses.color_pair(3))
+            self.safe_addstr(self.header_height + 1, 2, f"No {count_label} found (0 {count_label})", self.color_pair(3))
             return
 
         # Debug output for process count
         process_count = len(processes)
-        self.safe_addstr(self.header_height, 2, f"Total processes: {process_count}", curses.color_pair(2) | curses.A_BOLD)
+        self.safe_addstr(self.header_height, 2, f"Total {count_label}: {process_count}", self.color_pair(2) | curses.A_BOLD)
 
         # Fixed starting position after graphs
         start_y = self.header_height + (self.graph_height * 2) + 2  # Consistent spacing after graphs
 
         # Debug output for start_y position
         if self.debug_mode:
-            self.safe_addstr(0, 0, f"Debug: start_y={start_y}, max_height={max_height}", curses.color_pair(1))
+            self.safe_addstr(0, 0, f"Debug: start_y={start_y}, max_height={max_height}", self.color_pair(1))
 
         list_height = max_height - start_y - self.status_height - self.help_height
             
@@ -112,18 +176,22 @@ class UserInterface:
         visible_processes = processes[window_start:window_start + list_height]
 
         # Draw process list border
-        height, width = self.stdscr.getmaxyx()
+        height, width = self.get_size()
         list_width = width - 4  # Leave 2 chars padding on each side
         
         # Draw top border
-        self.safe_addstr(start_y, 1, "┌" + "─" * (list_width - 2) + "┐", curses.color_pair(1))
+        self.safe_addstr(start_y, 1, "┌" + "─" * (list_width - 2) + "┐", self.color_pair(1))
         
         # Draw column headers
-        headers = f"{'PID':>8} {'CPU%':>7} {'MEM%':>7} {'STATUS':>10} {'NAME':<20}"
-        self.safe_addstr(start_y + 1, 2, headers, curses.color_pair(1) | curses.A_BOLD)
+        widths = column_widths(columns, list_width - 1, registry)
+        headers = format_header(columns, widths, registry)
+        self.safe_addstr(start_y + 1, 2, headers, self.color_pair(1) | curses.A_BOLD)
+
+        # Expensive fields are only fetched for the rows on screen
+        extras = fetch_columns(visible_processes) if fetch_columns is not None else {}
         
         # Draw header separator
-        self.safe_addstr(start_y + 2, 1, "├" + "─" * (list_width - 2) + "┤", curses.color_pair(1))
+        self.safe_addstr(start_y + 2, 1, "├" + "─" * (list_width - 2) + "┤", self.color_pair(1))
 
         # Adjust start_y for content
         start_y += 3
@@ -134,36 +202,37 @@ class UserInterface:
                 break
 
             try:
-                indent = "  " * proc.get('level', 0) if tree_view else ""
-                prefix = tree_prefix if proc.get('level', 0) > 0 else ""
-                name_str = f"{indent}{prefix}{proc['name']}"
-                
-                # Format process information with proper spacing
-                line = f"{proc['pid']:>8} {proc['cpu_percent']:>7.1f} {proc['memory_percent']:>7.1f} "
-                line += f"{proc['status']:>10} {name_str:<40}"
+                level = tree.levels.get(proc['pid'], 0) if tree_view and tree is not None else 0
+                indent = "  " * level
+                prefix = tree_prefix if level > 0 else ""
+                if tree_view and tree is not None and tree.folded(proc['pid']):
+                    prefix += "[+] "
+                mark = "* " if marked and 'group' not in proc and proc['pid'] in marked else ""
+                line = format_row(columns, widths, proc, extras.get(proc['pid'], {}), f"{mark}{indent}{prefix}",
+                                  registry)
 
                 # Enhanced color scheme for better visibility
                 if idx + window_start == selected_idx:
-                    attr = curses.color_pair(3) | curses.A_REVERSE
+                    attr = self.color_pair(3) | curses.A_REVERSE
                 else:
-                    attr = curses.color_pair(2)
+                    attr = self.color_pair(2)
                     if proc['cpu_percent'] > 50 or proc['memory_percent'] > 50:
                         attr |= curses.A_BOLD
 
                 # Draw side borders
-                self.safe_addstr(start_y + idx, 1, "│", curses.color_pair(1))
-                self.safe_addstr(start_y + idx, width - 2, "│", curses.color_pair(1))
+                self.safe_addstr(start_y + idx, 1, "│", self.color_pair(1))
+                self.safe_addstr(start_y + idx, width - 2, "│", self.color_pair(1))
                 # Draw process info
                 self.safe_addstr(start_y + idx, 2, line, attr)
             except (KeyError, ValueError):
                 # Handle missing or invalid process data
-                self.safe_addstr(start_y + idx, 2, "Error: Unable to display process info", curses.color_pair(4))
+                self.safe_addstr(start_y + idx, 2, "Error: Unable to display process info", self.color_pair(4))
             
         # Draw bottom border
-        self.safe_addstr(start_y + len(visible_processes), 1, "└" + "─" * (list_width - 2) + "┘", curses.color_pair(1))
+        self.safe_addstr(start_y + len(visible_processes), 1, "└" + "─" * (list_width - 2) + "┘", self.color_pair(1))
 
     def draw_status_bar(self, width, state):
-        max_y = self.stdscr.getmaxyx()[0]
+        max_y = self.get_size()[0]
         sort_by = state['sort_by']
         search_term = state['search_term']
         filters = state['filters']
@@ -188,6 +257,29 @@ class UserInterface:
         if active_filters:
             status += " | Filters: " + ", ".join(active_filters)
             
+        if state.get('group_by'):
+            status += f" | Group: {state['group_by']}"
+            if state.get('group_focus') is not None:
+                status += f" > {state['group_focus_name']} (←: back)"
+
+        if state.get('marked'):
+            status += f" | Marked: {len(state['marked'])} (u: clear)"
+
+        if state.get('replay') is not None:
+            status += f" | {state['replay'].describe()}"
+
+        if state.get('scheduler') is not None:
+            status += f" | {state['scheduler'].describe()}"
+
+        # Outcome of the last action, until the next key
+        if state.get('status_message'):
+            status += f" | {state['status_message']}"
+
+        # Show renderer output when debugging
+        if self.debug_mode:
+            stats = self.renderer.stats
+            status += f" | Out: {stats.last_bytes}B/{stats.last_rows_changed} rows, avg {stats.average_bytes:.0f}B"
+
         # Show current input mode
         if input_mode != 'normal':
             mode_text = {
@@ -196,20 +288,24 @@ class UserInterface:
                 'filter_1': 'ENTER STATUS (r/s/t/z)',
                 'filter_2': 'ENTER CPU THRESHOLD',
                 'filter_3': 'ENTER MEMORY THRESHOLD',
-                'filter_4': 'ENTER USERNAME'
+                'filter_4': 'ENTER USERNAME',
+                'signal_menu': 'SIGNAL'
             }.get(input_mode, input_mode.upper())
             status += f" | Mode: {mode_text}"
             
-        self.safe_addstr(max_y - 2, 0, f"{status:<{width}}", curses.color_pair(2) | curses.A_BOLD)
+        self.safe_addstr(max_y - 2, 0, f"{status:<{width}}", self.color_pair(2) | curses.A_BOLD)
 
-    def draw_help(self, width):
-        max_y = self.stdscr.getmaxyx()[0]
-        help_text = "q:Quit | ↑/↓:Navigate | s:Sort | /:Search | f:Filter | c:Clear | t:Tree | Enter:Details | x:Terminate"
-        self.safe_addstr(max_y - 1, 0, f"{help_text:<{width}}", curses.color_pair(2))
+    def draw_help(self, width, replay=False):
+        max_y = self.get_size()[0]
+        if replay:
+            help_text = "q:Quit | ,/.:Step | </>:±1 min | Home/End:Start/End | Space:Play | s:Sort | /:Search | f:Filter | t:Tree | Enter:Details"
+        else:
+            help_text = "q:Quit | ↑/↓:Navigate | s:Sort | /:Search | f:Filter | c:Clear | t:Tree | ←/→:Fold | Enter:Details | Space:Mark | x:Signal | p:Timings"
+        self.safe_addstr(max_y - 1, 0, f"{help_text:<{width}}", self.color_pair(2))
         
     def draw_filter_menu(self):
         """Draw the filter menu when in filter_menu mode"""
-        height, width = self.stdscr.getmaxyx()
+        height, width = self.get_size()
         menu_height = 6
         menu_width = 40
         start_y = (height - menu_height) // 2
@@ -226,18 +322,67 @@ class UserInterface:
         
         for i, item in enumerate(menu_items):
             if i == 0:
-                self.safe_addstr(start_y + i, start_x, item.center(menu_width), curses.color_pair(2) | curses.A_BOLD)
+                self.safe_addstr(start_y + i, start_x, item.center(menu_width), self.color_pair(2) | curses.A_BOLD)
             else:
-                self.safe_addstr(start_y + i, start_x, item.ljust(menu_width), curses.color_pair(1))
+                self.safe_addstr(start_y + i, start_x, item.ljust(menu_width), self.color_pair(1))
+
+    def draw_signal_menu(self, state, counts):
+        """
+        Draw the batched signal menu
+
+        Args:
+            counts: Scope -> number of processes it would signal
+        """
+        height, width = self.get_size()
+        menu_width = 46
+        start_y = (height - 10) // 2
+        start_x = (width - menu_width) // 2
+        name = SIGNALS[state['signal_idx']][0]
+        scopes = (('1', 'selected', "Selected process"), ('2', 'subtree', "Selected process and children"),
+                  ('3', 'filter', "All matching the filters"), ('4', 'marked', "Marked processes"))
+
+        self.safe_addstr(start_y, start_x, "Send Signal".center(menu_width), self.color_pair(4) | curses.A_BOLD)
+        for i, (key, scope, label) in enumerate(scopes, 1):
+            pointer = ">" if state['signal_scope'] == scope else " "
+            item = f"{pointer}{key}. {label} ({counts.get(scope, 0)})"
+            attr = self.color_pair(3) | curses.A_BOLD if state['signal_scope'] == scope else self.color_pair(1)
+            self.safe_addstr(start_y + i, start_x, item.ljust(menu_width), attr)
+        items = [
+            f" ←/→ Signal: SIG{name}",
+            f"  e  Escalate to SIGKILL after {ESCALATE_AFTER:.0f}s: {'on' if state['signal_escalate'] else 'off'}",
+            " Enter to send, ESC to cancel",
+        ]
+        for i, item in enumerate(items, 6):
+            self.safe_addstr(start_y + i, start_x, item.ljust(menu_width), self.color_pair(1))
+
+    def draw_timings(self, summary, width):
+        """
+        Draw the stage timing overlay in the top right corner
+
+        Args:
+            summary: StageSummary rows, see process_viewer.profiling
+        """
+        box_width = 48
+        start_x = max(0, width - box_width - 1)
+        lines = [f"{'stage':<10}{'n':>7}{'last':>8}{'p50':>8}{'p99':>8}{'max':>7}"]
+        for row in summary:
+            lines.append(f"{row.name[:10]:<10}{row.count:>7}{row.last * 1e3:>8.2f}{row.p50 * 1e3:>8.2f}"
+                         f"{row.p99 * 1e3:>8.2f}{row.max * 1e3:>7.1f}")
+        stats = self.renderer.stats
+        lines.append(f"output {stats.last_bytes}B, {stats.last_rows_changed} rows, avg {stats.average_bytes:.0f}B")
+        self.safe_addstr(1, start_x, " Stage timings (ms) ".center(box_width), self.color_pair(2) | curses.A_BOLD)
+        for i, line in enumerate(lines, 2):
+            attr = self.color_pair(3) | curses.A_BOLD if i == 2 else self.color_pair(1)
+            self.safe_addstr(i, start_x, f" {line}".ljust(box_width), attr | curses.A_REVERSE)
 
     def draw_error(self, message: str):
         """Draw an error message in the center of the screen"""
         try:
-            height, width = self.stdscr.getmaxyx()
+            height, width = self.get_size()
             y = height // 2
             x = max(0, (width - len(message)) // 2)
-            self.stdscr.clear()
-            self.safe_addstr(y, x, message, curses.color_pair(4) | curses.A_BOLD)
+            self.frame.clear()
+            self.safe_addstr(y, x, message, self.color_pair(4) | curses.A_BOLD)
         except curses.error:
             pass
 
@@ -247,22 +392,22 @@ class UserInterface:
             self.draw_error("Process not found or access denied")
             return
 
-        height, _ = self.stdscr.getmaxyx()
+        height, _ = self.get_size()
         start_y = height // 4
         start_x = width // 6
         box_width = int(width * 2/3)
 
         # Draw border
-        for y in range(start_y, start_y + 10):
-            self.safe_addstr(y, start_x, "│", curses.color_pair(1))
-            self.safe_addstr(y, start_x + box_width, "│", curses.color_pair(1))
+        for y in range(start_y, start_y + 14):
+            self.safe_addstr(y, start_x, "│", self.color_pair(1))
+            self.safe_addstr(y, start_x + box_width, "│", self.color_pair(1))
         
-        self.safe_addstr(start_y, start_x, "┌" + "─" * (box_width - 2) + "┐", curses.color_pair(1))
-        self.safe_addstr(start_y + 9, start_x, "└" + "─" * (box_width - 2) + "┘", curses.color_pair(1))
+        self.safe_addstr(start_y, start_x, "┌" + "─" * (box_width - 2) + "┐", self.color_pair(1))
+        self.safe_addstr(start_y + 13, start_x, "└" + "─" * (box_width - 2) + "┘", self.color_pair(1))
 
         # Draw title
         title = f" Process Details: {process_details['name']} (PID: {process_details['pid']}) "
-        self.safe_addstr(start_y, start_x + (box_width - len(title)) // 2, title, curses.color_pair(2) | curses.A_BOLD)
+        self.safe_addstr(start_y, start_x + (box_width - len(title)) // 2, title, self.color_pair(2) | curses.A_BOLD)
 
         # Draw details
         details = [
@@ -275,14 +420,28 @@ class UserInterface:
         ]
 
         for i, detail in enumerate(details, 1):
-            self.safe_addstr(start_y + i + 1, start_x + 2, detail, curses.color_pair(1))
+            self.safe_addstr(start_y + i + 1, start_x + 2, detail, self.color_pair(1))
+
+        # Draw recent history as sparklines
+        spark_width = max(0, box_width - 26)
+        histories = [
+            ("CPU", process_details.get('cpu_history'), lambda v: f"{v:5.1f}%"),
+            ("RSS", process_details.get('rss_history'), get_size_str),
+            ("IO", process_details.get('io_history'), lambda v: get_size_str(v) + "/s"),
+        ]
+        y = start_y + 8
+        for label, values, fmt in histories:
+            if values:
+                line = f"{label:<4}{sparkline(values, spark_width)} {fmt(values[-1])} pk {fmt(max(values))}"
+                self.safe_addstr(y, start_x + 2, line[:box_width - 3], self.color_pair(1))
+                y += 1
 
         # Draw exit message
-        self.safe_addstr(start_y + 8, start_x + 2, "Press 'q' or ESC to return", curses.color_pair(3))
+        self.safe_addstr(start_y + 12, start_x + 2, "Press 'q' or ESC to return", self.color_pair(3))
 
     def draw_confirmation_dialog(self, pid):
         """Draw a confirmation dialog for process termination"""
-        height, width = self.stdscr.getmaxyx()
+        height, width = self.get_size()
         dialog_height = 5
         dialog_width = 40
         start_y = (height - dialog_height) // 2
@@ -290,14 +449,14 @@ class UserInterface:
 
         # Draw border
         for y in range(start_y, start_y + dialog_height):
-            self.safe_addstr(y, start_x, "│", curses.color_pair(4))
-            self.safe_addstr(y, start_x + dialog_width, "│", curses.color_pair(4))
+            self.safe_addstr(y, start_x, "│", self.color_pair(4))
+            self.safe_addstr(y, start_x + dialog_width, "│", self.color_pair(4))
         
-        self.safe_addstr(start_y, start_x, "┌" + "─" * (dialog_width - 2) + "┐", curses.color_pair(4))
-        self.safe_addstr(start_y + dialog_height - 1, start_x, "└" + "─" * (dialog_width - 2) + "┘", curses.color_pair(4))
+        self.safe_addstr(start_y, start_x, "┌" + "─" * (dialog_width - 2) + "┐", self.color_pair(4))
+        self.safe_addstr(start_y + dialog_height - 1, start_x, "└" + "─" * (dialog_width - 2) + "┘", self.color_pair(4))
 
         # Draw message
         message = f"Terminate process {pid}?"
-        self.safe_addstr(start_y + 1, start_x + (dialog_width - len(message)) // 2, message, curses.color_pair(4) | curses.A_BOLD)
+        self.safe_addstr(start_y + 1, start_x + (dialog_width - len(message)) // 2, message, self.color_pair(4) | curses.A_BOLD)
         confirm_text = "Press 'y' to confirm, 'n' to cancel"
-        self.safe_addstr(start_y + 3, start_x + (dialog_width - len(confirm_text)) // 2, confirm_text, curses.color_pair(1))
\ No newline at end of file
+        self.safe_addstr(start_y + 3, start_x + (dialog_width - len(confirm_text)) // 2, confirm_text, self.color_pair(1))
\ No newline at end of file
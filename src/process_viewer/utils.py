@@ -1,5 +1,8 @@
-import psutil
 import os
+import pwd
+from functools import lru_cache
+
+from process_viewer.system_metrics import default_metrics
 
 def get_size_str(bytes):
     """Convert bytes to human readable string"""
@@ -16,6 +19,22 @@ def get_permissions():
     except AttributeError:
         return False
 
+@lru_cache(maxsize=4096)
+def username_for_uid(uid):
+    """Resolve a uid to a username, falling back to the numeric uid"""
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return str(uid)
+
+@lru_cache(maxsize=256)
+def uid_for_username(username):
+    """Resolve a username (or numeric uid string) to a uid, or None if unknown"""
+    try:
+        return pwd.getpwnam(username).pw_uid
+    except KeyError:
+        return int(username) if username.isdigit() else None
+
 def format_time(seconds):
     """Format seconds into readable time string"""
     minutes, seconds = divmod(int(seconds), 60)
@@ -31,18 +50,29 @@ def format_time(seconds):
     else:
         return f"{seconds}s"
 
-def get_system_info():
-    """Get system resource information"""
-    cpu_percent = psutil.cpu_percent(interval=1)
-    memory = psutil.virtual_memory()
-    swap = psutil.swap_memory()
+def get_system_info(metrics=None):
+    """
+    Get system resource information without blocking
+
+    Args:
+        metrics: SystemMetrics to read the cached snapshot from; defaults to
+            the process-wide provider
+    """
+    snapshot = (metrics or default_metrics()).snapshot()
+    memory = snapshot.memory
+    swap = snapshot.swap
     
     return {
-        'cpu_percent': cpu_percent,
+        'cpu_percent': snapshot.cpu_percent,
         'memory_used': get_size_str(memory.used),
         'memory_total': get_size_str(memory.total),
         'memory_percent': memory.percent,
         'swap_used': get_size_str(swap.used),
         'swap_total': get_size_str(swap.total),
-        'swap_percent': swap.percent
+        'swap_percent': swap.percent,
+        'load_average': snapshot.load,
+        'ctx_switches_per_sec': snapshot.ctx_switches,
+        'interrupts_per_sec': snapshot.interrupts,
+        'pressure': {resource: {kind: value.avg10 for kind, value in kinds.items()}
+                     for resource, kinds in snapshot.pressure.items()},
     }
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The synthetic /proc and process table generators live with the benchmarks
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
@@ -0,0 +1,103 @@
+"""Tests for the cgroup v2 rollups."""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from fakeproc import build_fake_proc, write_cgroup_stats
+from process_viewer import cgroups
+from process_viewer.cgroups import CgroupMonitor, find_unified_root, read_cgroup_stats
+from process_viewer.collectors import BASIC_FIELDS, ProcfsCollector
+from process_viewer.process_manager import ProcessManager
+
+SERVICE = "/system.slice/nginx.service"
+CONTAINER = "/system.slice/docker-" + "ab" * 32 + ".scope"
+POD = "/kubepods.slice/kubepods-burstable.slice/kubepods-burstable-pod1234abcd_5678.slice"
+POD_CONTAINERS = [f"{POD}/cri-containerd-{c:064x}.scope" for c in range(2)]
+PATHS = [SERVICE, CONTAINER] + POD_CONTAINERS
+
+MEM_TOTAL = 1 << 30
+
+
+def write_tree(root, second):
+    """Fake cgroupfs where each cgroup uses half a CPU and reads 3 MB/s, as of the given second"""
+    with open(os.path.join(root, 'cgroup.controllers'), 'w') as f:
+        f.write("cpu io memory pids\n")
+    for path in PATHS + [POD]:
+        # The pod slice holds the totals of both of its containers
+        scale = 2 if path == POD else 1
+        write_cgroup_stats(os.path.join(root, path.lstrip('/')), scale * 500000 * second, scale * (64 << 20),
+                           scale * 2000000 * second, 0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=100.0)
+    monkeypatch.setattr(cgroups, 'time', SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def test_read_cgroup_stats_sums_devices(tmp_path):
+    write_cgroup_stats(str(tmp_path), 1500, 4096, 3000, 1000)
+    # Two devices: the second one reads and writes half as much
+    assert read_cgroup_stats(str(tmp_path)) == (1500, 4096, 4500, 1500)
+    assert read_cgroup_stats(str(tmp_path / 'missing')) == (None, None, None, None)
+
+
+def test_unified_root_of_a_hybrid_mount(tmp_path):
+    assert find_unified_root(str(tmp_path)) is None
+    (tmp_path / 'unified').mkdir()
+    (tmp_path / 'unified' / 'cgroup.controllers').write_text("cpu\n")
+    assert find_unified_root(str(tmp_path)) == str(tmp_path / 'unified')
+
+
+def test_usage_is_the_difference_to_the_previous_sample(tmp_path, clock):
+    root = str(tmp_path)
+    write_tree(root, 1)
+    monitor = CgroupMonitor(root, mem_total=MEM_TOTAL)
+    first = monitor.sample([SERVICE, "/system.slice/gone.service"])
+    assert list(first) == [SERVICE]
+    assert first[SERVICE].cpu_percent is None
+    assert first[SERVICE].memory == 64 << 20
+    assert first[SERVICE].memory_percent == pytest.approx(6.25)
+
+    write_tree(root, 3)
+    clock.value += 2.0
+    usage = monitor.sample([SERVICE])[SERVICE]
+    assert usage.cpu_percent == pytest.approx(50.0)
+    assert usage.io_read_rate == pytest.approx(3000000)
+    assert usage.io_write_rate == 0
+
+
+def test_unit_container_and_pod_rollups(tmp_path, clock):
+    proc_root = build_fake_proc(str(tmp_path / 'proc'), 40, cgroup_paths=PATHS)
+    cgroup_root = str(tmp_path / 'cgroup')
+    os.makedirs(cgroup_root)
+    write_tree(cgroup_root, 1)
+    collector = ProcfsCollector(proc_root=proc_root)
+    records = {p['pid']: p for p in collector.collect(BASIC_FIELDS + ('cgroup', 'rss', 'num_threads'))}
+    manager = ProcessManager(collector, cgroups=CgroupMonitor(cgroup_root, mem_total=MEM_TOTAL))
+
+    rows = {row['group']: row for row in manager.group_processes(records, 'cgroup')}
+    assert set(rows) == set(PATHS)
+    assert sum(row['count'] for row in rows.values()) == 40
+    assert rows[SERVICE]['name'] == "nginx.service"
+    assert rows[CONTAINER]['name'] == "docker:" + "ab" * 6
+    # No previous sample yet: CPU is the members' sum, memory the cgroup's own
+    members = [p for p in records.values() if p['cgroup'] == CONTAINER]
+    assert rows[CONTAINER]['cpu_percent'] == sum(p['cpu_percent'] for p in members)
+    assert rows[CONTAINER]['memory'] == 64 << 20
+
+    # Pods are sampled at the pod slice, which holds both containers' totals
+    manager.group_processes(records, 'pod')
+    write_tree(cgroup_root, 2)
+    clock.value += 1.0
+    rows = {row['group']: row for row in manager.group_processes(records, 'pod')}
+    assert set(rows) == {SERVICE, CONTAINER, POD}
+    assert rows[POD]['name'] == "pod:1234abcd-5678"
+    assert rows[POD]['count'] == sum(1 for p in records.values() if p['cgroup'] in POD_CONTAINERS)
+    assert rows[POD]['cpu_percent'] == pytest.approx(100.0)
+    assert rows[POD]['memory'] == 128 << 20
+    assert rows[SERVICE]['cpu_percent'] == pytest.approx(50.0)
+    assert rows[SERVICE]['io_read_rate'] == pytest.approx(3000000)
@@ -0,0 +1,80 @@
+"""Tests for the collector backends."""
+
+import os
+
+import psutil
+
+from fakeproc import NAMES, build_fake_proc, build_parents
+from process_viewer.collectors import BASIC_FIELDS, ProcfsCollector, PsutilCollector
+
+
+def test_procfs_parses_the_fake_proc_tree(tmp_path):
+    root = build_fake_proc(str(tmp_path / 'proc'), 50)
+    processes = {p['pid']: p for p in ProcfsCollector(proc_root=root).collect(BASIC_FIELDS + ('rss', 'uid'))}
+
+    assert set(processes) == set(range(1, 51))
+    for pid, ppid in build_parents(50).items():
+        process = processes[pid]
+        assert process['ppid'] == ppid
+        assert process['name'] == NAMES[pid % len(NAMES)]
+        assert process['cpu_percent'] == 0.0  # No previous sample yet
+        assert 0.0 <= process['memory_percent'] < 100.0
+        assert process['rss'] >= 0
+        assert process['uid'] in (0, 33, 1000, 1001)
+
+
+def test_procfs_only_reads_the_files_the_fields_need(tmp_path):
+    root = build_fake_proc(str(tmp_path / 'proc'), 5)
+    for pid in range(1, 6):
+        os.remove(os.path.join(root, str(pid), 'status'))
+    collector = ProcfsCollector(proc_root=root)
+
+    processes = collector.collect(('pid', 'name', 'rss'))
+    assert len(processes) == 5
+    assert all('rss' in p and 'uid' not in p for p in processes)
+    # Processes whose files vanished are skipped, as if they had exited
+    assert collector.collect(('pid', 'uid')) == []
+
+
+def test_procfs_cpu_percent_from_consecutive_samples(tmp_path):
+    root = build_fake_proc(str(tmp_path / 'proc'), 3)
+    collector = ProcfsCollector(proc_root=root)
+    collector.collect(('pid', 'cpu_percent'))
+
+    stat_path = os.path.join(root, '2', 'stat')
+    with open(stat_path) as f:
+        head, rest = f.read().split(') ', 1)
+    fields = rest.split()
+    fields[11] = str(int(fields[11]) + 1000)  # utime
+    with open(stat_path, 'w') as f:
+        f.write(f"{head}) {' '.join(fields)}\n")
+
+    processes = {p['pid']: p for p in collector.collect(('pid', 'cpu_percent'))}
+    assert processes[2]['cpu_percent'] > 0.0
+    assert processes[1]['cpu_percent'] == processes[3]['cpu_percent'] == 0.0
+
+
+def test_procfs_and_psutil_agree(tmp_path):
+    root = build_fake_proc(str(tmp_path / 'proc'), 20)
+    procfs = {p['pid']: p for p in ProcfsCollector(proc_root=root).collect(('pid', 'name', 'ppid', 'status', 'rss'))}
+    psutil.PROCFS_PATH = root
+    try:
+        fallback = {p['pid']: p for p in PsutilCollector().collect(('pid', 'name', 'ppid', 'status', 'rss'))}
+    finally:
+        psutil.PROCFS_PATH = '/proc'
+
+    assert set(procfs) == set(fallback)
+    for pid, process in procfs.items():
+        for field in ('name', 'ppid', 'status', 'rss'):
+            assert process[field] == fallback[pid][field], (pid, field)
+
+
+def test_procfs_reads_command_lines_longer_than_the_buffer(tmp_path):
+    args = [f"--option-{i}={'x' * 40}" for i in range(400)]
+    (tmp_path / '1').mkdir()
+    (tmp_path / '1' / 'cmdline').write_bytes(b'\0'.join(arg.encode() for arg in ['python'] + args) + b'\0')
+
+    collector = ProcfsCollector(proc_root=str(tmp_path), buffer_size=8192)
+    cmdline = collector.collect_pids([1], ('cmdline',))[1]['cmdline']
+    assert len(cmdline) > 8192
+    assert cmdline == ' '.join(['python'] + args)
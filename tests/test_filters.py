@@ -0,0 +1,29 @@
+"""Tests for the compiled process filters."""
+
+from process_viewer.filters import compile_filter
+from process_viewer.process_table import ProcessTable
+
+
+def record(pid, cmdline, **fields):
+    return dict({'pid': pid, 'name': 'python3', 'create_time': 1.0, 'cpu_percent': 0.0, 'cmdline': cmdline}, **fields)
+
+
+def test_cmd_search_uses_the_table_lowercased_cmdline():
+    table = ProcessTable()
+    table.update([record(1, "/usr/bin/Python3 -m HTTP.server"), record(2, "sleep 60")])
+    first = table.get(1)
+    assert first['cmdline_lower'] == "/usr/bin/python3 -m http.server"
+
+    # An unchanged command line keeps the lowercased string from before
+    table.update([record(1, "/usr/bin/Python3 -m HTTP.server", cpu_percent=5.0), record(2, "sleep 60")])
+    assert table.get(1) is not first
+    assert table.get(1)['cmdline_lower'] is first['cmdline_lower']
+
+    process_filter = compile_filter("cmd:*http.server*")
+    assert process_filter.fields == ('cmdline',)
+    assert [p['pid'] for p in process_filter.apply(table)] == [1]
+
+
+def test_cmd_search_on_records_without_the_cached_field():
+    process_filter = compile_filter("cmd:HTTP")
+    assert process_filter.apply([record(1, "python -m HTTP.server")])
@@ -0,0 +1,31 @@
+"""Tests that the headless frames still match the benchmark goldens."""
+
+import json
+import os
+
+from bench_frames import build_screens, draw_screen, screen_state, seeded_history
+from fakeproc import build_records
+from process_viewer.renderer import MemoryRenderer
+from process_viewer.ui_components import UserInterface
+
+GOLDEN = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'frames.golden.json')
+
+
+def test_frames_match_the_goldens():
+    with open(GOLDEN) as f:
+        golden = json.load(f)
+    height, width = (int(n) for n in golden['size'].split('x'))
+    records = build_records(golden['rows'], golden['seed'])
+    history = seeded_history(golden['seed'])
+    target = MemoryRenderer(height, width)
+    ui = UserInterface(target=target)
+
+    screens = build_screens(records)
+    assert set(screens) == set(golden['frames'])
+    for name, (rows, tree_view, overrides, options) in screens.items():
+        target.invalidate()
+        draw_screen(ui, history, rows, tree_view, screen_state(overrides), options, 0)
+        expected = golden['frames'][name]
+        # Text first, so a failure shows which rows changed
+        assert target.lines() == expected['lines'], name
+        assert target.digest() == expected['digest'], f"{name}: text unchanged, attributes differ"
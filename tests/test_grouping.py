@@ -0,0 +1,26 @@
+"""Tests for process grouping."""
+
+import os
+
+from process_viewer.grouping import ProcessGroups
+from process_viewer.utils import username_for_uid
+
+
+def record(pid, uid, **fields):
+    return dict({'pid': pid, 'ppid': 1, 'name': 'worker', 'uid': uid, 'cpu_percent': 1.0,
+                 'memory_percent': 0.5, 'rss': 1024, 'num_threads': 1}, **fields)
+
+
+def test_user_groups_key_on_uid_whatever_the_backend_collects():
+    uid = os.getuid()
+    # Grouping keys on uid, so records of one owner share a group whether or
+    # not the collector, or the fields it was asked for, also filled in username
+    records = {1: record(1, uid, username=username_for_uid(uid)), 2: record(2, uid), 3: record(3, None)}
+    groups = ProcessGroups()
+    groups.set_mode('user')
+    groups.rebuild(records)
+    rows = {row['group']: row for row in groups.rows(records)}
+    assert set(rows) == {uid, None}
+    assert rows[uid]['count'] == 2
+    assert rows[uid]['name'] == username_for_uid(uid)
+    assert rows[None]['name'] == "?"
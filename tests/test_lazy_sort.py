@@ -0,0 +1,49 @@
+"""Tests for the partially sorted process lists."""
+
+import random
+
+import pytest
+
+from process_viewer.lazy_sort import TopKList, sorted_window
+
+
+def items(count, seed=0):
+    rng = random.Random(seed)
+    # Few distinct values, so ties have to keep the stable sort's order
+    return [{'pid': pid, 'cpu_percent': float(rng.randint(0, 20))} for pid in range(count)]
+
+
+@pytest.mark.parametrize('reverse', [True, False])
+def test_topk_matches_a_full_sort(reverse):
+    records = items(1000)
+    key = lambda p: p['cpu_percent']
+    expected = sorted(records, key=key, reverse=reverse)
+    topk = TopKList(records, key, reverse, k=10)
+
+    assert topk.sorted_count == 10
+    assert list(topk[:10]) == expected[:10]
+    assert topk[-1] is expected[-1]
+    assert len(topk) == len(expected)
+    assert list(topk) == expected
+
+
+def test_topk_extends_the_ordered_prefix_on_demand():
+    records = items(1000)
+    key = lambda p: p['cpu_percent']
+    expected = sorted(records, key=key, reverse=True)
+    topk = TopKList(records, key, True, k=10)
+
+    assert topk[50] is expected[50]
+    assert 50 < topk.sorted_count < len(records)
+    assert topk[40:60] == expected[40:60]
+    with pytest.raises(IndexError):
+        topk[1000]
+
+
+def test_sorted_window_sorts_small_lists_fully():
+    key = lambda p: p['cpu_percent']
+    records = items(20)
+    assert sorted_window(records, key, True, 10) == sorted(items(20), key=key, reverse=True)
+    assert isinstance(sorted_window(items(1000), key, True, 10), TopKList)
+    unsorted = items(1000)
+    assert sorted_window(unsorted, None, False, 10) is unsorted
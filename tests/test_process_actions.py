@@ -0,0 +1,111 @@
+"""Tests for batched process signalling."""
+
+import signal
+from types import SimpleNamespace
+
+import psutil
+import pytest
+
+from process_viewer import process_actions
+from process_viewer.process_actions import SignalBatch, subtree_pids
+from process_viewer.process_manager import ProcessManager
+
+
+class FakeProcess:
+    """psutil.Process stand-in for the PIDs in FakeProcess.table."""
+
+    table = {}  # pid -> {'create_time', 'alive', 'signals', 'dies_on'}
+
+    def __init__(self, pid):
+        if pid not in self.table:
+            raise psutil.NoSuchProcess(pid)
+        self.state = self.table[pid]
+
+    def create_time(self):
+        return self.state['create_time']
+
+    def send_signal(self, sig):
+        if not self.state['alive']:
+            raise psutil.NoSuchProcess(0)
+        self.state['signals'].append(sig)
+        if sig in self.state['dies_on']:
+            self.state['alive'] = False
+
+    def is_running(self):
+        return self.state['alive']
+
+    def status(self):
+        return psutil.STATUS_SLEEPING
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    """Fake processes instead of real ones, and a clock the test moves"""
+    FakeProcess.table = {}
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(process_actions, 'HAVE_PIDFD', False)
+    monkeypatch.setattr(process_actions.psutil, 'Process', FakeProcess)
+    monkeypatch.setattr(process_actions, 'time', SimpleNamespace(monotonic=lambda: clock.now))
+
+    def spawn(pid, create_time=1.0, dies_on=(signal.SIGTERM, signal.SIGKILL)):
+        FakeProcess.table[pid] = {'create_time': create_time, 'alive': True, 'signals': [],
+                                  'dies_on': set(dies_on)}
+        return {'pid': pid, 'name': f"proc{pid}", 'create_time': create_time}
+
+    return SimpleNamespace(spawn=spawn, clock=clock, table=FakeProcess.table)
+
+
+def test_signals_go_out_in_slices(fake, monkeypatch):
+    monkeypatch.setattr(process_actions, 'SEND_SLICE', 4)
+    batch = SignalBatch([fake.spawn(pid) for pid in range(100, 110)])
+    assert not batch.poll()
+    assert sum(1 for state in fake.table.values() if state['signals']) == 4
+    assert batch.progress() == "SIGTERM: 4/10 sent"
+    batch.poll()
+    assert batch.poll()
+    assert batch.outcomes == {pid: process_actions.EXITED for pid in range(100, 110)}
+    assert batch.summary() == "SIGTERM to 10 processes: 10 exited"
+
+
+def test_recycled_gone_and_own_pids_are_not_signalled(fake, monkeypatch):
+    monkeypatch.setattr(process_actions.os, 'getpid', lambda: 300)
+    recycled = fake.spawn(100)
+    recycled['create_time'] = 50.0  # Sampled before the PID was reused
+    targets = [recycled, {'pid': 200, 'name': "gone"}, fake.spawn(300), fake.spawn(400)]
+    batch = SignalBatch(targets)
+    assert batch.poll()
+    assert batch.outcomes == {100: process_actions.RECYCLED, 200: process_actions.GONE,
+                              300: process_actions.SKIPPED, 400: process_actions.EXITED}
+    assert fake.table[100]['signals'] == [] and fake.table[300]['signals'] == []
+    assert "1 recycled (100)" in batch.summary()
+
+
+def test_survivors_are_escalated_to_sigkill(fake):
+    batch = SignalBatch([fake.spawn(100, dies_on=(signal.SIGKILL,)), fake.spawn(101)], escalate_after=5.0)
+    assert not batch.poll()
+    assert batch.outcomes == {101: process_actions.EXITED}
+    fake.clock.now += 5.0
+    batch.poll()
+    assert fake.table[100]['signals'] == [signal.SIGTERM, signal.SIGKILL]
+    assert batch.poll()
+    assert batch.outcomes[100] == process_actions.KILLED
+
+
+def test_non_terminating_signals_only_report_delivery(fake):
+    batch = SignalBatch([fake.spawn(100)], sig=signal.SIGSTOP)
+    assert batch.poll()
+    assert batch.outcomes == {100: process_actions.SENT}
+
+
+def test_subtree_and_scope_selection():
+    records = {pid: {'pid': pid, 'ppid': ppid, 'name': f"proc{pid}", 'cpu_percent': 0.0}
+               for pid, ppid in ((1, 0), (10, 1), (11, 10), (12, 10), (20, 1), (21, 21))}
+    assert subtree_pids(records, 10) == [10, 11, 12]
+    assert subtree_pids(records, 21) == [21]  # Its own parent: no endless loop
+    assert sorted(subtree_pids(records, 1)) == [1, 10, 11, 12, 20]
+
+    manager = ProcessManager(collector=object())
+    assert [p['pid'] for p in manager.signal_targets('subtree', records, records[10])] == [10, 11, 12]
+    assert [p['pid'] for p in manager.signal_targets('selected', records, records[10])] == [10]
+    assert [p['pid'] for p in manager.signal_targets('marked', records, None, {20, 99})] == [20]
+    assert manager.signal_targets('filter', records) == []  # No filter active
@@ -0,0 +1,79 @@
+"""Tests for the per-process rolling history."""
+
+from process_viewer.process_history import SLAB_SIZE, ProcessHistory
+from process_viewer.process_table import TableDelta
+
+
+def delta(added=(), updated=(), removed=()):
+    result = TableDelta()
+    result.added = list(added)
+    result.updated = list(updated)
+    result.removed = list(removed)
+    return result
+
+
+def record(pid, cpu=0.0, **fields):
+    return dict({'pid': pid, 'cpu_percent': cpu, 'rss': 1000}, **fields)
+
+
+def test_unchanged_processes_repeat_their_last_value():
+    history = ProcessHistory(points=5)
+    history.apply(delta(added=[record(1, 10.0)]))
+    history.apply(delta())
+    history.apply(delta(updated=[record(1, 30.0)]))
+    history.apply(delta())
+    assert history.series(1) == [10.0, 10.0, 30.0, 30.0]
+    assert history.series(1, window=2) == [30.0, 30.0]
+    assert history.series(1, 'rss') == [1000.0] * 4
+    assert history.series(2) == []
+
+
+def test_series_wraps_around_the_ring():
+    history = ProcessHistory(points=4)
+    history.apply(delta(added=[record(1, 0.0)]))
+    for cpu in range(1, 7):
+        history.apply(delta(updated=[record(1, float(cpu))]))
+    assert history.series(1) == [3.0, 4.0, 5.0, 6.0]
+
+
+def test_exited_slots_are_reused():
+    history = ProcessHistory(points=4)
+    history.apply(delta(added=[record(pid) for pid in range(1, 11)]))
+    nbytes = history.nbytes
+    history.apply(delta(removed=[record(pid) for pid in range(1, 6)]))
+    assert len(history) == 5 and 1 not in history
+
+    history.apply(delta(added=[record(pid, 50.0) for pid in range(11, 16)]))
+    assert history.nbytes == nbytes
+    # A reused slot starts clean, without the previous owner's samples
+    assert history.series(11) == [50.0]
+
+
+def test_least_recently_updated_process_is_evicted_at_the_cap():
+    history = ProcessHistory(points=4, max_processes=3)
+    history.apply(delta(added=[record(1), record(2), record(3)]))
+    history.apply(delta(updated=[record(1, 5.0)]))
+    history.apply(delta(added=[record(4)]))
+    assert [pid for pid in (1, 2, 3, 4) if pid in history] == [1, 3, 4]
+    assert history.nbytes == SLAB_SIZE * 4 * 3 * 4
+
+
+def test_aggregate_average_and_peak():
+    history = ProcessHistory(points=4)
+    history.apply(delta(added=[record(1, 10.0), record(2, 0.0)]))
+    history.apply(delta(updated=[record(1, 30.0)]))
+    assert history.aggregate('cpu', 'avg') == {1: 20.0, 2: 0.0}
+    assert history.aggregate('cpu', 'peak') == {1: 30.0, 2: 0.0}
+    assert history.aggregate('cpu', 'avg', window=1) == {1: 30.0, 2: 0.0}
+
+    # Cached until the next tick
+    assert history.aggregate('cpu', 'avg') is history.aggregate('cpu', 'avg')
+    history.apply(delta(updated=[record(2, 40.0)]))
+    assert history.aggregate('cpu', 'peak') == {1: 30.0, 2: 40.0}
+
+
+def test_io_rates_from_byte_totals():
+    history = ProcessHistory(points=4)
+    history.apply(delta(added=[record(1, io_read=0, io_write=0)]), elapsed=1.0)
+    history.apply(delta(updated=[record(1, io_read=3000, io_write=1000)]), elapsed=2.0)
+    assert history.series(1, 'io') == [0.0, 2000.0]
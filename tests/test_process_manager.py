@@ -0,0 +1,14 @@
+"""Tests for ProcessManager field selection."""
+
+from process_viewer.collectors import PsutilCollector
+from process_viewer.process_manager import ProcessManager
+
+
+def test_sort_by_age_with_psutil_collector():
+    manager = ProcessManager(PsutilCollector())
+    manager.set_sort('age')
+    assert 'data_age' not in manager.fields
+
+    processes = manager.get_processes('age', tree_view=False, refresh=True)
+    assert processes
+    assert all('pid' in process for process in processes)
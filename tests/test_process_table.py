@@ -0,0 +1,57 @@
+"""Tests for the persistent process table."""
+
+from process_viewer.process_table import ProcessTable
+
+
+def record(pid, create_time=1.0, **fields):
+    return dict({'pid': pid, 'name': f"proc{pid}", 'create_time': create_time, 'cpu_percent': 0.0}, **fields)
+
+
+def test_update_reports_added_updated_and_removed():
+    table = ProcessTable()
+    delta = table.update([record(1), record(2), record(3)])
+    assert [p['pid'] for p in delta.added] == [1, 2, 3]
+    assert not delta.removed and not delta.updated
+
+    unchanged = table.get(1)
+    delta = table.update([record(1), record(2, cpu_percent=5.0), record(4)])
+    assert [p['pid'] for p in delta.added] == [4]
+    assert [p['pid'] for p in delta.updated] == [2]
+    assert [p['pid'] for p in delta.removed] == [3]
+    assert table.get(1) is unchanged
+    assert table.get(2)['cpu_percent'] == 5.0
+    assert sorted(table.records) == [1, 2, 4]
+
+    assert not table.update([record(1), record(2, cpu_percent=5.0), record(4)])
+
+
+def test_updated_records_are_replaced_not_modified():
+    table = ProcessTable()
+    table.update([record(1)])
+    before = table.get(1)
+    table.update([record(1, cpu_percent=9.0)])
+    assert before['cpu_percent'] == 0.0
+    assert table.get(1) is not before
+
+
+def test_recycled_pid_is_a_removal_and_an_addition():
+    table = ProcessTable()
+    table.update([record(7, create_time=1.0)])
+    delta = table.update([record(7, create_time=2.0)])
+    assert [p['create_time'] for p in delta.removed] == [1.0]
+    assert [p['create_time'] for p in delta.added] == [2.0]
+    assert not delta.updated
+
+
+def test_listeners_only_see_non_empty_deltas():
+    table = ProcessTable()
+    seen = []
+    table.add_listener(seen.append)
+    table.update([record(1)])
+    table.update([record(1)])
+    table.update([])
+    assert [(len(d.added), len(d.removed)) for d in seen] == [(1, 0), (0, 1)]
+
+    table.remove_listener(seen.append)
+    table.update([record(2)])
+    assert len(seen) == 2
@@ -0,0 +1,91 @@
+"""Tests for the incremental process tree."""
+
+import sys
+
+from process_viewer.process_table import ProcessTable
+from process_viewer.process_tree import ProcessTree
+
+
+def record(pid, ppid, cpu=0.0):
+    return {'pid': pid, 'ppid': ppid, 'name': f"proc{pid}", 'create_time': 1.0, 'cpu_percent': cpu,
+            'memory_percent': 0.0}
+
+
+def shape(tree, rows):
+    return [(p['pid'], tree.levels[p['pid']]) for p in rows]
+
+
+def synced(table, tree, samples, generation):
+    delta = table.update(samples)
+    tree.sync(table.records, delta, generation)
+
+
+def test_flatten_orders_depth_first_with_levels():
+    table, tree = ProcessTable(), ProcessTree()
+    synced(table, tree, [record(1, 0), record(2, 1), record(3, 1), record(4, 2), record(5, 0)], 1)
+    assert shape(tree, tree.flatten(table.records, 'pid')) == [(1, 0), (2, 1), (4, 2), (3, 1), (5, 0)]
+
+
+def test_siblings_follow_the_sort_key():
+    table, tree = ProcessTable(), ProcessTree()
+    synced(table, tree, [record(1, 0), record(2, 1, cpu=1.0), record(3, 1, cpu=5.0)], 1)
+    assert shape(tree, tree.flatten(table.records, 'cpu')) == [(1, 0), (3, 1), (2, 1)]
+
+    # A CPU change reorders the cached siblings on the next tick
+    synced(table, tree, [record(1, 0), record(2, 1, cpu=9.0), record(3, 1, cpu=5.0)], 2)
+    assert shape(tree, tree.flatten(table.records, 'cpu')) == [(1, 0), (2, 1), (3, 1)]
+
+
+def test_collapse_hides_the_subtree():
+    table, tree = ProcessTable(), ProcessTree()
+    synced(table, tree, [record(1, 0), record(2, 1), record(3, 2), record(4, 0)], 1)
+    version = tree.version
+    tree.collapse(2)
+    assert tree.version == version + 1
+    rows = tree.flatten(table.records, 'pid')
+    assert shape(tree, rows) == [(1, 0), (2, 1), (4, 0)]
+    assert [tree.folded(p['pid']) for p in rows] == [False, True, False]
+
+    tree.collapse(4)  # Leaves have nothing to collapse
+    assert tree.version == version + 1
+    tree.expand_all()
+    assert shape(tree, tree.flatten(table.records, 'pid')) == [(1, 0), (2, 1), (3, 2), (4, 0)]
+
+
+def test_deltas_reparent_and_match_a_rebuild():
+    table, tree = ProcessTable(), ProcessTree()
+    synced(table, tree, [record(1, 0), record(2, 1), record(3, 2), record(4, 1)], 1)
+    # 2 exits: its child 3 is reparented to 1, and 5 is born under 4
+    synced(table, tree, [record(1, 0), record(3, 1), record(4, 1), record(5, 4)], 2)
+    incremental = shape(tree, tree.flatten(table.records, 'pid'))
+    assert incremental == [(1, 0), (3, 1), (4, 1), (5, 2)]
+
+    fresh = ProcessTree()
+    fresh.sync(table.records)
+    assert shape(fresh, fresh.flatten(table.records, 'pid')) == incremental
+
+
+def test_orphans_become_roots():
+    table, tree = ProcessTable(), ProcessTree()
+    synced(table, tree, [record(1, 0), record(2, 1), record(3, 2)], 1)
+    synced(table, tree, [record(1, 0), record(3, 2)], 2)
+    assert shape(tree, tree.flatten(table.records, 'pid')) == [(1, 0), (3, 0)]
+
+
+def test_deep_chains_do_not_recurse():
+    depth = sys.getrecursionlimit() * 2
+    table, tree = ProcessTable(), ProcessTree()
+    synced(table, tree, [record(pid, pid - 1) for pid in range(1, depth + 1)], 1)
+    rows = tree.flatten(table.records, 'pid')
+    assert len(rows) == depth
+    assert tree.levels[rows[-1]['pid']] == depth - 1
+
+
+def test_flatten_leaves_the_records_alone():
+    # Snapshots share the records with the server and stream readers
+    table, tree = ProcessTable(), ProcessTree()
+    synced(table, tree, [record(1, 0), record(2, 1), record(3, 2)], 1)
+    tree.collapse(2)
+    before = {pid: dict(p) for pid, p in table.records.items()}
+    tree.flatten(table.records, 'pid')
+    assert table.records == before
@@ -0,0 +1,41 @@
+"""Tests for replaying capture files."""
+
+from types import MappingProxyType
+
+from process_viewer.capture import CaptureReader, CaptureWriter
+from process_viewer.replay import ReplaySource
+from process_viewer.resource_graphs import ResourceHistory
+from process_viewer.sampler import Snapshot
+
+
+def write_capture(path, frames):
+    with CaptureWriter(str(path), ('name',), keyframe_interval=1) as writer:
+        for index in range(frames):
+            processes = MappingProxyType({1: {'pid': 1, 'name': 'init'}})
+            snapshot = Snapshot(seq=index, timestamp=1700000000.0 + index, processes=processes,
+                                delta=None, resources_ok=True)
+            writer.write(snapshot, {'cpu': float(index), 'memory': 50.0})
+
+
+def test_seek_refills_the_same_graph_history(tmp_path):
+    path = tmp_path / "capture.pvc"
+    write_capture(path, 20)
+    replay = ReplaySource(CaptureReader(str(path)), graph_points=5)
+    history = replay.resource_history
+    history.graph_mode = 'braille'
+    ring = history.store['cpu'].values[0]
+    assert list(ring) == [15.0, 16.0, 17.0, 18.0, 19.0]
+    history.get_cpu_graph(10, 4)
+
+    replay.seek(2)
+    assert replay.resource_history is history
+    assert history.store['cpu'].values[0] is ring
+    assert history.graph_mode == 'braille'
+    assert list(ring) == [0.0, 1.0, 2.0]
+
+    # The graph is redrawn from the refilled samples, not appended to the old one
+    fresh = ResourceHistory(max_points=5)
+    fresh.graph_mode = 'braille'
+    for timestamp, cpu, memory in replay.reader.resources(0, 3):
+        fresh.store.record({'cpu': cpu, 'memory': memory}, timestamp)
+    assert history.get_cpu_graph(10, 4) == fresh.get_cpu_graph(10, 4)
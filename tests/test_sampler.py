@@ -0,0 +1,59 @@
+"""Tests for the background sampler."""
+
+from process_viewer.collectors import Collector
+from process_viewer.process_manager import ProcessManager
+from process_viewer.sampler import Sampler
+
+
+class StaticCollector(Collector):
+    """Collector returning whatever the test put in samples."""
+
+    def __init__(self):
+        self.samples = []
+
+    def collect(self, fields=()):
+        return [dict(sample) for sample in self.samples]
+
+
+class FakeResources:
+    last_values = {}
+
+    def update(self):
+        return True
+
+
+def record(pid, cpu=0.0):
+    return {'pid': pid, 'ppid': 0, 'name': f"proc{pid}", 'status': 'sleeping', 'create_time': 1.0,
+            'cpu_percent': cpu, 'memory_percent': 0.0, 'rss': 0}
+
+
+def test_unchanged_tables_reuse_the_previous_snapshot():
+    collector = StaticCollector()
+    collector.samples = [record(1), record(2)]
+    sampler = Sampler(ProcessManager(collector), FakeResources())
+    first = sampler.sample()
+    second = sampler.sample()
+    assert not second.delta
+    assert second.processes is first.processes
+    assert second.seq == first.seq + 1
+
+    collector.samples = [record(1, cpu=5.0), record(2)]
+    third = sampler.sample()
+    assert third.processes is not second.processes
+    assert third.processes[1]['cpu_percent'] == 5.0
+    assert first.processes[1]['cpu_percent'] == 0.0
+
+
+def test_refreshes_outside_the_sampler_force_a_copy():
+    collector = StaticCollector()
+    collector.samples = [record(1)]
+    manager = ProcessManager(collector)
+    sampler = Sampler(manager, FakeResources())
+    first = sampler.sample()
+    collector.samples = [record(1), record(2)]
+    manager.refresh()
+    # The sampler's own refresh sees no change, but the table did change
+    second = sampler.sample()
+    assert not second.delta
+    assert sorted(second.processes) == [1, 2]
+    assert sorted(first.processes) == [1]
@@ -0,0 +1,50 @@
+"""Tests for the metrics endpoint."""
+
+import getpass
+import json
+import os
+
+from process_viewer.collectors import PsutilCollector
+from process_viewer.process_manager import REQUEST_TTL, ProcessManager
+from process_viewer.resource_graphs import ResourceHistory
+from process_viewer.sampler import Sampler
+from process_viewer.server import MetricsService
+
+
+def make_service():
+    process_manager = ProcessManager(PsutilCollector())
+    process_manager.add_base_fields(('uid',))
+    sampler = Sampler(process_manager, ResourceHistory())
+    sampler.sample()
+    return sampler, MetricsService(sampler)
+
+
+def test_user_label_with_psutil_collector():
+    sampler, service = make_service()
+    _, body = service.respond('/metrics?limit=100000')
+    own = [line for line in body.decode().splitlines()
+           if line.startswith('process_viewer_process_cpu_percent{') and f'pid="{os.getpid()}"' in line]
+    assert own and f'user="{getpass.getuser()}"' in own[0]
+
+
+def test_cmd_filter_collects_cmdlines():
+    sampler, service = make_service()
+    service.respond('/api/processes?name=cmd:pytest')
+    sampler.sample()
+    _, body = service.respond('/api/processes?name=cmd:pytest')
+    pids = [process['pid'] for process in json.loads(body)['processes']]
+    assert os.getpid() in pids
+
+
+def test_filter_fields_expire_when_no_longer_requested():
+    sampler, service = make_service()
+    process_manager = sampler.process_manager
+    service.respond('/api/processes?name=cmd:pytest')
+    assert 'cmdline' not in process_manager.fields  # Only the sampler thread changes the fields
+    sampler.sample()
+    assert 'cmdline' in process_manager.fields
+
+    for _ in range(REQUEST_TTL + 1):
+        sampler.sample()
+    assert 'cmdline' not in process_manager.fields
+    assert 'cmdline' not in process_manager.base_fields
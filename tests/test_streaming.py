@@ -0,0 +1,21 @@
+"""Tests for the streaming output."""
+
+import csv
+import io
+
+from process_viewer import streaming
+from process_viewer.collectors import Collector
+
+
+class FailingCollector(Collector):
+    def collect(self, fields=()):
+        raise OSError("proc is gone")
+
+
+def test_collection_errors_stay_out_of_the_stream(monkeypatch, capfd):
+    monkeypatch.setattr(streaming, 'create_collector', lambda backend: FailingCollector())
+    streaming.stream_processes('csv', ('pid', 'name'), interval=0.01, count=1)
+
+    out, err = capfd.readouterr()
+    assert list(csv.reader(io.StringIO(out))) == [['timestamp', 'pid', 'name']]
+    assert "proc is gone" in err
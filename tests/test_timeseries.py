@@ -0,0 +1,60 @@
+"""Tests for the compact time series storage."""
+
+import pytest
+
+from process_viewer.timeseries import RingBuffer, SeriesStore, TieredSeries
+
+
+def test_ring_buffer_wraps_around_keeping_the_newest_values():
+    ring = RingBuffer(4)
+    for value in range(1, 7):
+        ring.append(value)
+    assert len(ring) == 4
+    assert ring.total == 6
+    assert list(ring) == [3.0, 4.0, 5.0, 6.0]
+    assert list(reversed(ring)) == [6.0, 5.0, 4.0, 3.0]
+    assert (ring[0], ring[-1]) == (3.0, 6.0)
+    with pytest.raises(IndexError):
+        ring[4]
+
+
+def test_ring_buffer_segments_are_views_split_at_the_wrap():
+    ring = RingBuffer(4)
+    for value in range(1, 7):
+        ring.append(value)
+    segments = ring.segments()
+    assert all(isinstance(segment, memoryview) for segment in segments)
+    assert [list(segment) for segment in segments] == [[3.0, 4.0], [5.0, 6.0]]
+    assert [list(segment) for segment in ring.segments(1)] == [[6.0]]
+    assert ring.last(3) == [4.0, 5.0, 6.0]
+    assert RingBuffer(4).segments() == []
+
+
+def test_tiered_series_buckets_hold_the_mean_of_their_samples():
+    series = TieredSeries(((1, 10), (5, 10)))
+    for second in range(12):
+        series.append(float(second), 1000.0 + second)
+    assert list(series.view()) == [float(s) for s in range(2, 12)]
+    # Buckets are closed by the first sample of the next one; 1010-1014 is still open
+    assert list(series.view(5)) == [2.0, 7.0]
+    assert list(series.timestamps(5)) == [1000.0, 1005.0]
+    assert series.tier_for(2) == 1
+    assert series.tier_for(60) == 1
+
+
+def test_tiered_series_coarse_tier_wraps_around():
+    series = TieredSeries(((1, 4), (2, 3)))
+    for second in range(20):
+        series.append(1.0, float(second))
+    assert len(series.view()) == 4
+    assert list(series.timestamps(2)) == [12.0, 14.0, 16.0]
+
+
+def test_series_store_records_named_series():
+    store = SeriesStore(((1, 5),), names=('cpu',))
+    store.record({'cpu': 10.0, 'memory': 50.0}, 1.0)
+    store.record({'cpu': 20.0, 'memory': 60.0}, 2.0)
+    assert 'memory' in store
+    assert [list(segment) for segment in store.last('cpu', 1)] == [[20.0]]
+    assert list(store['memory'].view()) == [50.0, 60.0]
+    assert store.resolutions == (1,)